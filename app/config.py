@@ -24,6 +24,18 @@ class Settings(BaseSettings):
     FRONTEND_CALLBACK_URL: str
     ENV: str = os.getenv("ENV", "development")
     DOMAIN: str = os.getenv("DOMAIN", "localhost")
+    # "local", "redis", "tiered" (local L1 + Redis L2) or "local-shared" (tiered
+    # with an in-process stand-in for Redis)
+    CACHE_BACKEND: str = os.getenv("CACHE_BACKEND", "local")
+    REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+    # "document" (one document per message) or "bucketed" (messages grouped into
+    # per-conversation bucket documents)
+    MESSAGE_STORE: str = os.getenv("MESSAGE_STORE", "document")
+    # Group concurrent message inserts into one insert_many: how long the first
+    # insert of a batch waits for others (milliseconds), and the largest batch
+    MESSAGE_BATCHING: bool = os.getenv("MESSAGE_BATCHING", "false").lower() == "true"
+    MESSAGE_BATCH_WINDOW_MS: int = int(os.getenv("MESSAGE_BATCH_WINDOW_MS", "5"))
+    MESSAGE_BATCH_SIZE: int = int(os.getenv("MESSAGE_BATCH_SIZE", "100"))
 
     class Config:
         env_file = ".env"
@@ -57,7 +69,17 @@ async def upload_image(image_data: bytes) -> str:
 reviews_collection = db.reviews
 conversations_collection = db.conversations
 messages_collection = db.messages
+message_buckets_collection = db.message_buckets
+inbox_collection = db.inbox
+tombstones_collection = db.tombstones
+gc_state_collection = db.gc_state
+stream_state_collection = db.change_stream_state
+migrations_collection = db.migrations
 reports_collection = db.reports
 cookies_collection = db.cookies
+feeds_collection = db.feeds
+saved_searches_collection = db.saved_searches
+search_alerts_collection = db.search_alerts
+item_views_collection = db.item_views
 
 print("Logging level set to DEBUG. All logs will be displayed.")
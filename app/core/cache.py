@@ -0,0 +1,594 @@
+from app.config import logger, settings
+from collections import OrderedDict
+import asyncio
+import fnmatch
+import json
+import os
+import queue
+import threading
+import time
+
+# Every named cache, so their metrics can be reported in one place
+cache_registry = {}
+
+
+# Elements of a list measured to estimate the size of the whole list
+SIZE_SAMPLE = 4
+
+
+def estimate_size(value) -> int:
+    """Approximate the memory footprint of a JSON-like value by its encoded length.
+
+    Walks the value instead of encoding it, and estimates long lists from their
+    first SIZE_SAMPLE elements, so sizing stays cheap on every cache set.
+    """
+    if isinstance(value, str):
+        return len(value) + 2
+    if isinstance(value, dict):
+        return 2 + sum(
+            len(str(key)) + 4 + estimate_size(item) for key, item in value.items()
+        )
+    if isinstance(value, (list, tuple)):
+        if not value:
+            return 2
+        sample = value[:SIZE_SAMPLE]
+        per_item = sum(estimate_size(item) + 1 for item in sample) / len(sample)
+        return 2 + int(per_item * len(value))
+    if value is None or isinstance(value, (bool, int, float)):
+        return 8
+    # Dates, ObjectIds and the like are encoded as strings
+    return len(str(value)) + 2
+
+
+class CacheBackend:
+    """Interface shared by every cache implementation."""
+
+    def get(self, key, default=None):
+        raise NotImplementedError
+
+    def set(self, key, value, ttl: float = None):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        raise NotImplementedError
+
+    def get_many(self, keys) -> dict:
+        """The cached values of keys, as a dict without the misses."""
+        values = {}
+        for key in keys:
+            value = self.get(key, _MISSING)
+            if value is not _MISSING:
+                values[key] = value
+        return values
+
+    def set_many(self, values: dict, ttl: float = None):
+        for key, value in values.items():
+            self.set(key, value, ttl)
+
+    # Access for callers on the event loop; backends that talk to Redis run the
+    # round trip in a thread
+    async def get_async(self, key, default=None):
+        return self.get(key, default)
+
+    async def set_async(self, key, value, ttl: float = None):
+        self.set(key, value, ttl)
+
+    async def delete_async(self, key):
+        self.delete(key)
+
+    async def get_many_async(self, keys) -> dict:
+        return self.get_many(keys)
+
+    async def set_many_async(self, values: dict, ttl: float = None):
+        self.set_many(values, ttl)
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+
+class LRUCache(CacheBackend):
+    """In-process cache with LRU eviction and per-entry TTL.
+
+    Capacity is bounded by entry count and, when ``max_bytes`` is set, by the
+    total size of the values as measured by ``sizer``.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_entries: int = 1000,
+        ttl: float = 30,
+        max_bytes: int = None,
+        sizer=estimate_size,
+    ):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.sizer = sizer
+        # key -> (value, expires_at, size)
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        cache_registry[name] = self
+
+    def _drop(self, key):
+        _, _, size = self.entries.pop(key)
+        self.bytes -= size
+
+    def get(self, key, default=None):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        value, expires_at, _ = entry
+        if expires_at <= time.monotonic():
+            self._drop(key)
+            self.expirations += 1
+            self.misses += 1
+            return default
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key, value, ttl: float = None):
+        if key in self.entries:
+            self._drop(key)
+        size = self.sizer(value) if self.max_bytes else 0
+        if self.max_bytes and size > self.max_bytes:
+            # Larger than the whole cache, do not let it flush everything else
+            return
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self.entries[key] = (value, expires_at, size)
+        self.bytes += size
+        while len(self.entries) > self.max_entries or (
+            self.max_bytes and self.bytes > self.max_bytes
+        ):
+            oldest = next(iter(self.entries))
+            self._drop(oldest)
+            self.evictions += 1
+
+    def delete(self, key):
+        if key in self.entries:
+            self._drop(key)
+
+    def clear(self):
+        self.entries.clear()
+        self.bytes = 0
+
+    def __contains__(self, key):
+        entry = self.entries.get(key)
+        return entry is not None and entry[1] > time.monotonic()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "bytes": self.bytes if self.max_bytes else None,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+def cache_stats() -> dict:
+    return {name: cache.stats() for name, cache in cache_registry.items()}
+
+
+class LocalSharedStore:
+    """Thread-safe in-memory stand-in for the subset of the Redis client used here.
+
+    Lets the shared and tiered caches run without a Redis server, e.g. in tests
+    or single-process development.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # key -> (value, expires_at)
+        self.values = {}
+        self.subscribers = {}
+
+    def get(self, key):
+        with self.lock:
+            entry = self.values.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self.values[key]
+                return None
+            return value
+
+    def set(self, key, value, ex=None):
+        with self.lock:
+            expires_at = time.monotonic() + ex if ex else None
+            self.values[key] = (
+                value.encode() if isinstance(value, str) else value,
+                expires_at,
+            )
+        return True
+
+    def mget(self, keys):
+        return [self.get(key) for key in keys]
+
+    def delete(self, *keys):
+        with self.lock:
+            return sum(1 for key in keys if self.values.pop(key, None) is not None)
+
+    def pipeline(self, transaction=True):
+        return LocalPipeline(self)
+
+    def scan_iter(self, match="*"):
+        with self.lock:
+            keys = list(self.values)
+        return (key for key in keys if fnmatch.fnmatchcase(key, match))
+
+    def publish(self, channel, message):
+        for handler in list(self.subscribers.get(channel, [])):
+            handler({"type": "message", "channel": channel, "data": message})
+        return len(self.subscribers.get(channel, []))
+
+    def subscribe(self, channel, handler):
+        self.subscribers.setdefault(channel, []).append(handler)
+
+
+class LocalPipeline:
+    """Queues LocalSharedStore commands and runs them on execute(), like a Redis
+    pipeline."""
+
+    def __init__(self, store: LocalSharedStore):
+        self.store = store
+        self.commands = []
+
+    def __getattr__(self, name):
+        command = getattr(self.store, name)
+
+        def queue_command(*args, **kwargs):
+            self.commands.append((command, args, kwargs))
+            return self
+
+        return queue_command
+
+    def execute(self):
+        commands, self.commands = self.commands, []
+        return [command(*args, **kwargs) for command, args, kwargs in commands]
+
+
+class SharedCache(CacheBackend):
+    """Out-of-process cache stored in Redis (or a LocalSharedStore).
+
+    Values are JSON encoded, so entries are shared by every worker and survive
+    worker restarts.
+    """
+
+    def __init__(self, name: str, client, ttl: float = 30, prefix: str = "spartanup"):
+        self.name = name
+        self.client = client
+        self.ttl = ttl
+        self.key_prefix = f"{prefix}:cache:{name}:"
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def _key(self, key) -> str:
+        return f"{self.key_prefix}{key}"
+
+    def get(self, key, default=None):
+        try:
+            raw = self.client.get(self._key(key))
+        except Exception as e:
+            logger.error(f"Shared cache {self.name} get failed: {str(e)}")
+            self.errors += 1
+            self.misses += 1
+            return default
+        if raw is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return json.loads(raw)
+
+    def set(self, key, value, ttl: float = None):
+        ttl = self.ttl if ttl is None else ttl
+        try:
+            self.client.set(
+                self._key(key),
+                json.dumps(value, default=str),
+                ex=max(int(ttl), 1),
+            )
+        except Exception as e:
+            logger.error(f"Shared cache {self.name} set failed: {str(e)}")
+            self.errors += 1
+
+    # One MGET for every key instead of a GET each
+    def get_many(self, keys) -> dict:
+        keys = list(keys)
+        if not keys:
+            return {}
+        try:
+            raws = self.client.mget([self._key(key) for key in keys])
+        except Exception as e:
+            logger.error(f"Shared cache {self.name} get_many failed: {str(e)}")
+            self.errors += 1
+            self.misses += len(keys)
+            return {}
+        values = {}
+        for key, raw in zip(keys, raws):
+            if raw is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                values[key] = json.loads(raw)
+        return values
+
+    def set_many(self, values: dict, ttl: float = None):
+        if not values:
+            return
+        ttl = self.ttl if ttl is None else ttl
+        try:
+            pipeline = self.client.pipeline(transaction=False)
+            for key, value in values.items():
+                pipeline.set(
+                    self._key(key),
+                    json.dumps(value, default=str),
+                    ex=max(int(ttl), 1),
+                )
+            pipeline.execute()
+        except Exception as e:
+            logger.error(f"Shared cache {self.name} set_many failed: {str(e)}")
+            self.errors += 1
+
+    async def get_async(self, key, default=None):
+        return await asyncio.to_thread(self.get, key, default)
+
+    async def set_async(self, key, value, ttl: float = None):
+        await asyncio.to_thread(self.set, key, value, ttl)
+
+    async def delete_async(self, key):
+        await asyncio.to_thread(self.delete, key)
+
+    async def get_many_async(self, keys) -> dict:
+        return await asyncio.to_thread(self.get_many, list(keys))
+
+    async def set_many_async(self, values: dict, ttl: float = None):
+        await asyncio.to_thread(self.set_many, values, ttl)
+
+    def delete(self, key):
+        try:
+            self.client.delete(self._key(key))
+        except Exception as e:
+            logger.error(f"Shared cache {self.name} delete failed: {str(e)}")
+            self.errors += 1
+
+    def clear(self):
+        try:
+            keys = list(self.client.scan_iter(match=f"{self.key_prefix}*"))
+            if keys:
+                self.client.delete(*keys)
+        except Exception as e:
+            logger.error(f"Shared cache {self.name} clear failed: {str(e)}")
+            self.errors += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            "errors": self.errors,
+        }
+
+
+class TieredCache(CacheBackend):
+    """In-process L1 in front of a shared L2.
+
+    Writes and deletes are broadcast on a pub/sub channel so every other worker
+    drops its L1 copy; the short L1 TTL bounds staleness if a broadcast is missed.
+    """
+
+    def __init__(self, name: str, l1: LRUCache, l2: SharedCache, subscribe):
+        self.name = name
+        self.l1 = l1
+        self.l2 = l2
+        self.channel = f"{l2.key_prefix}invalidate"
+        # Keys invalidated by other workers, drained on the event loop thread
+        self.invalidated = queue.SimpleQueue()
+        subscribe(self.channel, self._on_invalidate)
+        cache_registry[name] = self
+
+    def _on_invalidate(self, message):
+        data = message.get("data")
+        if isinstance(data, bytes):
+            data = data.decode()
+        origin, _, key = data.partition("|")
+        if origin != _WORKER_ID:
+            self.invalidated.put(key)
+
+    def _drain_invalidations(self):
+        while True:
+            try:
+                key = self.invalidated.get_nowait()
+            except queue.Empty:
+                return
+            if key == "*":
+                self.l1.clear()
+            else:
+                self.l1.delete(key)
+
+    def get(self, key, default=None):
+        self._drain_invalidations()
+        value = self.l1.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        value = self.l2.get(key, _MISSING)
+        if value is _MISSING:
+            return default
+        self.l1.set(key, value)
+        return value
+
+    def set(self, key, value, ttl: float = None):
+        self._drain_invalidations()
+        self.l2.set(key, value, ttl)
+        self.l1.set(key, value, None if ttl is None else min(ttl, self.l1.ttl))
+        self._publish(str(key))
+
+    # The async variants keep L1 on the event loop and do the L2 work in a thread
+    async def get_async(self, key, default=None):
+        self._drain_invalidations()
+        value = self.l1.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        value = await self.l2.get_async(key, _MISSING)
+        if value is _MISSING:
+            return default
+        self.l1.set(key, value)
+        return value
+
+    async def set_async(self, key, value, ttl: float = None):
+        self._drain_invalidations()
+        self.l1.set(key, value, None if ttl is None else min(ttl, self.l1.ttl))
+        await asyncio.to_thread(self._store, key, value, ttl)
+
+    async def delete_async(self, key):
+        self.l1.delete(key)
+        await asyncio.to_thread(self._remove, key)
+
+    # Helper function to write a value to L2 and announce it, off the event loop
+    def _store(self, key, value, ttl: float = None):
+        self.l2.set(key, value, ttl)
+        self._publish(str(key))
+
+    # Helper function to delete a key from L2 and announce it, off the event loop
+    def _remove(self, key):
+        self.l2.delete(key)
+        self._publish(str(key))
+
+    async def get_many_async(self, keys) -> dict:
+        self._drain_invalidations()
+        values = self.l1.get_many(keys)
+        missing = [key for key in keys if key not in values]
+        if missing:
+            loaded = await self.l2.get_many_async(missing)
+            for key, value in loaded.items():
+                self.l1.set(key, value)
+            values.update(loaded)
+        return values
+
+    async def set_many_async(self, values: dict, ttl: float = None):
+        self._drain_invalidations()
+        for key, value in values.items():
+            self.l1.set(key, value, None if ttl is None else min(ttl, self.l1.ttl))
+        await asyncio.to_thread(self._store_many, values, ttl)
+
+    # Helper function to write values to L2 and announce them, off the event loop
+    def _store_many(self, values: dict, ttl: float = None):
+        self.l2.set_many(values, ttl)
+        for key in values:
+            self._publish(str(key))
+
+    def delete(self, key):
+        self.l1.delete(key)
+        self.l2.delete(key)
+        self._publish(str(key))
+
+    def clear(self):
+        self.l1.clear()
+        self.l2.clear()
+        self._publish("*")
+
+    def _publish(self, key: str):
+        try:
+            self.l2.client.publish(self.channel, f"{_WORKER_ID}|{key}")
+        except Exception as e:
+            logger.error(f"Cache {self.name} invalidation publish failed: {str(e)}")
+
+    def stats(self) -> dict:
+        return {"l1": self.l1.stats(), "l2": self.l2.stats()}
+
+
+_MISSING = object()
+# Identifies this worker's own invalidation broadcasts
+_WORKER_ID = f"{os.getpid()}-{id(cache_registry)}"
+_shared_client = None
+_pubsub_thread = None
+_pubsub_handlers = {}
+
+
+def get_shared_client():
+    """Return the process-wide client for the shared cache backend."""
+    global _shared_client
+    if _shared_client is None:
+        if settings.CACHE_BACKEND == "local-shared":
+            _shared_client = LocalSharedStore()
+        else:
+            # Only needed when a Redis backend is configured
+            import redis
+
+            _shared_client = redis.Redis.from_url(settings.REDIS_URL)
+    return _shared_client
+
+
+def subscribe_invalidations(channel: str, handler):
+    """Subscribe a handler to an invalidation channel of the shared backend."""
+    global _pubsub_thread
+    client = get_shared_client()
+    if isinstance(client, LocalSharedStore):
+        client.subscribe(channel, handler)
+        return
+    _pubsub_handlers[channel] = handler
+    if _pubsub_thread is not None:
+        _pubsub_thread.stop()
+    pubsub = client.pubsub(ignore_subscribe_messages=True)
+    pubsub.subscribe(**_pubsub_handlers)
+    _pubsub_thread = pubsub.run_in_thread(sleep_time=1, daemon=True)
+
+
+def cache_is_shared() -> bool:
+    """Whether every worker sees the same cache, so a write-through in one
+    worker reaches the others."""
+    return settings.CACHE_BACKEND != "local"
+
+
+def create_cache(
+    name: str,
+    max_entries: int = 1000,
+    ttl: float = 30,
+    max_bytes: int = None,
+    l1_ttl: float = 5,
+) -> CacheBackend:
+    """Build a cache for the configured CACHE_BACKEND.
+
+    "local": per-process LRU (default). "redis": shared only.
+    "tiered" or "local-shared": per-process L1 in front of the shared L2.
+    """
+    backend = settings.CACHE_BACKEND
+    if backend == "local":
+        return LRUCache(name, max_entries=max_entries, ttl=ttl, max_bytes=max_bytes)
+    l2 = SharedCache(name, get_shared_client(), ttl=ttl)
+    if backend == "redis":
+        cache_registry[name] = l2
+        return l2
+    l1 = LRUCache(
+        f"{name}:l1",
+        max_entries=max_entries,
+        ttl=min(ttl, l1_ttl),
+        max_bytes=max_bytes,
+    )
+    # The tiered cache reports the L1 metrics itself
+    cache_registry.pop(l1.name, None)
+    return TieredCache(name, l1, l2, subscribe_invalidations)
@@ -1 +1,122 @@
-client.admin.command("ping")
\ No newline at end of file
+from pymongo import ASCENDING, DESCENDING, TEXT
+from app.core.migrations import merge_duplicate_conversations
+from app.config import (
+    logger,
+    feeds_collection,
+    items_collection,
+    saved_searches_collection,
+    search_alerts_collection,
+    item_views_collection,
+    conversations_collection,
+    messages_collection,
+    message_buckets_collection,
+    inbox_collection,
+    tombstones_collection,
+    reports_collection,
+)
+
+# One thread per (item, buyer, seller); conversation creation upserts on it
+CONVERSATION_KEY_INDEX = "conversation_key"
+
+
+# Create the indexes the read paths rely on. create_index is a no-op when the
+# index already exists, so this is safe to run on every startup.
+def ensure_indexes():
+    try:
+        feeds_collection.create_index([("user_id", ASCENDING)], unique=True)
+        feeds_collection.create_index([("stale", ASCENDING)])
+        feeds_collection.create_index([("top_categories", ASCENDING)])
+        items_collection.create_index(
+            [("status", ASCENDING), ("createdAt", DESCENDING)]
+        )
+        saved_searches_collection.create_index([("user_id", ASCENDING)])
+        search_alerts_collection.create_index(
+            [("user_id", ASCENDING), ("created_at", DESCENDING)]
+        )
+        item_views_collection.create_index(
+            [("item_id", ASCENDING), ("hour", ASCENDING)], unique=True
+        )
+        # Hourly view buckets are only needed for the trending window
+        item_views_collection.create_index(
+            [("hour", ASCENDING)], expireAfterSeconds=7 * 24 * 60 * 60
+        )
+        # Inbox reads: one index per participant role, newest activity first
+        conversations_collection.create_index(
+            [("seller_id", ASCENDING), ("updated_at", DESCENDING)]
+        )
+        conversations_collection.create_index(
+            [("buyer_id", ASCENDING), ("updated_at", DESCENDING)]
+        )
+        # One conversation per (item, buyer, seller). Threads created before the
+        # key existed are merged first, or the unique index build would fail
+        if CONVERSATION_KEY_INDEX not in conversations_collection.index_information():
+            merge_duplicate_conversations()
+        conversations_collection.create_index(
+            [("item_id", ASCENDING), ("buyer_id", ASCENDING), ("seller_id", ASCENDING)],
+            unique=True,
+            name=CONVERSATION_KEY_INDEX,
+        )
+        # Message history pages on (created_at, _id) within a conversation
+        messages_collection.create_index(
+            [
+                ("conversation_id", ASCENDING),
+                ("created_at", DESCENDING),
+                ("_id", DESCENDING),
+            ]
+        )
+        # Bucketed message layout: newest bucket first, and message lookups by id
+        message_buckets_collection.create_index(
+            [("conversation_id", ASCENDING), ("last_at", DESCENDING)]
+        )
+        message_buckets_collection.create_index(
+            [("conversation_id", ASCENDING), ("first_at", ASCENDING)]
+        )
+        message_buckets_collection.create_index(
+            [("conversation_id", ASCENDING), ("messages._id", ASCENDING)]
+        )
+        # Per-user inbox: one entry per (user, conversation), newest activity first
+        inbox_collection.create_index(
+            [("user_id", ASCENDING), ("conversation_id", ASCENDING)], unique=True
+        )
+        inbox_collection.create_index(
+            [("user_id", ASCENDING), ("last_activity", DESCENDING)]
+        )
+        inbox_collection.create_index([("conversation_id", ASCENDING)])
+        # Delta sync: per-user inbox changes, item changes and item deletions
+        inbox_collection.create_index(
+            [("user_id", ASCENDING), ("changed_at", ASCENDING)]
+        )
+        items_collection.create_index([("updated_at", ASCENDING)])
+        tombstones_collection.create_index(
+            [("entity", ASCENDING), ("deleted_at", ASCENDING)]
+        )
+        # Garbage collection: pending cascades, soft-deleted conversations, and
+        # per-user deletions; cascaded tombstones expire after 30 days
+        tombstones_collection.create_index(
+            [("cascaded", ASCENDING)], partialFilterExpression={"cascaded": False}
+        )
+        tombstones_collection.create_index(
+            [("deleted_at", ASCENDING)],
+            expireAfterSeconds=30 * 24 * 60 * 60,
+            partialFilterExpression={"cascaded": True},
+        )
+        tombstones_collection.create_index(
+            [("user_ids", ASCENDING), ("deleted_at", ASCENDING)]
+        )
+        conversations_collection.create_index(
+            [("status", ASCENDING), ("deleted_at", ASCENDING)],
+            partialFilterExpression={"status": "deleted"},
+        )
+        reports_collection.create_index([("entity_id", ASCENDING)])
+        # Full-text message search, one text index per message layout
+        messages_collection.create_index(
+            [("message", TEXT)], name="message_text", default_language="english"
+        )
+        message_buckets_collection.create_index(
+            [("messages.message", TEXT)],
+            name="bucket_message_text",
+            default_language="english",
+        )
+        logger.info("Database indexes ensured")
+    except Exception as e:
+        logger.error(f"Error ensuring indexes: {str(e)}")
@@ -0,0 +1,327 @@
+from app.config import (
+    logger,
+    feeds_collection,
+    items_collection,
+    conversations_collection,
+    reviews_collection,
+)
+from bson import ObjectId
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+import asyncio
+import math
+
+# Number of items kept in each user's precomputed feed
+FEED_SIZE = 100
+# Number of most recent active items considered when ranking
+CANDIDATE_LIMIT = 500
+# How often the background worker wakes up (seconds)
+FEED_REFRESH_INTERVAL = 60
+# Feeds older than this are recomputed even without new signals (seconds)
+FEED_MAX_AGE = 6 * 60 * 60
+# Maximum number of feeds recomputed per worker tick
+FEED_BATCH_SIZE = 200
+# Number of categories stored on the feed for stale-marking on new items
+TOP_CATEGORY_COUNT = 5
+
+# Weight of each signal in the final score
+CATEGORY_WEIGHT = 0.45
+RECENCY_WEIGHT = 0.25
+PRICE_WEIGHT = 0.15
+RATING_WEIGHT = 0.15
+# Messaging about an item is a stronger signal than browsing its category
+MESSAGE_SIGNAL = 3
+BROWSE_SIGNAL = 1
+# Recency half-life in days
+RECENCY_HALF_LIFE_DAYS = 7
+
+# Browse signals buffered in memory until the worker flushes them
+# (key: user_id, value: Counter of category -> hits). Both buffers are only
+# touched on the event loop; the worker swaps them out before flushing.
+pending_browse_signals = defaultdict(Counter)
+# Users whose feed should be recomputed on the next worker tick
+dirty_users = set()
+
+
+def _signal_key(category: str) -> str:
+    # Mongo field names cannot contain dots or start with "$"
+    return category.replace(".", "_").lstrip("$")
+
+
+def record_browse(user_id: str, categories):
+    """Buffer a category browse signal for a user."""
+    for category in categories:
+        if category:
+            pending_browse_signals[user_id][_signal_key(category)] += BROWSE_SIGNAL
+    dirty_users.add(user_id)
+
+
+def mark_user_dirty(user_id: str):
+    """Schedule a user's feed for recomputation."""
+    dirty_users.add(str(user_id))
+
+
+def take_pending_signals():
+    """Swap out the buffered signals and dirty users; must run on the event loop,
+    like record_browse."""
+    global pending_browse_signals, dirty_users
+    signals, users = pending_browse_signals, dirty_users
+    pending_browse_signals, dirty_users = defaultdict(Counter), set()
+    return signals, users
+
+
+def restore_pending_signals(signals, users):
+    """Put back signals and users a tick could not handle, for the next one."""
+    for user_id, counter in signals.items():
+        pending_browse_signals[user_id].update(counter)
+    dirty_users.update(users)
+
+
+def mark_feeds_stale_for_category(category: str):
+    """Flag every feed that ranks this category highly so a new listing shows up."""
+    if not category:
+        return
+    feeds_collection.update_many(
+        {"top_categories": _signal_key(category)}, {"$set": {"stale": True}}
+    )
+
+
+def flush_browse_signals(signals: dict) -> dict:
+    """Persist browse signals as $inc updates on the feed documents. Returns the
+    signals that could not be written."""
+    failed = {}
+    for user_id, counter in signals.items():
+        try:
+            feeds_collection.update_one(
+                {"user_id": ObjectId(user_id)},
+                {
+                    "$inc": {
+                        f"signals.categories.{category}": hits
+                        for category, hits in counter.items()
+                    },
+                    "$set": {"stale": True},
+                },
+                upsert=True,
+            )
+        except Exception as e:
+            logger.error(f"Error flushing browse signals for user {user_id}: {str(e)}")
+            failed[user_id] = counter
+    return failed
+
+
+def fetch_candidates():
+    """Fetch the most recent active items along with their sellers' ratings."""
+    candidates = list(
+        items_collection.find(
+            {"status": "active"},
+            {
+                "title": 1,
+                "price": 1,
+                "images": 1,
+                "category": 1,
+                "condition": 1,
+                "seller_id": 1,
+                "createdAt": 1,
+                "inquiry_count": 1,
+            },
+        )
+        .sort("createdAt", -1)
+        .limit(CANDIDATE_LIMIT)
+    )
+
+    seller_ids = set()
+    for item in candidates:
+        try:
+            seller_ids.add(ObjectId(item["seller_id"]))
+        except Exception:
+            continue
+
+    ratings = {}
+    if seller_ids:
+        pipeline = [
+            {"$match": {"review_target": {"$in": list(seller_ids)}}},
+            {"$group": {"_id": "$review_target", "rating": {"$avg": "$rating"}}},
+        ]
+        for row in reviews_collection.aggregate(pipeline):
+            ratings[str(row["_id"])] = row["rating"]
+
+    return candidates, ratings
+
+
+def _message_signals(user_id: str):
+    """Categories and prices of items the user has messaged sellers about."""
+    pipeline = [
+        {"$match": {"buyer_id": ObjectId(user_id)}},
+        {"$sort": {"updated_at": -1}},
+        {"$limit": 100},
+        {
+            "$lookup": {
+                "from": "items",
+                "localField": "item_id",
+                "foreignField": "_id",
+                "as": "item",
+            }
+        },
+        {"$unwind": "$item"},
+        {"$project": {"category": "$item.category", "price": "$item.price"}},
+    ]
+    categories = Counter()
+    prices = []
+    for row in conversations_collection.aggregate(pipeline):
+        if row.get("category"):
+            categories[_signal_key(row["category"])] += MESSAGE_SIGNAL
+        if isinstance(row.get("price"), (int, float)) and row["price"] > 0:
+            prices.append(float(row["price"]))
+    return categories, prices
+
+
+def _price_score(price, preferred_price):
+    if preferred_price is None or not isinstance(price, (int, float)) or price <= 0:
+        return 0.5
+    # 1.0 for an exact match, falling off with the log-ratio of the prices
+    return 1 / (1 + abs(math.log(price / preferred_price)))
+
+
+def _recency_score(created_at, now):
+    if not isinstance(created_at, datetime):
+        return 0
+    age_days = max((now - created_at).total_seconds(), 0) / 86400
+    return 0.5 ** (age_days / RECENCY_HALF_LIFE_DAYS)
+
+
+def rank_items(user_id: str, signals: dict, candidates, ratings):
+    """Score candidate items for a user and return the top FEED_SIZE item cards."""
+    browse_categories = Counter(signals.get("categories", {}))
+    message_categories, prices = _message_signals(user_id)
+    affinity = browse_categories + message_categories
+    max_affinity = max(affinity.values()) if affinity else 0
+    preferred_price = sorted(prices)[len(prices) // 2] if prices else None
+    now = datetime.utcnow()
+
+    ranked = []
+    for item in candidates:
+        if str(item.get("seller_id")) == str(user_id):
+            continue
+        category = _signal_key(item.get("category") or "")
+        category_score = affinity[category] / max_affinity if max_affinity else 0
+        rating = ratings.get(str(item.get("seller_id")))
+        score = (
+            CATEGORY_WEIGHT * category_score
+            + RECENCY_WEIGHT * _recency_score(item.get("createdAt"), now)
+            + PRICE_WEIGHT * _price_score(item.get("price"), preferred_price)
+            + RATING_WEIGHT * ((rating or 3) / 5)
+        )
+        images = item.get("images") or []
+        ranked.append(
+            {
+                "_id": str(item["_id"]),
+                "title": item.get("title", ""),
+                "price": item.get("price", 0),
+                "image": images[0] if images else "",
+                "category": item.get("category", ""),
+                "condition": item.get("condition", ""),
+                "seller_id": str(item.get("seller_id")),
+                "seller_rating": rating,
+                "inquiry_count": item.get("inquiry_count", 0),
+                "created_at": item.get("createdAt"),
+                "score": round(score, 4),
+            }
+        )
+
+    ranked.sort(key=lambda card: card["score"], reverse=True)
+    top_categories = [
+        category for category, _ in affinity.most_common(TOP_CATEGORY_COUNT)
+    ]
+    return ranked[:FEED_SIZE], top_categories
+
+
+def recompute_feed(user_id: str, candidates=None, ratings=None):
+    """Recompute and store the materialized feed for a single user."""
+    if candidates is None:
+        candidates, ratings = fetch_candidates()
+    feed = feeds_collection.find_one({"user_id": ObjectId(user_id)}, {"signals": 1})
+    signals = (feed or {}).get("signals", {})
+    items, top_categories = rank_items(user_id, signals, candidates, ratings)
+    feeds_collection.update_one(
+        {"user_id": ObjectId(user_id)},
+        {
+            "$set": {
+                "items": items,
+                "top_categories": top_categories,
+                "computed_at": datetime.utcnow(),
+                "stale": False,
+            }
+        },
+        upsert=True,
+    )
+    return items
+
+
+def refresh_feeds(signals: dict, users: set):
+    """Recompute feeds for users with new signals and for stale or expired feeds.
+
+    Takes the buffers swapped out by take_pending_signals and returns the
+    signals and users left for the next tick.
+    """
+    failed = flush_browse_signals(signals)
+
+    user_ids = set()
+    while users and len(user_ids) < FEED_BATCH_SIZE:
+        user_ids.add(users.pop())
+
+    if len(user_ids) < FEED_BATCH_SIZE:
+        expired_before = datetime.utcnow() - timedelta(seconds=FEED_MAX_AGE)
+        stale_feeds = feeds_collection.find(
+            {"$or": [{"stale": True}, {"computed_at": {"$lt": expired_before}}]},
+            {"user_id": 1},
+        ).limit(FEED_BATCH_SIZE - len(user_ids))
+        user_ids.update(str(feed["user_id"]) for feed in stale_feeds)
+
+    if not user_ids:
+        return failed, users
+
+    # Candidates are shared by every feed computed in this tick
+    candidates, ratings = fetch_candidates()
+    for user_id in user_ids:
+        try:
+            recompute_feed(user_id, candidates, ratings)
+        except Exception as e:
+            logger.error(f"Error recomputing feed for user {user_id}: {str(e)}")
+    logger.info(f"Recomputed {len(user_ids)} feeds")
+    return failed, users
+
+
+# Feeds are recomputed every few hours, so items sold or removed since are
+# dropped when a page is read, and the feed is queued for recomputation
+def drop_inactive_items(user_id: str, items: list) -> list:
+    if not items:
+        return items
+    active = {
+        str(item["_id"])
+        for item in items_collection.find(
+            {
+                "_id": {"$in": [ObjectId(item["_id"]) for item in items]},
+                "status": "active",
+            },
+            {"_id": 1},
+        )
+    }
+    if len(active) < len(items):
+        feeds_collection.update_one(
+            {"user_id": ObjectId(user_id)}, {"$set": {"stale": True}}
+        )
+    return [item for item in items if item["_id"] in active]
+
+
+async def feed_refresh_worker():
+    """Background loop that keeps the materialized feeds up to date."""
+    while True:
+        signals, users = take_pending_signals()
+        try:
+            failed, leftover = await asyncio.to_thread(refresh_feeds, signals, users)
+            restore_pending_signals(failed, leftover)
+        except Exception as e:
+            logger.error(f"Feed refresh worker error: {str(e)}")
+            # Signals may have been written already; only the users are retried
+            restore_pending_signals({}, users)
+        await asyncio.sleep(FEED_REFRESH_INTERVAL)
@@ -0,0 +1,351 @@
+from app.config import (
+    logger,
+    conversations_collection,
+    items_collection,
+    reports_collection,
+    user_collection,
+    tombstones_collection,
+    gc_state_collection,
+)
+from app.core.inbox import remove_from_inbox
+from app.core.membership import invalidate_membership
+from app.core.message_store import message_store
+from bson import ObjectId
+from collections import Counter
+from datetime import datetime, timedelta
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+import cloudinary.uploader
+import asyncio
+import inspect
+import re
+import uuid
+
+# How often the garbage collector runs (seconds)
+GC_INTERVAL = 60 * 60
+# Documents handled per batch, and the pause between batches (seconds), so a run
+# never holds the database for long
+GC_BATCH_SIZE = 200
+GC_BATCH_PAUSE = 0.5
+# Upper bound on batches per pass per run; the rest waits for the next run
+GC_MAX_BATCHES = 50
+# Soft-deleted records are kept this long before they are purged
+GC_GRACE_PERIOD = timedelta(days=7)
+# Only one run at a time across all workers; a lease left by a crashed run
+# expires after this long
+GC_LEASE_DURATION = timedelta(hours=1)
+
+# Callbacks told about every conversation the collector purges, so in-process
+# caches can drop it (called on the event loop with {_id, seller_id, buyer_id};
+# a listener may be a coroutine function)
+purge_listeners = []
+
+
+def on_conversations_purged(listener):
+    purge_listeners.append(listener)
+
+
+_CLOUDINARY_VERSION = re.compile(r"v\d+")
+
+
+def record_tombstone(entity: str, entity_id: ObjectId, user_ids=None, **data):
+    """Record a hard delete. Tombstones that are not cascaded yet are picked up by
+    the collector, which removes everything that still references the entity."""
+    tombstones_collection.insert_one(
+        {
+            "entity": entity,
+            "entity_id": entity_id,
+            "user_ids": [ObjectId(user_id) for user_id in user_ids or []],
+            "deleted_at": datetime.utcnow(),
+            "cascaded": False,
+            **data,
+        }
+    )
+
+
+def cloudinary_public_id(url: str):
+    if "res.cloudinary.com" not in (url or "") or "/upload/" not in url:
+        return None
+    parts = url.split("/upload/", 1)[1].split("/")
+    if _CLOUDINARY_VERSION.fullmatch(parts[0]):
+        parts = parts[1:]
+    return "/".join(parts).rsplit(".", 1)[0]
+
+
+def destroy_images(urls) -> int:
+    destroyed = 0
+    for url in urls or []:
+        public_id = cloudinary_public_id(url)
+        if public_id is None:
+            continue
+        try:
+            cloudinary.uploader.destroy(public_id)
+            destroyed += 1
+        except Exception as e:
+            logger.error(f"Error destroying image {public_id}: {str(e)}")
+    return destroyed
+
+
+# Hard-delete conversations with their messages, inbox entries and unread counts.
+# Returns the purged conversations' ids and participants.
+def purge_conversations(conversations: list) -> list:
+    if not conversations:
+        return []
+    conversation_ids = [conv["_id"] for conv in conversations]
+    message_store.delete_conversations(conversation_ids)
+    remove_from_inbox(conversation_ids)
+
+    unread_totals = Counter()
+    for conv in conversations:
+        for user_id, count in (conv.get("unread") or {}).items():
+            unread_totals[user_id] += count
+    unread_updates = [
+        UpdateOne({"_id": ObjectId(user_id)}, {"$inc": {"unread_total": -count}})
+        for user_id, count in unread_totals.items()
+        if count
+    ]
+    if unread_updates:
+        user_collection.bulk_write(unread_updates, ordered=False)
+
+    conversations_collection.delete_many({"_id": {"$in": conversation_ids}})
+    now = datetime.utcnow()
+    tombstones_collection.insert_many(
+        [
+            {
+                "entity": "conversation",
+                "entity_id": conv["_id"],
+                "user_ids": [conv["seller_id"], conv["buyer_id"]],
+                "deleted_at": now,
+                "cascaded": True,
+            }
+            for conv in conversations
+        ]
+    )
+    return [
+        {
+            "_id": conv["_id"],
+            "seller_id": conv["seller_id"],
+            "buyer_id": conv["buyer_id"],
+        }
+        for conv in conversations
+    ]
+
+
+# Remove everything that references a deleted item
+def cascade_item(item_id: ObjectId, images) -> tuple:
+    conversations = list(conversations_collection.find({"item_id": item_id}))
+    purged = purge_conversations(conversations)
+    reports_collection.delete_many({"entity_id": item_id, "type": "product"})
+    return destroy_images(images), purged
+
+
+# Each pass handles one batch and returns (documents processed, purged
+# conversations); a pass is finished when it processes nothing.
+
+
+def cascade_tombstones(state: dict):
+    tombstones = list(
+        tombstones_collection.find({"cascaded": False}).limit(GC_BATCH_SIZE)
+    )
+    purged = []
+    for tombstone in tombstones:
+        if tombstone["entity"] == "item":
+            destroyed, purged_ids = cascade_item(
+                tombstone["entity_id"], tombstone.get("images")
+            )
+            purged.extend(purged_ids)
+            state["images_destroyed"] += destroyed
+        elif tombstone["entity"] == "conversation":
+            message_store.delete_conversations([tombstone["entity_id"]])
+        tombstones_collection.update_one(
+            {"_id": tombstone["_id"]}, {"$set": {"cascaded": True}}
+        )
+    return len(tombstones), purged
+
+
+# Soft deletes without a timestamp (made before removals were stamped) are never
+# purged directly: their grace period starts when the collector first sees them
+def stamp_undated_deletions(state: dict):
+    now = datetime.utcnow()
+    items = items_collection.update_many(
+        {"status": "removed", "removed_at": {"$exists": False}},
+        {"$set": {"removed_at": now}},
+    )
+    conversations = conversations_collection.update_many(
+        {"status": "deleted", "deleted_at": {"$exists": False}},
+        {"$set": {"deleted_at": now}},
+    )
+    return items.modified_count + conversations.modified_count, []
+
+
+def purge_deleted_conversations(state: dict):
+    cutoff = datetime.utcnow() - GC_GRACE_PERIOD
+    conversations = list(
+        conversations_collection.find(
+            {"status": "deleted", "deleted_at": {"$lt": cutoff}}
+        ).limit(GC_BATCH_SIZE)
+    )
+    return len(conversations), purge_conversations(conversations)
+
+
+def purge_removed_items(state: dict):
+    cutoff = datetime.utcnow() - GC_GRACE_PERIOD
+    items = list(
+        items_collection.find(
+            {"status": "removed", "removed_at": {"$lt": cutoff}},
+            {"images": 1, "seller_id": 1},
+        ).limit(GC_BATCH_SIZE)
+    )
+    purged = []
+    for item in items:
+        destroyed, purged_ids = cascade_item(item["_id"], item.get("images"))
+        purged.extend(purged_ids)
+        state["images_destroyed"] += destroyed
+        items_collection.delete_one({"_id": item["_id"]})
+        tombstones_collection.insert_one(
+            {
+                "entity": "item",
+                "entity_id": item["_id"],
+                "user_ids": [ObjectId(item["seller_id"])],
+                "deleted_at": datetime.utcnow(),
+                "cascaded": True,
+            }
+        )
+    return len(items), purged
+
+
+# Conversations whose item no longer exists, scanned with a resumable cursor
+def purge_orphaned_conversations(state: dict):
+    query = {}
+    if state.get("conversation_cursor"):
+        query["_id"] = {"$gt": state["conversation_cursor"]}
+    conversations = list(
+        conversations_collection.find(query).sort("_id", 1).limit(GC_BATCH_SIZE)
+    )
+    if not conversations:
+        state["conversation_cursor"] = None
+        return 0, []
+    state["conversation_cursor"] = conversations[-1]["_id"]
+    item_ids = {conv["item_id"] for conv in conversations}
+    existing = {
+        item["_id"]
+        for item in items_collection.find({"_id": {"$in": list(item_ids)}}, {"_id": 1})
+    }
+    orphans = [conv for conv in conversations if conv["item_id"] not in existing]
+    return len(conversations), purge_conversations(orphans)
+
+
+# Messages whose conversation no longer exists, scanned with a resumable cursor
+def purge_orphaned_messages(state: dict):
+    conversation_ids, cursor = message_store.scan_conversation_ids(
+        state.get("message_cursor"), GC_BATCH_SIZE
+    )
+    state["message_cursor"] = cursor
+    if not conversation_ids:
+        return 0, []
+    existing = {
+        conv["_id"]
+        for conv in conversations_collection.find(
+            {"_id": {"$in": list(conversation_ids)}}, {"_id": 1}
+        )
+    }
+    orphaned = list(conversation_ids - existing)
+    if orphaned:
+        state["orphaned_messages_deleted"] += message_store.delete_conversations(
+            orphaned
+        )
+    return len(conversation_ids), []
+
+
+GC_PASSES = [
+    ("tombstones", cascade_tombstones),
+    ("undated_deletions", stamp_undated_deletions),
+    ("deleted_conversations", purge_deleted_conversations),
+    ("removed_items", purge_removed_items),
+    ("orphaned_conversations", purge_orphaned_conversations),
+    ("orphaned_messages", purge_orphaned_messages),
+]
+
+
+def load_gc_state() -> dict:
+    state = gc_state_collection.find_one({"_id": "gc"}) or {"_id": "gc"}
+    state["images_destroyed"] = 0
+    state["orphaned_messages_deleted"] = 0
+    return state
+
+
+def acquire_gc_lease(owner: str) -> bool:
+    now = datetime.utcnow()
+    try:
+        # Matches a free or expired lease; a held one makes the upsert collide
+        gc_state_collection.update_one(
+            {"_id": "gc_lease", "expires_at": {"$lt": now}},
+            {"$set": {"owner": owner, "expires_at": now + GC_LEASE_DURATION}},
+            upsert=True,
+        )
+        return True
+    except DuplicateKeyError:
+        return False
+
+
+def release_gc_lease(owner: str):
+    gc_state_collection.delete_one({"_id": "gc_lease", "owner": owner})
+
+
+async def run_gc():
+    """Run every pass in throttled batches and record progress in gc_state.
+    Returns None without doing anything when another run is in progress."""
+    owner = uuid.uuid4().hex
+    if not await asyncio.to_thread(acquire_gc_lease, owner):
+        logger.info("Garbage collection already running, skipping")
+        return None
+    try:
+        return await _run_gc_passes()
+    finally:
+        await asyncio.to_thread(release_gc_lease, owner)
+
+
+async def _run_gc_passes() -> dict:
+    state = await asyncio.to_thread(load_gc_state)
+    processed = Counter()
+    conversations_purged = 0
+    started_at = datetime.utcnow()
+    for name, gc_pass in GC_PASSES:
+        for _ in range(GC_MAX_BATCHES):
+            count, purged = await asyncio.to_thread(gc_pass, state)
+            for conversation in purged:
+                await invalidate_membership(conversation["_id"])
+                for listener in purge_listeners:
+                    result = listener(conversation)
+                    if inspect.isawaitable(result):
+                        await result
+            processed[name] += count
+            conversations_purged += len(purged)
+            if not count:
+                break
+            await asyncio.sleep(GC_BATCH_PAUSE)
+
+    last_run = {
+        "started_at": started_at,
+        "finished_at": datetime.utcnow(),
+        "processed": dict(processed),
+        "conversations_purged": conversations_purged,
+        "images_destroyed": state.pop("images_destroyed"),
+        "orphaned_messages_deleted": state.pop("orphaned_messages_deleted"),
+    }
+    state["last_run"] = last_run
+    await asyncio.to_thread(
+        gc_state_collection.replace_one, {"_id": "gc"}, state, upsert=True
+    )
+    logger.info(f"Garbage collection finished: {last_run}")
+    return last_run
+
+
+async def gc_worker():
+    """Background loop that periodically runs the garbage collector."""
+    while True:
+        await asyncio.sleep(GC_INTERVAL)
+        try:
+            await run_gc()
+        except Exception as e:
+            logger.error(f"Error running garbage collection: {str(e)}")
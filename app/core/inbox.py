@@ -0,0 +1,150 @@
+from app.config import (
+    inbox_collection,
+    conversations_collection,
+    migrations_collection,
+)
+from bson import ObjectId
+from datetime import datetime
+from pymongo import UpdateOne
+
+# Per-user inbox index: one entry per (user, conversation), ordered by
+# last_activity. Written on every conversation change (fan-out on write) so an
+# inbox page is a range scan on (user_id, last_activity) instead of an $or over
+# seller_id and buyer_id. Every write also stamps changed_at, which the sync
+# endpoint reads as the user's change log.
+
+# Marker written once every conversation has inbox entries; until then reads
+# fall back to querying conversations directly
+INBOX_BACKFILL_ID = "inbox_backfill"
+_inbox_ready = False
+
+
+def inbox_ready() -> bool:
+    global _inbox_ready
+    if not _inbox_ready:
+        _inbox_ready = (
+            migrations_collection.find_one({"_id": INBOX_BACKFILL_ID}) is not None
+        )
+    return _inbox_ready
+
+
+def mark_inbox_ready():
+    global _inbox_ready
+    migrations_collection.update_one(
+        {"_id": INBOX_BACKFILL_ID},
+        {"$set": {"completed_at": datetime.utcnow()}},
+        upsert=True,
+    )
+    _inbox_ready = True
+
+
+def participant_query(user_id: str) -> dict:
+    return {"$or": [{"seller_id": ObjectId(user_id)}, {"buyer_id": ObjectId(user_id)}]}
+
+
+def inbox_entry_updates(conversation: dict, last_activity) -> list:
+    updates = []
+    for role in ("seller", "buyer"):
+        updates.append(
+            UpdateOne(
+                {
+                    "user_id": conversation[f"{role}_id"],
+                    "conversation_id": conversation["_id"],
+                },
+                {
+                    "$max": {"last_activity": last_activity},
+                    "$set": {
+                        "status": conversation.get("status"),
+                        "changed_at": datetime.utcnow(),
+                    },
+                    "$setOnInsert": {"role": role},
+                },
+                upsert=True,
+            )
+        )
+    return updates
+
+
+def add_to_inbox(conversation: dict, last_activity):
+    inbox_collection.bulk_write(
+        inbox_entry_updates(conversation, last_activity), ordered=False
+    )
+
+
+def touch_inbox(conversation_id: ObjectId, last_activity):
+    inbox_collection.update_many(
+        {"conversation_id": conversation_id},
+        {
+            "$max": {"last_activity": last_activity},
+            "$set": {"changed_at": datetime.utcnow()},
+        },
+    )
+
+
+# Flag a change that does not move the conversation, such as a read pointer
+def mark_inbox_changed(conversation_id: ObjectId):
+    inbox_collection.update_many(
+        {"conversation_id": conversation_id},
+        {"$set": {"changed_at": datetime.utcnow()}},
+    )
+
+
+def set_inbox_status(conversation_id: ObjectId, status: str):
+    inbox_collection.update_many(
+        {"conversation_id": conversation_id},
+        {"$set": {"status": status, "changed_at": datetime.utcnow()}},
+    )
+
+
+def remove_from_inbox(conversation_ids: list):
+    inbox_collection.delete_many({"conversation_id": {"$in": conversation_ids}})
+
+
+# One page of a user's conversations, newest activity first
+def fetch_inbox_conversations(user_id: str, skip: int = 0, limit: int = 0) -> list:
+    if not inbox_ready():
+        return list(
+            conversations_collection.find(participant_query(user_id))
+            .sort("updated_at", -1)
+            .skip(skip)
+            .limit(limit)
+        )
+    entries = (
+        inbox_collection.find({"user_id": ObjectId(user_id)}, {"conversation_id": 1})
+        .sort("last_activity", -1)
+        .skip(skip)
+        .limit(limit)
+    )
+    conversation_ids = [entry["conversation_id"] for entry in entries]
+    if not conversation_ids:
+        return []
+    conversations = {
+        conversation["_id"]: conversation
+        for conversation in conversations_collection.find(
+            {"_id": {"$in": conversation_ids}}
+        )
+    }
+    return [
+        conversations[conversation_id]
+        for conversation_id in conversation_ids
+        if conversation_id in conversations
+    ]
+
+
+# Ids of every conversation the user takes part in, for scoping queries to them
+def fetch_inbox_conversation_ids(user_id: str) -> list:
+    if not inbox_ready():
+        return [
+            conversation["_id"]
+            for conversation in conversations_collection.find(
+                {**participant_query(user_id), "status": {"$ne": "deleted"}},
+                {"_id": 1},
+            )
+        ]
+    return [
+        entry["conversation_id"]
+        for entry in inbox_collection.find(
+            {"user_id": ObjectId(user_id), "status": {"$ne": "deleted"}},
+            {"conversation_id": 1},
+        )
+    ]
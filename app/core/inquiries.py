@@ -0,0 +1,130 @@
+from app.config import (
+    logger,
+    items_collection,
+    conversations_collection,
+    user_collection,
+)
+from app.core.suggestions import INQUIRY_WEIGHT, suggestion_index
+from bson import ObjectId
+from pymongo import UpdateOne
+from datetime import datetime
+import asyncio
+
+# Number of recent inquirer summaries kept on each item
+RECENT_INQUIRERS = 5
+# How often the rebuild job corrects drift in the counters (seconds)
+INQUIRY_REBUILD_INTERVAL = 6 * 60 * 60
+
+
+def _inquirer_summary(conversation_id, buyer, created_at):
+    return {
+        "conversation_id": str(conversation_id),
+        "buyer_id": str(buyer["_id"]),
+        "name": buyer.get("full_name", buyer.get("name", "")),
+        "picture": buyer.get("picture"),
+        "created_at": created_at,
+    }
+
+
+def record_inquiry(item_id, conversation_id, buyer_id, created_at=None):
+    """Increment the item's inquiry counter and push the buyer onto its recent inquirers."""
+    created_at = created_at or datetime.utcnow()
+    buyer = user_collection.find_one(
+        {"_id": ObjectId(buyer_id)},
+        {"name": 1, "full_name": 1, "picture": 1},
+    ) or {"_id": ObjectId(buyer_id)}
+    items_collection.update_one(
+        {"_id": ObjectId(item_id)},
+        {
+            "$inc": {"inquiry_count": 1},
+            "$push": {
+                "recent_inquirers": {
+                    "$each": [_inquirer_summary(conversation_id, buyer, created_at)],
+                    "$position": 0,
+                    "$slice": RECENT_INQUIRERS,
+                }
+            },
+        },
+    )
+    suggestion_index.adjust_popularity(str(item_id), INQUIRY_WEIGHT)
+
+
+def rebuild_inquiry_counters():
+    """Recompute inquiry counters for every item from the conversations collection."""
+    started_at = datetime.utcnow()
+    pipeline = [
+        {"$sort": {"created_at": -1}},
+        {
+            "$group": {
+                "_id": "$item_id",
+                "count": {"$sum": 1},
+                "recent": {
+                    "$push": {
+                        "conversation_id": "$_id",
+                        "buyer_id": "$buyer_id",
+                        "created_at": "$created_at",
+                    }
+                },
+            }
+        },
+        {"$project": {"count": 1, "recent": {"$slice": ["$recent", RECENT_INQUIRERS]}}},
+    ]
+    groups = list(conversations_collection.aggregate(pipeline, allowDiskUse=True))
+
+    buyer_ids = {entry["buyer_id"] for group in groups for entry in group["recent"]}
+    buyers = {
+        buyer["_id"]: buyer
+        for buyer in user_collection.find(
+            {"_id": {"$in": list(buyer_ids)}},
+            {"name": 1, "full_name": 1, "picture": 1},
+        )
+    }
+
+    # record_inquiry pushes the newest inquiry first, so an item whose first entry
+    # is newer than the snapshot got an inquiry the aggregation did not see
+    not_inquired_since = {
+        "recent_inquirers.0.created_at": {"$not": {"$gte": started_at}}
+    }
+    operations = []
+    for group in groups:
+        recent = [
+            _inquirer_summary(
+                entry["conversation_id"],
+                buyers.get(entry["buyer_id"], {"_id": entry["buyer_id"]}),
+                entry.get("created_at"),
+            )
+            for entry in group["recent"]
+        ]
+        operations.append(
+            UpdateOne(
+                {"_id": group["_id"], **not_inquired_since},
+                {"$set": {"inquiry_count": group["count"], "recent_inquirers": recent}},
+            )
+        )
+
+    for i in range(0, len(operations), 500):
+        items_collection.bulk_write(operations[i : i + 500], ordered=False)
+
+    # Items missing from the snapshot had no conversations left when it was taken
+    reset = items_collection.update_many(
+        {
+            "_id": {"$nin": [group["_id"] for group in groups]},
+            "inquiry_count": {"$gt": 0},
+            **not_inquired_since,
+        },
+        {"$set": {"inquiry_count": 0, "recent_inquirers": []}},
+    )
+    logger.info(
+        f"Rebuilt inquiry counters for {len(groups)} items, reset {reset.modified_count}"
+    )
+    return {"items_updated": len(groups), "items_reset": reset.modified_count}
+
+
+async def inquiry_rebuild_worker():
+    """Background loop that periodically corrects drift in the inquiry counters."""
+    while True:
+        await asyncio.sleep(INQUIRY_REBUILD_INTERVAL)
+        try:
+            await asyncio.to_thread(rebuild_inquiry_counters)
+        except Exception as e:
+            logger.error(f"Inquiry rebuild worker error: {str(e)}")
@@ -0,0 +1,201 @@
+from app.config import logger, db, stream_state_collection
+from datetime import datetime
+from pymongo.errors import OperationFailure
+from typing import NamedTuple
+import asyncio
+import inspect
+import threading
+import time
+
+# Collections whose writes in-process state may depend on
+WATCHED_COLLECTIONS = (
+    "items",
+    "users",
+    "conversations",
+    "messages",
+    "preferences",
+    "saved_searches",
+)
+# How often the resume token is saved (seconds), and the wait before reopening a
+# failed stream
+CHECKPOINT_INTERVAL = 5
+RETRY_DELAY = 5
+STREAM_STATE_ID = "cache_invalidation"
+# Server error codes: change streams need a replica set; the resume point fell
+# off the oplog
+NOT_REPLICA_SET = 40573
+RESUME_LOST = {260, 280, 286}
+
+
+class InvalidationEvent(NamedTuple):
+    """A write to a watched collection.
+
+    ``fields`` names the top-level fields an update set or removed (empty for
+    other operations); ``document`` is the inserted document, None otherwise.
+    """
+
+    collection: str
+    operation: str  # "insert", "update", "replace" or "delete"
+    document_id: object
+    fields: frozenset
+    document: dict = None
+
+
+# Control events (drops and renames of a collection or the database) carry no
+# document and are skipped; None is returned for them
+def _to_event(change: dict):
+    if "documentKey" not in change:
+        logger.warning(
+            f"Change stream {change['operationType']} event on "
+            f"{change.get('ns')}; cached entries expire on their TTL"
+        )
+        return None
+    description = change.get("updateDescription") or {}
+    fields = frozenset(
+        name.split(".", 1)[0]
+        for name in [
+            *description.get("updatedFields", {}),
+            *description.get("removedFields", []),
+        ]
+    )
+    return InvalidationEvent(
+        change["ns"]["coll"],
+        change["operationType"],
+        change["documentKey"]["_id"],
+        fields,
+        change.get("fullDocument"),
+    )
+
+
+class InvalidationBus:
+    """Fans writes seen on MongoDB change streams out to in-process caches.
+
+    Caches ``subscribe`` a handler per collection; handlers run on the event loop
+    thread (cache access must stay there) and may be coroutines. Writes made by
+    this worker are delivered too, so handlers must be idempotent. The stream's
+    resume token is saved every CHECKPOINT_INTERVAL seconds, so after a restart
+    the bus picks up where it stopped. Streams are reopened with start_after,
+    which also continues past an invalidate event.
+    """
+
+    def __init__(self):
+        # collection -> handlers
+        self.handlers = {}
+        self.events = 0
+        # True while a change stream is open, so writes from every worker arrive
+        self.streaming = False
+
+    def subscribe(self, collection: str, handler):
+        if collection not in WATCHED_COLLECTIONS:
+            raise ValueError(f"{collection} is not watched for invalidation")
+        self.handlers.setdefault(collection, []).append(handler)
+
+    def publish(self, event: InvalidationEvent):
+        self.events += 1
+        for handler in self.handlers.get(event.collection, []):
+            try:
+                result = handler(event)
+                if inspect.isawaitable(result):
+                    asyncio.ensure_future(result)
+            except Exception as e:
+                logger.error(
+                    f"Invalidation handler for {event.collection} failed: {str(e)}"
+                )
+
+    def _load_token(self):
+        state = stream_state_collection.find_one({"_id": STREAM_STATE_ID})
+        return (state or {}).get("resume_token")
+
+    def _save_token(self, token):
+        stream_state_collection.update_one(
+            {"_id": STREAM_STATE_ID},
+            {"$set": {"resume_token": token, "updated_at": datetime.utcnow()}},
+            upsert=True,
+        )
+
+    def consume(self, loop, stop: threading.Event):
+        """Read the change stream until stop is set, publishing each event on
+        loop. Runs in a worker thread. Returns False when the deployment has no
+        change streams."""
+        pipeline = [
+            {
+                "$match": {
+                    "$or": [
+                        {"ns.coll": {"$in": sorted(self.handlers)}},
+                        {"operationType": "invalidate"},
+                    ]
+                }
+            },
+            {
+                "$project": {
+                    "ns": 1,
+                    "operationType": 1,
+                    "documentKey": 1,
+                    "updateDescription.updatedFields": 1,
+                    "updateDescription.removedFields": 1,
+                    "fullDocument": 1,
+                }
+            },
+        ]
+        token = self._load_token()
+        saved_token, saved_at = token, time.monotonic()
+        try:
+            with db.watch(
+                pipeline, start_after=token, max_await_time_ms=1000
+            ) as stream:
+                self.streaming = True
+                while not stop.is_set():
+                    change = stream.try_next()
+                    token = stream.resume_token
+                    if change is not None:
+                        if change["operationType"] == "invalidate":
+                            # The stream is closed; the next starts after this event
+                            logger.warning("Change stream invalidated, reopening")
+                            break
+                        event = _to_event(change)
+                        if event is not None:
+                            loop.call_soon_threadsafe(self.publish, event)
+                    if (
+                        token != saved_token
+                        and time.monotonic() - saved_at >= CHECKPOINT_INTERVAL
+                    ):
+                        self._save_token(token)
+                        saved_token, saved_at = token, time.monotonic()
+        except OperationFailure as e:
+            if e.code == NOT_REPLICA_SET:
+                logger.warning("Change streams unavailable, cache invalidation off")
+                return False
+            if e.code in RESUME_LOST:
+                # Events were missed; restart from now
+                logger.warning(f"Change stream resume point lost: {str(e)}")
+                stream_state_collection.delete_one({"_id": STREAM_STATE_ID})
+                return True
+            raise
+        finally:
+            self.streaming = False
+            if token is not None and token != saved_token:
+                self._save_token(token)
+        return True
+
+
+# Global invalidation bus instance
+invalidation_bus = InvalidationBus()
+
+
+async def invalidation_worker():
+    """Background loop that feeds the change stream to the invalidation bus."""
+    if not invalidation_bus.handlers:
+        return
+    loop = asyncio.get_running_loop()
+    stop = threading.Event()
+    try:
+        while True:
+            try:
+                if not await asyncio.to_thread(invalidation_bus.consume, loop, stop):
+                    return
+            except Exception as e:
+                logger.error(f"Change stream failed: {str(e)}")
+                await asyncio.sleep(RETRY_DELAY)
+    finally:
+        # Let the reader thread finish its current wait and save its token
+        stop.set()
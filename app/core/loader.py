@@ -0,0 +1,139 @@
+from app.config import logger, items_collection
+from app.core.message_store import message_store
+from app.core.user_cards import load_user_cards, user_card_cache
+from bson import ObjectId
+import asyncio
+
+ITEM_FIELDS = {
+    "title": 1,
+    "price": 1,
+    "images": 1,
+    "condition": 1,
+    "category": 1,
+    "status": 1,
+    "seller_id": 1,
+}
+
+
+class BatchLoader:
+    """Coalesces lookups made while handling one request into batched queries.
+
+    Every ``load`` issued before the event loop gets back to the loader is
+    collected and resolved by a single call to ``batch_fn`` (run in a thread),
+    which receives the distinct keys and returns a dict of key -> value. Results,
+    including misses (None), are memoized for the lifetime of the loader, so a
+    loader must not outlive the request it was created for.
+
+    With a ``cache``, keys are looked up there first (by ``str(key)``, in one
+    batched read) and only the misses are queried; the values loaded are written
+    back in one batch for later requests. Cached values must be JSON-safe so any
+    cache backend can hold them.
+    """
+
+    def __init__(self, name: str, batch_fn, key_fn=None, cache=None):
+        self.name = name
+        self.batch_fn = batch_fn
+        self.key_fn = key_fn
+        self.cache = cache
+        # key -> Future resolved with the loaded value
+        self.futures = {}
+        self.queue = []
+        self.dispatch_scheduled = False
+
+    async def load(self, key):
+        if self.key_fn is not None:
+            key = self.key_fn(key)
+        future = self.futures.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self.futures[key] = future
+            self.queue.append(key)
+            if not self.dispatch_scheduled:
+                self.dispatch_scheduled = True
+                loop.create_task(self._dispatch())
+        return await future
+
+    async def load_many(self, keys):
+        return await asyncio.gather(*(self.load(key) for key in keys))
+
+    def prime(self, key, value):
+        """Seed a value already fetched elsewhere, so it is not queried again."""
+        if self.key_fn is not None:
+            key = self.key_fn(key)
+        if key not in self.futures:
+            future = asyncio.get_running_loop().create_future()
+            future.set_result(value)
+            self.futures[key] = future
+
+    async def _dispatch(self):
+        # Let every coroutine started in the same tick enqueue its keys first
+        await asyncio.sleep(0)
+        keys, self.queue = self.queue, []
+        self.dispatch_scheduled = False
+        if self.cache is not None:
+            cached = await self.cache.get_many_async([str(key) for key in keys])
+            missing = []
+            for key in keys:
+                value = cached.get(str(key))
+                if value is None:
+                    missing.append(key)
+                else:
+                    self.futures[key].set_result(value)
+            keys = missing
+            if not keys:
+                return
+        try:
+            values = await asyncio.to_thread(self.batch_fn, keys)
+        except Exception as e:
+            logger.error(f"Batch load of {len(keys)} {self.name} failed: {str(e)}")
+            for key in keys:
+                # Forget the failure so a later load can retry it
+                future = self.futures.pop(key)
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for key in keys:
+            future = self.futures[key]
+            if not future.done():
+                future.set_result(values.get(key))
+        if self.cache is not None:
+            await self.cache.set_many_async(
+                {str(key): values[key] for key in keys if values.get(key) is not None}
+            )
+
+
+def _to_object_id(value):
+    return value if isinstance(value, ObjectId) else ObjectId(value)
+
+
+def batch_find(collection, projection):
+    def load(ids):
+        return {
+            doc["_id"]: doc
+            for doc in collection.find({"_id": {"$in": ids}}, projection)
+        }
+
+    return load
+
+
+class Loaders:
+    """The set of batch loaders shared by everything serving one request."""
+
+    def __init__(self):
+        # User display cards, shared across requests through user_card_cache
+        self.users = BatchLoader(
+            "users", load_user_cards, _to_object_id, cache=user_card_cache
+        )
+        self.items = BatchLoader(
+            "items", batch_find(items_collection, ITEM_FIELDS), _to_object_id
+        )
+        # Newest message of conversations written before last_message existed
+        self.latest_messages = BatchLoader(
+            "latest messages", message_store.latest, _to_object_id
+        )
+
+
+# Dependency that gives each request its own loaders (and memo)
+def get_loaders() -> Loaders:
+    return Loaders()
@@ -0,0 +1,79 @@
+from app.config import conversations_collection
+from app.core.cache import cache_is_shared, create_cache
+from app.core.invalidation import invalidation_bus
+from app.core.negative_cache import missing_conversations
+from bson import ObjectId
+import asyncio
+
+# Participants never change and statuses only change through admin endpoints,
+# which invalidate, so entries can live long when the invalidation reaches every
+# worker (a shared cache or the change stream). Otherwise they expire quickly.
+MEMBERSHIP_TTL = 3600  # seconds
+MEMBERSHIP_LOCAL_TTL = 30  # seconds
+MEMBERSHIP_MAX_ENTRIES = 50000
+
+# Messages cannot be sent to conversations an admin has closed
+CLOSED_STATUSES = {"blocked", "deleted"}
+
+# Cache for conversation membership (key: conversation_id,
+# value: {"seller_id", "buyer_id", "status"})
+membership_cache = create_cache(
+    "conversation_members", max_entries=MEMBERSHIP_MAX_ENTRIES, ttl=MEMBERSHIP_TTL
+)
+
+
+def build_membership(conversation: dict) -> dict:
+    return {
+        "seller_id": str(conversation["seller_id"]),
+        "buyer_id": str(conversation["buyer_id"]),
+        "status": conversation.get("status"),
+    }
+
+
+def membership_ttl() -> float:
+    if cache_is_shared() or invalidation_bus.streaming:
+        return MEMBERSHIP_TTL
+    return MEMBERSHIP_LOCAL_TTL
+
+
+async def cache_membership(conversation: dict):
+    await membership_cache.set_async(
+        str(conversation["_id"]), build_membership(conversation), ttl=membership_ttl()
+    )
+
+
+# Membership of a conversation, or None if it does not exist
+async def get_membership(conversation_id: str):
+    membership = await membership_cache.get_async(conversation_id)
+    if membership is not None:
+        return membership
+    if await missing_conversations.is_missing(conversation_id):
+        return None
+    conversation = await asyncio.to_thread(
+        conversations_collection.find_one,
+        {"_id": ObjectId(conversation_id)},
+        {"seller_id": 1, "buyer_id": 1, "status": 1},
+    )
+    if conversation is None:
+        await missing_conversations.mark_missing(conversation_id)
+        return None
+    membership = build_membership(conversation)
+    await membership_cache.set_async(conversation_id, membership, ttl=membership_ttl())
+    return membership
+
+
+# Call after a conversation's status changes or it is deleted
+async def invalidate_membership(conversation_id):
+    await membership_cache.delete_async(str(conversation_id))
+
+
+async def _on_conversation_change(event):
+    if event.operation != "update" or event.fields & {
+        "status",
+        "seller_id",
+        "buyer_id",
+    }:
+        await invalidate_membership(event.document_id)
+
+
+invalidation_bus.subscribe("conversations", _on_conversation_change)
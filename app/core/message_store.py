@@ -0,0 +1,439 @@
+from app.config import (
+    logger,
+    settings,
+    messages_collection,
+    message_buckets_collection,
+)
+from app.core.write_batcher import WriteBatcher
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+import asyncio
+import re
+
+# Messages per bucket document in the bucketed layout
+BUCKET_SIZE = 100
+
+_TEXT_SCORE = {"$meta": "textScore"}
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def _sort_key(message: dict):
+    return (message["created_at"], message["_id"])
+
+
+def search_terms(text: str) -> list:
+    return _WORD.findall((text or "").lower())
+
+
+# Cheap stand-in for the text index's stemming: a word matches a term when it
+# shares the term's stem-length prefix ("calculators" matches "calculator")
+def matches_terms(message_text: str, terms: list) -> bool:
+    words = search_terms(message_text)
+    return any(
+        word.startswith(term[: max(3, len(term) - 2)])
+        for term in terms
+        for word in words
+    )
+
+
+class MessageStore:
+    """Storage for chat messages, independent of the document layout.
+
+    Message dicts going in and out always have the shape of a `messages`
+    document: _id, conversation_id, sender_id, message, created_at, updated_at.
+    Subclasses set `collection` to the collection their documents live in.
+    """
+
+    collection = None
+
+    def insert(self, message: dict):
+        raise NotImplementedError
+
+    def insert_many(self, messages: list) -> dict:
+        """Insert messages in one round trip where the layout allows. Returns the
+        errors of the messages that failed (key: index in messages)."""
+        raise NotImplementedError
+
+    def find(self, conversation_id: ObjectId, message_id: ObjectId):
+        raise NotImplementedError
+
+    def count_after(self, conversation_id: ObjectId, created_at, exclude_sender):
+        """Count messages newer than created_at not sent by exclude_sender."""
+        raise NotImplementedError
+
+    def latest(self, conversation_ids: list) -> dict:
+        """Newest message of each conversation (key: conversation_id)."""
+        raise NotImplementedError
+
+    def since(self, conversation_ids: list, created_after, limit: int) -> list:
+        """Messages of the conversations created after created_after, oldest
+        first."""
+        raise NotImplementedError
+
+    def search(self, text: str, conversation_ids=None, skip: int = 0, limit: int = 20):
+        """Messages matching a full-text query, best match first, each with a
+        "score". Restricted to conversation_ids unless it is None."""
+        raise NotImplementedError
+
+    def reassign(self, from_conversation_ids: list, to_conversation_id: ObjectId):
+        self.collection.update_many(
+            {"conversation_id": {"$in": from_conversation_ids}},
+            {"$set": {"conversation_id": to_conversation_id}},
+        )
+
+    def delete_conversations(self, conversation_ids: list) -> int:
+        return self.collection.delete_many(
+            {"conversation_id": {"$in": conversation_ids}}
+        ).deleted_count
+
+    def scan_conversation_ids(self, after_id, limit: int):
+        """Conversation ids referenced by the next `limit` stored documents after
+        after_id (in _id order), and the _id to continue from (None at the end)."""
+        query = {} if after_id is None else {"_id": {"$gt": after_id}}
+        documents = list(
+            self.collection.find(query, {"conversation_id": 1})
+            .sort("_id", 1)
+            .limit(limit)
+        )
+        if not documents:
+            return set(), None
+        return {doc["conversation_id"] for doc in documents}, documents[-1]["_id"]
+
+    def _fetch(self, conversation_id, limit: int, anchor, direction: int) -> list:
+        """Up to limit + 1 messages past the anchor, in (created_at, _id) order
+        (newest first when direction is -1)."""
+        raise NotImplementedError
+
+    def page(self, conversation_id, limit: int, before=None, after=None):
+        """One page of messages, oldest first, anchored on a before/after cursor
+        (a message ID). Without a cursor the latest messages are returned.
+        Returns None if the cursor is not a message of the conversation."""
+        cursor_id = before or after
+        anchor = None
+        if cursor_id is not None:
+            anchor = self.find(conversation_id, ObjectId(cursor_id))
+            if anchor is None:
+                return None
+
+        direction = 1 if after else -1
+        messages = self._fetch(conversation_id, limit, anchor, direction)
+        has_more = len(messages) > limit
+        messages = messages[:limit]
+        if direction == -1:
+            messages.reverse()
+
+        return {
+            "messages": messages,
+            "cursors": {
+                "before": str(messages[0]["_id"]) if messages else before,
+                "after": str(messages[-1]["_id"]) if messages else after,
+                # A cursor page always has its anchor message on the other side
+                "has_more_before": has_more if direction == -1 else True,
+                "has_more_after": has_more if direction == 1 else before is not None,
+            },
+        }
+
+
+class DocumentMessageStore(MessageStore):
+    """One document per message in `messages`."""
+
+    collection = messages_collection
+
+    def insert(self, message: dict):
+        messages_collection.insert_one(message)
+
+    def insert_many(self, messages):
+        try:
+            messages_collection.insert_many(messages, ordered=False)
+        except BulkWriteError as e:
+            return {error["index"]: e for error in e.details.get("writeErrors", [])}
+        return {}
+
+    def find(self, conversation_id, message_id):
+        return messages_collection.find_one(
+            {"_id": message_id, "conversation_id": conversation_id}
+        )
+
+    def count_after(self, conversation_id, created_at, exclude_sender):
+        return messages_collection.count_documents(
+            {
+                "conversation_id": conversation_id,
+                "sender_id": {"$ne": exclude_sender},
+                "created_at": {"$gt": created_at},
+            }
+        )
+
+    def latest(self, conversation_ids):
+        pipeline = [
+            {"$match": {"conversation_id": {"$in": conversation_ids}}},
+            {"$sort": {"created_at": -1}},
+            {"$group": {"_id": "$conversation_id", "message": {"$first": "$$ROOT"}}},
+        ]
+        return {
+            row["_id"]: row["message"]
+            for row in messages_collection.aggregate(pipeline, allowDiskUse=True)
+        }
+
+    def since(self, conversation_ids, created_after, limit):
+        return list(
+            messages_collection.find(
+                {
+                    "conversation_id": {"$in": conversation_ids},
+                    "created_at": {"$gt": created_after},
+                }
+            )
+            .sort([("created_at", 1), ("_id", 1)])
+            .limit(limit)
+        )
+
+    def search(self, text, conversation_ids=None, skip=0, limit=20):
+        query = {"$text": {"$search": text}}
+        if conversation_ids is not None:
+            query["conversation_id"] = {"$in": conversation_ids}
+        return list(
+            messages_collection.find(query, {"score": _TEXT_SCORE})
+            .sort([("score", _TEXT_SCORE), ("created_at", -1)])
+            .skip(skip)
+            .limit(limit)
+        )
+
+    def _fetch(self, conversation_id, limit, anchor, direction):
+        query = {"conversation_id": conversation_id}
+        if anchor is not None:
+            op = "$lt" if direction == -1 else "$gt"
+            query["$or"] = [
+                {"created_at": {op: anchor["created_at"]}},
+                {"created_at": anchor["created_at"], "_id": {op: anchor["_id"]}},
+            ]
+        return list(
+            messages_collection.find(query)
+            .sort([("created_at", direction), ("_id", direction)])
+            .limit(limit + 1)
+        )
+
+
+class BucketedMessageStore(MessageStore):
+    """Messages grouped into per-conversation documents of up to BUCKET_SIZE.
+
+    Each bucket keeps first_at/last_at summaries of the messages it holds, so
+    the latest page of a conversation is usually one or two bucket reads.
+    Buckets of a conversation can overlap in time (a migration catching up
+    after new messages were appended, or late writes), so pages are merged
+    across every bucket that could hold one of their messages.
+    """
+
+    collection = message_buckets_collection
+
+    def _to_message(self, conversation_id, bucket_message: dict) -> dict:
+        return {**bucket_message, "conversation_id": conversation_id}
+
+    def insert(self, message: dict):
+        self._append(message["conversation_id"], [message])
+
+    def insert_many(self, messages):
+        # One append per conversation (and per bucket's worth of messages)
+        indexes_by_conversation = {}
+        for index, message in enumerate(messages):
+            indexes_by_conversation.setdefault(message["conversation_id"], []).append(
+                index
+            )
+        failures = {}
+        for conversation_id, indexes in indexes_by_conversation.items():
+            for start in range(0, len(indexes), BUCKET_SIZE):
+                chunk = indexes[start : start + BUCKET_SIZE]
+                try:
+                    self._append(conversation_id, [messages[i] for i in chunk])
+                except Exception as e:
+                    failures.update({index: e for index in chunk})
+        return failures
+
+    def _append(self, conversation_id, messages: list):
+        bucket_messages = [
+            {key: value for key, value in message.items() if key != "conversation_id"}
+            for message in messages
+        ]
+        room = BUCKET_SIZE - len(bucket_messages)
+        # Append to the newest bucket while it has room, otherwise open a new one
+        newest = message_buckets_collection.find_one(
+            {"conversation_id": conversation_id},
+            {"count": 1},
+            sort=[("last_at", -1)],
+        )
+        if newest is not None and newest["count"] <= room:
+            result = message_buckets_collection.update_one(
+                {"_id": newest["_id"], "count": {"$lte": room}},
+                {
+                    "$push": {"messages": {"$each": bucket_messages}},
+                    "$inc": {"count": len(bucket_messages)},
+                    "$min": {"first_at": min(m["created_at"] for m in bucket_messages)},
+                    "$max": {"last_at": max(m["created_at"] for m in bucket_messages)},
+                },
+            )
+            if result.modified_count:
+                return
+        message_buckets_collection.insert_one(
+            build_bucket(conversation_id, bucket_messages)
+        )
+
+    def find(self, conversation_id, message_id):
+        bucket = message_buckets_collection.find_one(
+            {"conversation_id": conversation_id, "messages._id": message_id},
+            {"messages": {"$elemMatch": {"_id": message_id}}},
+        )
+        if bucket is None:
+            return None
+        return self._to_message(conversation_id, bucket["messages"][0])
+
+    def count_after(self, conversation_id, created_at, exclude_sender):
+        pipeline = [
+            {
+                "$match": {
+                    "conversation_id": conversation_id,
+                    "last_at": {"$gt": created_at},
+                }
+            },
+            {"$unwind": "$messages"},
+            {
+                "$match": {
+                    "messages.created_at": {"$gt": created_at},
+                    "messages.sender_id": {"$ne": exclude_sender},
+                }
+            },
+            {"$count": "count"},
+        ]
+        rows = list(message_buckets_collection.aggregate(pipeline))
+        return rows[0]["count"] if rows else 0
+
+    def latest(self, conversation_ids):
+        pipeline = [
+            {"$match": {"conversation_id": {"$in": conversation_ids}}},
+            {"$sort": {"last_at": -1}},
+            {
+                "$group": {
+                    "_id": "$conversation_id",
+                    "messages": {"$first": "$messages"},
+                }
+            },
+        ]
+        return {
+            row["_id"]: self._to_message(
+                row["_id"], max(row["messages"], key=_sort_key)
+            )
+            for row in message_buckets_collection.aggregate(pipeline, allowDiskUse=True)
+            if row["messages"]
+        }
+
+    def since(self, conversation_ids, created_after, limit):
+        buckets = message_buckets_collection.find(
+            {
+                "conversation_id": {"$in": conversation_ids},
+                "last_at": {"$gt": created_after},
+            },
+            {"conversation_id": 1, "messages": 1},
+        )
+        messages = [
+            self._to_message(bucket["conversation_id"], message)
+            for bucket in buckets
+            for message in bucket["messages"]
+            if message["created_at"] > created_after
+        ]
+        messages.sort(key=_sort_key)
+        return messages[:limit]
+
+    def search(self, text, conversation_ids=None, skip=0, limit=20):
+        # The text index finds buckets; the matching messages are picked out of each
+        query = {"$text": {"$search": text}}
+        if conversation_ids is not None:
+            query["conversation_id"] = {"$in": conversation_ids}
+        terms = search_terms(text)
+        results = []
+        buckets = message_buckets_collection.find(
+            query, {"score": _TEXT_SCORE, "conversation_id": 1, "messages": 1}
+        ).sort([("score", _TEXT_SCORE), ("last_at", -1)])
+        for bucket in buckets:
+            for message in sorted(bucket["messages"], key=_sort_key, reverse=True):
+                if matches_terms(message.get("message", ""), terms):
+                    results.append(
+                        {
+                            **self._to_message(bucket["conversation_id"], message),
+                            "score": bucket["score"],
+                        }
+                    )
+            if len(results) >= skip + limit:
+                break
+        return results[skip : skip + limit]
+
+    def _fetch(self, conversation_id, limit, anchor, direction):
+        query = {"conversation_id": conversation_id}
+        if direction == -1:
+            sort = [("last_at", -1)]
+            if anchor is not None:
+                query["first_at"] = {"$lte": anchor["created_at"]}
+        else:
+            sort = [("first_at", 1)]
+            if anchor is not None:
+                query["last_at"] = {"$gte": anchor["created_at"]}
+
+        collected = []
+        for bucket in message_buckets_collection.find(query).sort(sort):
+            # Buckets come in order of their nearest edge, so once a full page is
+            # collected, a bucket starting beyond its last message (and every
+            # bucket after it) cannot contribute
+            if len(collected) > limit:
+                boundary = collected[limit]["created_at"]
+                if direction == -1 and bucket["last_at"] < boundary:
+                    break
+                if direction == 1 and bucket["first_at"] > boundary:
+                    break
+            messages = bucket["messages"]
+            if anchor is not None and direction == -1:
+                messages = [m for m in messages if _sort_key(m) < _sort_key(anchor)]
+            elif anchor is not None:
+                messages = [m for m in messages if _sort_key(m) > _sort_key(anchor)]
+            collected.extend(messages)
+            collected.sort(key=_sort_key, reverse=direction == -1)
+        return [
+            self._to_message(conversation_id, message)
+            for message in collected[: limit + 1]
+        ]
+
+
+def build_bucket(conversation_id, bucket_messages: list) -> dict:
+    return {
+        "conversation_id": conversation_id,
+        "count": len(bucket_messages),
+        "first_at": min(message["created_at"] for message in bucket_messages),
+        "last_at": max(message["created_at"] for message in bucket_messages),
+        "messages": bucket_messages,
+    }
+
+
+def create_message_store() -> MessageStore:
+    if settings.MESSAGE_STORE == "bucketed":
+        return BucketedMessageStore()
+    if settings.MESSAGE_STORE != "document":
+        logger.warning(
+            f"Unknown MESSAGE_STORE {settings.MESSAGE_STORE}, using document storage"
+        )
+    return DocumentMessageStore()
+
+
+# Global message store instance
+message_store = create_message_store()
+
+
+# Concurrent sends are group-committed into one insert when MESSAGE_BATCHING is on
+message_batcher = WriteBatcher(
+    "messages",
+    message_store.insert_many,
+    settings.MESSAGE_BATCH_WINDOW_MS / 1000,
+    settings.MESSAGE_BATCH_SIZE,
+)
+
+
+# Insert one message from a request handler, returning its id
+async def insert_message(message: dict):
+    if settings.MESSAGE_BATCHING:
+        return await message_batcher.submit(message)
+    await asyncio.to_thread(message_store.insert, message)
+    return message["_id"]
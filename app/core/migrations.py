@@ -0,0 +1,244 @@
+from app.config import (
+    logger,
+    conversations_collection,
+    messages_collection,
+    message_buckets_collection,
+    inbox_collection,
+    user_collection,
+)
+from app.core.message_store import BUCKET_SIZE, build_bucket, message_store
+from app.core.inbox import (
+    inbox_entry_updates,
+    mark_inbox_ready,
+    remove_from_inbox,
+    touch_inbox,
+)
+from app.schemas.message_schema import build_last_message
+from bson import ObjectId
+from pymongo import UpdateOne
+
+
+# Denormalize last_message onto conversations created before it was maintained on
+# write. Read state for those conversations is unknown, so unread starts at zero.
+def backfill_conversation_summaries(batch_size: int = 500) -> int:
+    updated = 0
+    while True:
+        batch = list(
+            conversations_collection.find(
+                {"last_message": {"$exists": False}}, {"_id": 1}
+            ).limit(batch_size)
+        )
+        if not batch:
+            break
+        conversation_ids = [conv["_id"] for conv in batch]
+        latest = message_store.latest(conversation_ids)
+        operations = []
+        for conversation_id in conversation_ids:
+            message = latest.get(conversation_id)
+            last_message = build_last_message(message) if message else None
+            # A message sent since the find already set last_message and unread
+            operations.append(
+                UpdateOne(
+                    {"_id": conversation_id, "last_message": {"$exists": False}},
+                    {"$set": {"last_message": last_message, "unread": {}}},
+                )
+            )
+        result = conversations_collection.bulk_write(operations, ordered=False)
+        updated += result.modified_count
+    if updated:
+        logger.info(f"Backfilled last_message on {updated} conversations")
+    return updated
+
+
+# Recompute every user's unread_total from the per-conversation unread counters,
+# repairing any drift in the incrementally maintained totals
+def rebuild_unread_totals() -> dict:
+    pipeline = [
+        {"$match": {"unread": {"$exists": True}}},
+        {"$project": {"unread": {"$objectToArray": "$unread"}}},
+        {"$unwind": "$unread"},
+        {"$group": {"_id": "$unread.k", "total": {"$sum": "$unread.v"}}},
+    ]
+    totals = {
+        ObjectId(row["_id"]): row["total"]
+        for row in conversations_collection.aggregate(pipeline, allowDiskUse=True)
+    }
+    operations = [
+        UpdateOne({"_id": user_id}, {"$set": {"unread_total": total}})
+        for user_id, total in totals.items()
+    ]
+    if operations:
+        user_collection.bulk_write(operations, ordered=False)
+    reset = user_collection.update_many(
+        {"_id": {"$nin": list(totals)}, "unread_total": {"$nin": [0, None]}},
+        {"$set": {"unread_total": 0}},
+    )
+    logger.info(f"Rebuilt unread totals for {len(operations)} users")
+    return {"users_updated": len(operations), "users_reset": reset.modified_count}
+
+
+# Fold duplicate threads for the same (item, buyer, seller) into the oldest one,
+# so the unique conversation key can be built. Messages are moved over and the
+# unread counters summed; the newest last_message wins.
+def merge_duplicate_conversations() -> int:
+    pipeline = [
+        {
+            "$group": {
+                "_id": {
+                    "item_id": "$item_id",
+                    "buyer_id": "$buyer_id",
+                    "seller_id": "$seller_id",
+                },
+                "ids": {"$push": "$_id"},
+                "count": {"$sum": 1},
+            }
+        },
+        {"$match": {"count": {"$gt": 1}}},
+    ]
+    merged = 0
+    for group in list(conversations_collection.aggregate(pipeline, allowDiskUse=True)):
+        # ObjectIds are generated in creation order, so the first is the oldest
+        conversations = list(
+            conversations_collection.find({"_id": {"$in": group["ids"]}}).sort("_id", 1)
+        )
+        keep, duplicates = conversations[0], conversations[1:]
+        duplicate_ids = [conv["_id"] for conv in duplicates]
+
+        unread = {}
+        for conv in conversations:
+            for user_id, count in (conv.get("unread") or {}).items():
+                unread[user_id] = unread.get(user_id, 0) + count
+        last_messages = [
+            conv["last_message"] for conv in conversations if conv.get("last_message")
+        ]
+        update = {"unread": unread}
+        updated_at = [
+            conv["updated_at"] for conv in conversations if conv.get("updated_at")
+        ]
+        if updated_at:
+            update["updated_at"] = max(updated_at)
+        if last_messages:
+            update["last_message"] = max(
+                last_messages, key=lambda message: message["created_at"]
+            )
+
+        message_store.reassign(duplicate_ids, keep["_id"])
+        conversations_collection.update_one({"_id": keep["_id"]}, {"$set": update})
+        conversations_collection.delete_many({"_id": {"$in": duplicate_ids}})
+        remove_from_inbox(duplicate_ids)
+        if updated_at:
+            touch_inbox(keep["_id"], update["updated_at"])
+        merged += len(duplicate_ids)
+    if merged:
+        logger.info(f"Merged {merged} duplicate conversations")
+    return merged
+
+
+# Copy messages from the per-message `messages` collection into bucket documents.
+# Progress is recorded per conversation (messages_bucketed_through), so the
+# migration can be stopped and re-run: each run only copies messages newer than
+# the last one bucketed. Run it, switch MESSAGE_STORE to "bucketed", then run it
+# once more to pick up messages sent in between. Source documents are kept so
+# the switch can be rolled back.
+def migrate_messages_to_buckets(batch_size: int = 200) -> dict:
+    conversations_migrated = 0
+    messages_migrated = 0
+    last_id = None
+    while True:
+        query = {} if last_id is None else {"_id": {"$gt": last_id}}
+        batch = list(
+            conversations_collection.find(query, {"messages_bucketed_through": 1})
+            .sort("_id", 1)
+            .limit(batch_size)
+        )
+        if not batch:
+            break
+        last_id = batch[-1]["_id"]
+        for conversation in batch:
+            message_query = {"conversation_id": conversation["_id"]}
+            through = conversation.get("messages_bucketed_through")
+            if through:
+                message_query["$or"] = [
+                    {"created_at": {"$gt": through["created_at"]}},
+                    {
+                        "created_at": through["created_at"],
+                        "_id": {"$gt": through["_id"]},
+                    },
+                ]
+            messages = list(
+                messages_collection.find(message_query).sort(
+                    [("created_at", 1), ("_id", 1)]
+                )
+            )
+            if not messages:
+                continue
+            buckets = [
+                build_bucket(
+                    conversation["_id"],
+                    [
+                        {
+                            key: value
+                            for key, value in message.items()
+                            if key != "conversation_id"
+                        }
+                        for message in messages[start : start + BUCKET_SIZE]
+                    ],
+                )
+                for start in range(0, len(messages), BUCKET_SIZE)
+            ]
+            message_buckets_collection.insert_many(buckets, ordered=True)
+            conversations_collection.update_one(
+                {"_id": conversation["_id"]},
+                {
+                    "$set": {
+                        "messages_bucketed_through": {
+                            "_id": messages[-1]["_id"],
+                            "created_at": messages[-1]["created_at"],
+                        }
+                    }
+                },
+            )
+            conversations_migrated += 1
+            messages_migrated += len(messages)
+    logger.info(
+        f"Bucketed {messages_migrated} messages from {conversations_migrated} conversations"
+    )
+    return {
+        "conversations_migrated": conversations_migrated,
+        "messages_migrated": messages_migrated,
+    }
+
+
+# Build the per-user inbox entries for conversations created before the inbox
+# collection was maintained on write. Conversations are flagged once indexed, and
+# inbox reads switch over to the index when every one is.
+def backfill_inbox(batch_size: int = 500) -> int:
+    indexed = 0
+    while True:
+        batch = list(
+            conversations_collection.find(
+                {"inbox_indexed": {"$ne": True}},
+                {"seller_id": 1, "buyer_id": 1, "status": 1, "updated_at": 1},
+            ).limit(batch_size)
+        )
+        if not batch:
+            break
+        operations = []
+        for conversation in batch:
+            operations.extend(
+                inbox_entry_updates(
+                    conversation,
+                    conversation.get("updated_at")
+                    or conversation["_id"].generation_time.replace(tzinfo=None),
+                )
+            )
+        inbox_collection.bulk_write(operations, ordered=False)
+        conversations_collection.update_many(
+            {"_id": {"$in": [conversation["_id"] for conversation in batch]}},
+            {"$set": {"inbox_indexed": True}},
+        )
+        indexed += len(batch)
+    mark_inbox_ready()
+    if indexed:
+        logger.info(f"Backfilled inbox entries for {indexed} conversations")
+    return indexed
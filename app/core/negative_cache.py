@@ -0,0 +1,42 @@
+from app.core.cache import create_cache
+from app.core.invalidation import invalidation_bus
+
+# Ids are generated on insert, so a missing id almost never appears later; the
+# short TTL only bounds a lookup racing the insert of that very id
+NEGATIVE_TTL = 60  # seconds
+NEGATIVE_MAX_ENTRIES = 10000
+
+
+class NegativeCache:
+    """Remembers ids looked up and not found, so repeated misses (stale links to
+    deleted listings, users or conversations) skip the database.
+
+    Creating an entity must ``forget`` its id; inserts seen on the change stream
+    do so for every worker.
+    """
+
+    def __init__(self, collection: str):
+        self.cache = create_cache(
+            f"missing_{collection}",
+            max_entries=NEGATIVE_MAX_ENTRIES,
+            ttl=NEGATIVE_TTL,
+        )
+        invalidation_bus.subscribe(collection, self._on_change)
+
+    async def is_missing(self, entity_id) -> bool:
+        return await self.cache.get_async(str(entity_id)) is not None
+
+    async def mark_missing(self, entity_id):
+        await self.cache.set_async(str(entity_id), True)
+
+    async def forget(self, entity_id):
+        await self.cache.delete_async(str(entity_id))
+
+    async def _on_change(self, event):
+        if event.operation in ("insert", "replace"):
+            await self.forget(event.document_id)
+
+
+missing_items = NegativeCache("items")
+missing_users = NegativeCache("users")
+missing_conversations = NegativeCache("conversations")
@@ -0,0 +1,23 @@
+from bson import ObjectId
+from fastapi.responses import ORJSONResponse
+import orjson
+
+
+def _encode_default(value):
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+class JSONResponse(ORJSONResponse):
+    """orjson-encoded response that also understands ObjectId.
+
+    datetimes are encoded natively. It is the app's default response class;
+    hot endpoints return it directly, which also skips FastAPI's
+    jsonable_encoder pass over the content.
+    """
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(
+            content, default=_encode_default, option=orjson.OPT_NON_STR_KEYS
+        )
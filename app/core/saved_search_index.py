@@ -0,0 +1,165 @@
+from app.config import logger, saved_searches_collection
+from app.core.invalidation import invalidation_bus
+from collections import defaultdict
+import asyncio
+import re
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+# Saved searches written by other workers arrive on the change stream; a full
+# reload this often (seconds) catches up when there is none
+SAVED_SEARCH_RELOAD_INTERVAL = 300
+
+
+def tokenize(text: str):
+    return _TOKEN_PATTERN.findall((text or "").lower())
+
+
+class SavedSearchIndex:
+    """Reverse (percolator-style) index of saved searches.
+
+    Each saved search is stored under a single key: its longest search token,
+    else each of its categories, else the match-all bucket. Matching a new item
+    only looks up the buckets for the item's title token prefixes and category,
+    then verifies the full filter on that small candidate set.
+    """
+
+    def __init__(self):
+        self.searches = {}
+        self.by_token = defaultdict(set)
+        self.by_category = defaultdict(set)
+        self.match_all = set()
+
+    def _keys(self, search: dict):
+        tokens = search["tokens"]
+        if tokens:
+            return [("token", max(tokens, key=len))]
+        if search["categories"]:
+            return [("category", category) for category in search["categories"]]
+        return [("all", None)]
+
+    def _bucket(self, kind, key):
+        if kind == "token":
+            return self.by_token[key]
+        if kind == "category":
+            return self.by_category[key]
+        return self.match_all
+
+    def add(self, saved_search: dict):
+        search_id = str(saved_search["_id"])
+        self.remove(search_id)
+        search = {
+            "id": search_id,
+            "user_id": str(saved_search["user_id"]),
+            "tokens": tokenize(saved_search.get("search")),
+            "categories": set(saved_search.get("category") or []),
+            "min_price": saved_search.get("min_price"),
+            "max_price": saved_search.get("max_price"),
+        }
+        self.searches[search_id] = search
+        for kind, key in self._keys(search):
+            self._bucket(kind, key).add(search_id)
+
+    def remove(self, search_id: str):
+        search = self.searches.pop(str(search_id), None)
+        if search is None:
+            return
+        for kind, key in self._keys(search):
+            bucket = self._bucket(kind, key)
+            bucket.discard(search["id"])
+            if not bucket and kind == "token":
+                self.by_token.pop(key, None)
+            elif not bucket and kind == "category":
+                self.by_category.pop(key, None)
+
+    def load(self, saved_searches):
+        self.__init__()
+        for saved_search in saved_searches:
+            self.add(saved_search)
+
+    def _verify(self, search: dict, item: dict, title_tokens) -> bool:
+        if search["user_id"] == str(item.get("seller_id")):
+            return False
+        if search["categories"] and item.get("category") not in search["categories"]:
+            return False
+        price = item.get("price")
+        if search["min_price"] is not None and (
+            price is None or price < search["min_price"]
+        ):
+            return False
+        if search["max_price"] is not None and (
+            price is None or price > search["max_price"]
+        ):
+            return False
+        # Every search token must be a prefix of some title token
+        return all(
+            any(title_token.startswith(token) for title_token in title_tokens)
+            for token in search["tokens"]
+        )
+
+    def match(self, item: dict):
+        """Return the saved searches (as index entries) that match a new item."""
+        title_tokens = tokenize(item.get("title"))
+        candidates = set(self.match_all)
+        candidates.update(self.by_category.get(item.get("category"), ()))
+        for title_token in set(title_tokens):
+            for end in range(1, len(title_token) + 1):
+                candidates.update(self.by_token.get(title_token[:end], ()))
+        return [
+            self.searches[search_id]
+            for search_id in candidates
+            if self._verify(self.searches[search_id], item, title_tokens)
+        ]
+
+
+def build_saved_search_index() -> SavedSearchIndex:
+    index = SavedSearchIndex()
+    index.load(saved_searches_collection.find({}))
+    return index
+
+
+# Swap a freshly built index in; call on the event loop thread so no match sees
+# half of it
+def install_saved_search_index(index: SavedSearchIndex):
+    saved_search_index.searches = index.searches
+    saved_search_index.by_token = index.by_token
+    saved_search_index.by_category = index.by_category
+    saved_search_index.match_all = index.match_all
+    logger.info(f"Loaded {len(index.searches)} saved searches into the index")
+
+
+def load_saved_search_index():
+    install_saved_search_index(build_saved_search_index())
+
+
+# Global saved search index instance
+saved_search_index = SavedSearchIndex()
+
+
+# Keep the index in step with saved searches written by other workers
+async def _on_saved_search_change(event):
+    if event.operation == "delete":
+        saved_search_index.remove(str(event.document_id))
+    elif event.operation == "insert":
+        saved_search_index.add(event.document)
+    else:
+        saved_search = await asyncio.to_thread(
+            saved_searches_collection.find_one, {"_id": event.document_id}
+        )
+        if saved_search is None:
+            saved_search_index.remove(str(event.document_id))
+        else:
+            saved_search_index.add(saved_search)
+
+
+invalidation_bus.subscribe("saved_searches", _on_saved_search_change)
+
+
+async def saved_search_reload_worker():
+    """Background loop that periodically rebuilds the index from the database."""
+    while True:
+        await asyncio.sleep(SAVED_SEARCH_RELOAD_INTERVAL)
+        try:
+            index = await asyncio.to_thread(build_saved_search_index)
+            install_saved_search_index(index)
+        except Exception as e:
+            logger.error(f"Saved search reload error: {str(e)}")
@@ -0,0 +1,42 @@
+from app.config import logger
+import asyncio
+
+
+class SingleFlight:
+    """Coalesces concurrent computations of the same key.
+
+    While a computation for a key is in flight, every other caller asking for
+    that key awaits it instead of starting its own, and all of them get its
+    result (or its exception). Nothing is remembered once it finishes; caching
+    the result is up to the caller.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        # key -> Future of the in-flight computation
+        self.flights = {}
+
+    async def do(self, key, fn):
+        """Await fn() (a coroutine function), sharing it with concurrent callers."""
+        # A caller that is cancelled must not cancel the computation for the others
+        return await asyncio.shield(self._start(key, fn))
+
+    def refresh(self, key, fn):
+        """Start fn() in the background unless it is already in flight."""
+        self._start(key, fn)
+
+    def _start(self, key, fn):
+        future = self.flights.get(key)
+        if future is None:
+            future = asyncio.ensure_future(fn())
+            self.flights[key] = future
+            future.add_done_callback(lambda done: self._finish(key, done))
+        return future
+
+    def _finish(self, key, future):
+        if self.flights.get(key) is future:
+            del self.flights[key]
+        if not future.cancelled() and future.exception() is not None:
+            logger.error(
+                f"{self.name} computation for {key} failed: {str(future.exception())}"
+            )
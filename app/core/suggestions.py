@@ -0,0 +1,202 @@
+from app.config import logger, items_collection
+from app.core.invalidation import invalidation_bus
+from collections import Counter
+import asyncio
+import bisect
+import re
+
+# Maximum number of index entries inspected per lookup before ranking
+MAX_SCAN = 500
+# An inquiry says more about interest in an item than a view does
+INQUIRY_WEIGHT = 10
+
+SUGGESTION_FIELDS = {
+    "title": 1,
+    "category": 1,
+    "status": 1,
+    "inquiry_count": 1,
+    "view_count": 1,
+}
+
+# Fields whose changes only move an item in the ranking
+POPULARITY_FIELDS = {"inquiry_count": 1, "view_count": 1}
+
+_WORD_START = re.compile(r"(?:^|(?<=[^a-z0-9]))[a-z0-9]")
+
+
+def _normalize(text: str) -> str:
+    return " ".join((text or "").lower().split())
+
+
+def _item_popularity(item: dict) -> float:
+    return item.get("inquiry_count", 0) * INQUIRY_WEIGHT + item.get("view_count", 0)
+
+
+class SuggestionIndex:
+    """In-memory prefix index over active item titles and categories.
+
+    Every title is indexed once per word start, so "calc" matches both
+    "Calculator" and "TI-84 Calculator". Keys live in a sorted list and are
+    looked up with bisect; matching entries are ranked by popularity.
+    """
+
+    def __init__(self):
+        # Sorted list of (key, entry_id) tuples
+        self.keys = []
+        # entry_id -> {"type", "id", "text", "keys", ...}
+        self.entries = {}
+        self.category_counts = Counter()
+        # While bulk loading, keys are appended and sorted once at the end
+        self.loading = False
+
+    def _insert_keys(self, entry_id, keys):
+        if self.loading:
+            self.keys.extend((key, entry_id) for key in keys)
+            return
+        for key in keys:
+            bisect.insort(self.keys, (key, entry_id))
+
+    def _remove_keys(self, entry_id, keys):
+        for key in keys:
+            index = bisect.bisect_left(self.keys, (key, entry_id))
+            if index < len(self.keys) and self.keys[index] == (key, entry_id):
+                del self.keys[index]
+
+    def _adjust_category(self, category: str, delta: int):
+        if not category:
+            return
+        key = _normalize(category)
+        entry_id = f"category:{key}"
+        self.category_counts[key] += delta
+        if self.category_counts[key] <= 0:
+            del self.category_counts[key]
+            if self.entries.pop(entry_id, None) is not None:
+                self._remove_keys(entry_id, [key])
+        elif entry_id not in self.entries:
+            self.entries[entry_id] = {
+                "type": "category",
+                "id": None,
+                "text": category,
+                "keys": [key],
+            }
+            self._insert_keys(entry_id, [key])
+
+    def _popularity(self, entry) -> float:
+        if entry["type"] == "category":
+            return self.category_counts[_normalize(entry["text"])]
+        return entry.get("popularity", 0)
+
+    def upsert_item(self, item: dict):
+        """Add or refresh an item; inactive items are removed from the index."""
+        item_id = str(item["_id"])
+        self.remove_item(item_id)
+        if item.get("status", "active") != "active" or not item.get("title"):
+            return
+        title = _normalize(item["title"])
+        keys = sorted({title[match.start() :] for match in _WORD_START.finditer(title)})
+        entry_id = f"item:{item_id}"
+        self.entries[entry_id] = {
+            "type": "item",
+            "id": item_id,
+            "text": item["title"],
+            "category": item.get("category"),
+            "popularity": _item_popularity(item),
+            "keys": keys,
+        }
+        self._insert_keys(entry_id, keys)
+        self._adjust_category(item.get("category"), 1)
+
+    def adjust_popularity(self, item_id: str, delta: float):
+        """Add to an indexed item's popularity without re-indexing its title."""
+        entry = self.entries.get(f"item:{item_id}")
+        if entry is not None:
+            entry["popularity"] += delta
+
+    def set_popularity(self, item: dict):
+        """Reset an indexed item's popularity from its stored counters."""
+        entry = self.entries.get(f"item:{item['_id']}")
+        if entry is not None:
+            entry["popularity"] = _item_popularity(item)
+
+    def remove_item(self, item_id: str):
+        entry_id = f"item:{item_id}"
+        entry = self.entries.pop(entry_id, None)
+        if entry is None:
+            return
+        self._remove_keys(entry_id, entry["keys"])
+        self._adjust_category(entry.get("category"), -1)
+
+    def suggest(self, prefix: str, limit: int = 8):
+        prefix = _normalize(prefix)
+        if not prefix:
+            return []
+        start = bisect.bisect_left(self.keys, (prefix,))
+        seen = set()
+        matches = []
+        for key, entry_id in self.keys[start : start + MAX_SCAN]:
+            if not key.startswith(prefix):
+                break
+            if entry_id in seen:
+                continue
+            seen.add(entry_id)
+            entry = self.entries[entry_id]
+            matches.append(
+                {
+                    "type": entry["type"],
+                    "id": entry["id"],
+                    "text": entry["text"],
+                    "score": self._popularity(entry),
+                }
+            )
+        matches.sort(key=lambda match: match["score"], reverse=True)
+        return matches[:limit]
+
+    def load(self, items):
+        self.__init__()
+        self.loading = True
+        for item in items:
+            self.upsert_item(item)
+        self.loading = False
+        self.keys.sort()
+
+
+def load_suggestion_index():
+    index = SuggestionIndex()
+    index.load(items_collection.find({"status": "active"}, SUGGESTION_FIELDS))
+    suggestion_index.keys = index.keys
+    suggestion_index.entries = index.entries
+    suggestion_index.category_counts = index.category_counts
+    logger.info(f"Loaded {len(index.entries)} entries into the suggestion index")
+
+
+# Global suggestion index instance
+suggestion_index = SuggestionIndex()
+
+
+# Keep the index in step with listings written by other workers
+async def _on_item_change(event):
+    if event.operation == "delete":
+        suggestion_index.remove_item(str(event.document_id))
+    elif event.operation == "insert":
+        suggestion_index.upsert_item(event.document)
+    elif event.operation == "replace" or event.fields & {"title", "category", "status"}:
+        item = await asyncio.to_thread(
+            items_collection.find_one, {"_id": event.document_id}, SUGGESTION_FIELDS
+        )
+        if item is None:
+            suggestion_index.remove_item(str(event.document_id))
+        else:
+            suggestion_index.upsert_item(item)
+    elif (
+        event.fields & POPULARITY_FIELDS.keys()
+        and f"item:{event.document_id}" in suggestion_index.entries
+    ):
+        # Counters written by any worker; the stored values replace local bumps
+        item = await asyncio.to_thread(
+            items_collection.find_one, {"_id": event.document_id}, POPULARITY_FIELDS
+        )
+        if item is not None:
+            suggestion_index.set_popularity(item)
+
+
+invalidation_bus.subscribe("items", _on_item_change)
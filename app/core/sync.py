@@ -0,0 +1,99 @@
+from app.config import (
+    conversations_collection,
+    inbox_collection,
+    items_collection,
+    tombstones_collection,
+)
+from app.core.inbox import inbox_ready
+from app.core.message_store import message_store
+from bson import ObjectId
+from datetime import datetime, timedelta, timezone
+
+# Sync versions are server timestamps in milliseconds. Each sync re-reads a
+# little before the client's version so writes that landed just behind it are
+# not missed; clients apply changes by id, so repeats are harmless.
+SYNC_OVERLAP = timedelta(seconds=2)
+# Older versions must resync in full; cascaded tombstones only live 30 days
+SYNC_MAX_AGE = timedelta(days=7)
+# Past this many changes of one kind a full resync is cheaper than a delta
+SYNC_LIMIT = 500
+
+
+def current_version() -> int:
+    return to_version(datetime.utcnow())
+
+
+def to_version(moment: datetime) -> int:
+    return int(moment.replace(tzinfo=timezone.utc).timestamp() * 1000)
+
+
+def from_version(version: int) -> datetime:
+    return datetime.fromtimestamp(version / 1000, timezone.utc).replace(tzinfo=None)
+
+
+def _limited(cursor) -> list:
+    return list(cursor.limit(SYNC_LIMIT + 1))
+
+
+def fetch_changes(user_id: str, version: int):
+    """Conversations, messages and items that changed after version, with the ids
+    deleted since. Returns None when the client has to resync in full."""
+    since = from_version(version)
+    # The inbox change log is incomplete until its backfill finishes
+    if since < datetime.utcnow() - SYNC_MAX_AGE or not inbox_ready():
+        return None
+    window = {"$gt": since - SYNC_OVERLAP}
+    user_object_id = ObjectId(user_id)
+
+    entries = _limited(
+        inbox_collection.find(
+            {"user_id": user_object_id, "changed_at": window},
+            {"conversation_id": 1, "status": 1},
+        )
+    )
+    items = _limited(items_collection.find({"updated_at": window}))
+    tombstones = _limited(
+        tombstones_collection.find(
+            {
+                "$or": [{"user_ids": user_object_id}, {"entity": "item"}],
+                "deleted_at": window,
+            },
+            {"entity": 1, "entity_id": 1},
+        )
+    )
+    if max(len(entries), len(items), len(tombstones)) > SYNC_LIMIT:
+        return None
+
+    deleted_conversations = {
+        entry["conversation_id"] for entry in entries if entry["status"] == "deleted"
+    }
+    deleted_items = {item["_id"] for item in items if item.get("status") == "removed"}
+    for tombstone in tombstones:
+        if tombstone["entity"] == "conversation":
+            deleted_conversations.add(tombstone["entity_id"])
+        elif tombstone["entity"] == "item":
+            deleted_items.add(tombstone["entity_id"])
+
+    conversation_ids = [
+        entry["conversation_id"]
+        for entry in entries
+        if entry["conversation_id"] not in deleted_conversations
+    ]
+    conversations, messages = [], []
+    if conversation_ids:
+        conversations = list(
+            conversations_collection.find({"_id": {"$in": conversation_ids}})
+        )
+        messages = message_store.since(
+            conversation_ids, since - SYNC_OVERLAP, SYNC_LIMIT + 1
+        )
+        if len(messages) > SYNC_LIMIT:
+            return None
+
+    return {
+        "conversations": conversations,
+        "messages": messages,
+        "items": [item for item in items if item["_id"] not in deleted_items],
+        "deleted_conversations": deleted_conversations,
+        "deleted_items": deleted_items,
+    }
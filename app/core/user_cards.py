@@ -0,0 +1,48 @@
+from app.config import user_collection
+from app.core.cache import create_cache
+from app.core.invalidation import invalidation_bus
+
+# Cards change only when a user signs in or edits their profile, and every such
+# write invalidates the card, so the TTL only bounds missed invalidations
+USER_CARD_TTL = 600  # seconds
+USER_CARD_MAX_ENTRIES = 20000
+
+USER_CARD_FIELDS = {"name": 1, "full_name": 1, "email": 1, "picture": 1, "rating": 1}
+
+# Cache for user display cards (key: user_id, value: card dict)
+user_card_cache = create_cache(
+    "user_cards", max_entries=USER_CARD_MAX_ENTRIES, ttl=USER_CARD_TTL
+)
+
+
+# The small, JSON-safe subset of a user embedded in responses
+def build_user_card(user: dict) -> dict:
+    return {
+        "_id": str(user["_id"]),
+        "name": user.get("name"),
+        "full_name": user.get("full_name"),
+        "email": user.get("email"),
+        "picture": user.get("picture"),
+        "rating": user.get("rating"),
+    }
+
+
+def load_user_cards(user_ids) -> dict:
+    return {
+        user["_id"]: build_user_card(user)
+        for user in user_collection.find({"_id": {"$in": user_ids}}, USER_CARD_FIELDS)
+    }
+
+
+# Call after any write that can change a user's name, email or picture
+async def invalidate_user_card(user_id):
+    await user_card_cache.delete_async(str(user_id))
+
+
+# Drop cards changed by writes that did not invalidate them (other services, shell)
+async def _on_user_change(event):
+    if event.operation != "update" or event.fields & USER_CARD_FIELDS.keys():
+        await invalidate_user_card(event.document_id)
+
+
+invalidation_bus.subscribe("users", _on_user_change)
@@ -0,0 +1,209 @@
+from app.config import logger, items_collection, item_views_collection
+from bson import ObjectId
+from pymongo import UpdateOne
+from collections import Counter, defaultdict
+from app.core.singleflight import SingleFlight
+from app.core.suggestions import suggestion_index
+from datetime import datetime, timedelta
+import asyncio
+import time
+
+# How often buffered view counts are flushed to Mongo (seconds)
+VIEW_FLUSH_INTERVAL = 10
+# Views are bucketed per hour; buckets older than this are ignored for trending
+TRENDING_WINDOW_HOURS = 48
+# A view loses half its trending weight after this many hours
+TRENDING_HALF_LIFE_HOURS = 6
+# Number of items kept in the cached ranking (overall and per category)
+TRENDING_SIZE = 50
+# How long the computed ranking is served from memory (seconds)
+TRENDING_CACHE_EXPIRY = 60
+
+# View counts buffered per worker until the next flush (key: item_id)
+pending_views = Counter()
+pending_categories = {}
+
+trending_cache = {"timestamp": 0, "items": [], "by_category": {}, "categories": []}
+trending_flight = SingleFlight("trending")
+
+
+def record_view(item_id: str, category: str = None):
+    """Count a view in memory; nothing is written until the next flush."""
+    pending_views[item_id] += 1
+    if category:
+        pending_categories[item_id] = category
+    suggestion_index.adjust_popularity(item_id, 1)
+
+
+def take_pending_views():
+    """Swap out the buffered counts; must run on the event loop, like record_view."""
+    global pending_views, pending_categories
+    views, categories = pending_views, pending_categories
+    pending_views, pending_categories = Counter(), {}
+    return views, categories
+
+
+def restore_pending_views(views, categories):
+    """Put counts from a failed flush back so they are retried on the next one."""
+    pending_views.update(views)
+    for item_id, category in categories.items():
+        pending_categories.setdefault(item_id, category)
+
+
+def write_views(views, categories):
+    """Write view counts as one bulk_write of $inc updates per collection."""
+    hour = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+    item_updates = []
+    bucket_updates = []
+    for item_id, count in views.items():
+        try:
+            object_id = ObjectId(item_id)
+        except Exception:
+            continue
+        item_updates.append(
+            UpdateOne({"_id": object_id}, {"$inc": {"view_count": count}})
+        )
+        bucket_updates.append(
+            UpdateOne(
+                {"item_id": object_id, "hour": hour},
+                {
+                    "$inc": {"views": count},
+                    "$setOnInsert": {"category": categories.get(item_id)},
+                },
+                upsert=True,
+            )
+        )
+    if item_updates:
+        items_collection.bulk_write(item_updates, ordered=False)
+        item_views_collection.bulk_write(bucket_updates, ordered=False)
+    logger.debug(f"Flushed views for {len(item_updates)} items")
+    return len(item_updates)
+
+
+async def flush_views():
+    views, categories = take_pending_views()
+    if not views:
+        return 0
+    try:
+        return await asyncio.to_thread(write_views, views, categories)
+    except Exception as e:
+        logger.error(f"Error flushing view counts: {str(e)}")
+        restore_pending_views(views, categories)
+        return 0
+
+
+def compute_trending():
+    """Compute time-decayed trending scores per item and per category."""
+    now = datetime.utcnow()
+    pipeline = [
+        {"$match": {"hour": {"$gte": now - timedelta(hours=TRENDING_WINDOW_HOURS)}}},
+        {
+            "$project": {
+                "item_id": 1,
+                "category": 1,
+                "score": {
+                    "$multiply": [
+                        "$views",
+                        {
+                            "$pow": [
+                                0.5,
+                                {
+                                    "$divide": [
+                                        {"$subtract": [now, "$hour"]},
+                                        TRENDING_HALF_LIFE_HOURS * 60 * 60 * 1000,
+                                    ]
+                                },
+                            ]
+                        },
+                    ]
+                },
+            }
+        },
+        {
+            "$group": {
+                "_id": "$item_id",
+                "category": {"$first": "$category"},
+                "score": {"$sum": "$score"},
+            }
+        },
+        {"$sort": {"score": -1}},
+    ]
+    scores = list(item_views_collection.aggregate(pipeline, allowDiskUse=True))
+
+    # Only active items are ranked; look them up in one $in query
+    candidate_ids = [row["_id"] for row in scores[: TRENDING_SIZE * 20]]
+    items = {
+        item["_id"]: item
+        for item in items_collection.find(
+            {"_id": {"$in": candidate_ids}, "status": "active"},
+            {
+                "title": 1,
+                "price": 1,
+                "images": 1,
+                "category": 1,
+                "condition": 1,
+                "seller_id": 1,
+                "view_count": 1,
+            },
+        )
+    }
+
+    ranked = []
+    by_category = defaultdict(list)
+    category_scores = Counter()
+    for row in scores:
+        category = row.get("category")
+        if category:
+            category_scores[category] += row["score"]
+        item = items.get(row["_id"])
+        if item is None:
+            continue
+        images = item.get("images") or []
+        card = {
+            "_id": str(item["_id"]),
+            "title": item.get("title", ""),
+            "price": item.get("price", 0),
+            "image": images[0] if images else "",
+            "category": item.get("category", ""),
+            "condition": item.get("condition", ""),
+            "seller_id": str(item.get("seller_id")),
+            "view_count": item.get("view_count", 0),
+            "score": round(row["score"], 4),
+        }
+        if len(ranked) < TRENDING_SIZE:
+            ranked.append(card)
+        if len(by_category[card["category"]]) < TRENDING_SIZE:
+            by_category[card["category"]].append(card)
+
+    return {
+        "timestamp": time.time(),
+        "items": ranked,
+        "by_category": dict(by_category),
+        "categories": [
+            {"category": category, "score": round(score, 4)}
+            for category, score in category_scores.most_common()
+        ],
+    }
+
+
+async def refresh_trending():
+    global trending_cache
+    trending_cache = await asyncio.to_thread(compute_trending)
+    return trending_cache
+
+
+async def get_trending():
+    """Return the cached trending ranking. Once it has expired the stale ranking
+    is still served while a single refresh runs; only the first request waits."""
+    if trending_cache["timestamp"] == 0:
+        return await trending_flight.do("trending", refresh_trending)
+    if time.time() - trending_cache["timestamp"] >= TRENDING_CACHE_EXPIRY:
+        trending_flight.refresh("trending", refresh_trending)
+    return trending_cache
+
+
+async def view_flush_worker():
+    """Background loop that periodically flushes buffered view counts."""
+    while True:
+        await asyncio.sleep(VIEW_FLUSH_INTERVAL)
+        await flush_views()
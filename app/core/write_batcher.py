@@ -0,0 +1,73 @@
+from app.config import logger
+from bson import ObjectId
+import asyncio
+
+
+class WriteBatcher:
+    """Group-commits inserts issued concurrently by different requests.
+
+    ``submit`` queues a document and waits for it to be written. Queued
+    documents are written together by one call to ``write_fn`` (run in a
+    thread) once ``window`` seconds have passed since the first of them was
+    queued, or as soon as ``max_batch`` are waiting. ``write_fn`` receives the
+    documents and returns a dict of index -> exception for those that failed.
+    Each caller gets back its document's ``_id``, or the exception raised for
+    its document, just as if it had written alone.
+    """
+
+    def __init__(self, name: str, write_fn, window: float, max_batch: int):
+        self.name = name
+        self.write_fn = write_fn
+        self.window = window
+        self.max_batch = max_batch
+        # (document, Future) pairs waiting for the next flush
+        self.pending = []
+        self.timer = None
+        self.writes = set()
+
+    async def submit(self, document: dict):
+        loop = asyncio.get_running_loop()
+        document.setdefault("_id", ObjectId())
+        future = loop.create_future()
+        self.pending.append((document, future))
+        if len(self.pending) >= self.max_batch:
+            self._start_flush()
+        elif self.timer is None:
+            self.timer = loop.call_later(self.window, self._start_flush)
+        return await future
+
+    async def flush(self):
+        """Write whatever is queued and wait for every write in flight."""
+        self._start_flush()
+        if self.writes:
+            await asyncio.gather(*self.writes, return_exceptions=True)
+
+    def _start_flush(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        batch, self.pending = self.pending, []
+        if batch:
+            task = asyncio.get_running_loop().create_task(self._write(batch))
+            self.writes.add(task)
+            task.add_done_callback(self.writes.discard)
+
+    async def _write(self, batch: list):
+        documents = [document for document, _ in batch]
+        try:
+            failures = await asyncio.to_thread(self.write_fn, documents)
+        except Exception as e:
+            logger.error(
+                f"Batched write of {len(documents)} {self.name} failed: {str(e)}"
+            )
+            failures = {index: e for index in range(len(documents))}
+        if failures:
+            logger.warning(f"{len(failures)} of {len(documents)} {self.name} failed")
+        for index, (document, future) in enumerate(batch):
+            # The caller may have gone away (request cancelled) in the meantime
+            if future.done():
+                continue
+            if index in failures:
+                future.set_exception(failures[index])
+            else:
+                future.set_result(document["_id"])
@@ -11,17 +11,34 @@
     conversation,
     reviews,
     preferences,
+    saved_searches,
+    sync,
 )
 from app.config import Settings
 import dotenv
 from fastapi.responses import HTMLResponse
 from fastapi.middleware.cors import CORSMiddleware
+from app.core.database import ensure_indexes
+from app.core.responses import JSONResponse
+from app.core.feed import feed_refresh_worker
+from app.core.inquiries import inquiry_rebuild_worker
+from app.core.saved_search_index import (
+    load_saved_search_index,
+    saved_search_reload_worker,
+)
+from app.core.suggestions import load_suggestion_index
+from app.core.views import view_flush_worker, flush_views
+from app.core.gc import gc_worker
+from app.core.invalidation import invalidation_worker
+from app.core.message_store import message_batcher
+from app.core.migrations import backfill_conversation_summaries, backfill_inbox
+import asyncio
 
 dotenv.load_dotenv()
 
 
 def create_app() -> FastAPI:
-    app = FastAPI(title="SJSU Marketplace Backend")
+    app = FastAPI(title="SJSU Marketplace Backend", default_response_class=JSONResponse)
     app.include_router(auth.router, prefix="/auth", tags=["Auth"])
     app.include_router(users.router, prefix="/users", tags=["Users"])
     app.include_router(items.router, prefix="/items", tags=["Items"])
@@ -35,6 +52,10 @@ def create_app() -> FastAPI:
     app.include_router(admin.router, prefix="/admin", tags={"Admin"})
     app.include_router(api.router, prefix="/api", tags=["Api"])
     app.include_router(preferences.router, prefix="/preferences", tags=["Preferences"])
+    app.include_router(
+        saved_searches.router, prefix="/saved-searches", tags=["Saved Searches"]
+    )
+    app.include_router(sync.router, prefix="/sync", tags=["Sync"])
 
     app.add_middleware(
         CORSMiddleware,
@@ -54,6 +75,29 @@ def create_app() -> FastAPI:
         ],
     )
 
+    @app.on_event("startup")
+    async def start_background_workers():
+        await asyncio.to_thread(ensure_indexes)
+        await asyncio.to_thread(load_saved_search_index)
+        await asyncio.to_thread(load_suggestion_index)
+        app.state.background_tasks = [
+            asyncio.create_task(feed_refresh_worker()),
+            asyncio.create_task(saved_search_reload_worker()),
+            asyncio.create_task(inquiry_rebuild_worker()),
+            asyncio.create_task(view_flush_worker()),
+            asyncio.create_task(gc_worker()),
+            asyncio.create_task(invalidation_worker()),
+            asyncio.create_task(asyncio.to_thread(backfill_conversation_summaries)),
+            asyncio.create_task(asyncio.to_thread(backfill_inbox)),
+        ]
+
+    @app.on_event("shutdown")
+    async def stop_background_workers():
+        for task in getattr(app.state, "background_tasks", []):
+            task.cancel()
+        await flush_views()
+        await message_batcher.flush()
+
     @app.get("/", response_class=HTMLResponse)
     async def read_root():
         html_content = """
@@ -0,0 +1,18 @@
+from typing import Optional, List
+from pydantic import BaseModel, Field, validator
+from datetime import datetime
+
+
+class SavedSearchCreate(BaseModel):
+    name: Optional[str] = None
+    search: Optional[str] = None
+    category: Optional[List[str]] = None
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+    @validator("min_price", "max_price")
+    def validate_price(cls, price: Optional[float]):
+        if price is not None and price < 0:
+            raise ValueError("Price must be a positive number")
+        return price
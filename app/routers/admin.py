@@ -4,11 +4,28 @@
     reports_collection,
     items_collection,
     conversations_collection,
+    gc_state_collection,
 )
 from bson import ObjectId
 from app.core.security import verify_access_token
 from typing import Optional, Dict, Any, List
 from datetime import datetime, timedelta
+from app.core.inquiries import rebuild_inquiry_counters
+from app.core.suggestions import suggestion_index
+from app.core.cache import cache_stats
+from app.core.user_cards import invalidate_user_card
+from app.core.inbox import set_inbox_status
+from app.core.membership import invalidate_membership
+from app.core.gc import record_tombstone, run_gc
+from app.core.message_store import message_store, search_terms
+from app.schemas.conversation_schema import serialize_conversation
+from app.schemas.message_schema import build_snippet, serialize_last_message
+from app.core.migrations import (
+    backfill_conversation_summaries,
+    migrate_messages_to_buckets,
+    rebuild_unread_totals,
+)
+import asyncio
 import os
 
 router = APIRouter()
@@ -143,10 +160,19 @@ async def delete_reported_items(
         raise HTTPException(status_code=400, detail="Invalid entity_id format")
 
     if type == "items":
-        deleted_item = items_collection.delete_one({"_id": obj_id})
+        deleted_item = items_collection.find_one_and_delete(
+            {"_id": obj_id}, {"images": 1, "seller_id": 1}
+        )
 
-        if deleted_item.deleted_count == 0:
+        if deleted_item is None:
             raise HTTPException(status_code=404, detail="Post not found")
+        suggestion_index.remove_item(entity_id)
+        record_tombstone(
+            "item",
+            obj_id,
+            [deleted_item["seller_id"]],
+            images=deleted_item.get("images", []),
+        )
 
     reports_collection.update_many(
         {"entity_id": obj_id}, {"$set": {"status": "resolved"}}
@@ -332,6 +358,7 @@ async def update_user(
 
         if result.matched_count == 0:
             return AdminResponse.error(message="User not found", code="USER_NOT_FOUND")
+        await invalidate_user_card(user_id)
 
         return AdminResponse.success(message="User updated successfully")
 
@@ -618,8 +645,10 @@ async def take_action_on_report(
                 {"$set": {"status": "suspended"}},
             )
         elif action == "remove_item":
+            now = datetime.utcnow()
             items_collection.update_one(
-                {"_id": ObjectId(report["entity_id"])}, {"$set": {"status": "removed"}}
+                {"_id": ObjectId(report["entity_id"])},
+                {"$set": {"status": "removed", "removed_at": now, "updated_at": now}},
             )
         elif action == "delete_message":
             # Implementation depends on your message storage structure
@@ -766,14 +795,25 @@ async def update_item_status(
         if status not in ["active", "removed", "flagged"]:
             return AdminResponse.error(message="Invalid status", code="INVALID_STATUS")
 
-        # Update item
-        result = items_collection.update_one(
-            {"_id": ObjectId(item_id)}, {"$set": {"status": status}}
-        )
+        # Removal starts the collector's grace period; any other status ends it
+        now = datetime.utcnow()
+        update = {"$set": {"status": status, "updated_at": now}}
+        if status == "removed":
+            update["$set"]["removed_at"] = now
+        else:
+            update["$unset"] = {"removed_at": ""}
+        result = items_collection.update_one({"_id": ObjectId(item_id)}, update)
 
         if result.matched_count == 0:
             return AdminResponse.error(message="Item not found", code="ITEM_NOT_FOUND")
 
+        if status == "active":
+            item = items_collection.find_one({"_id": ObjectId(item_id)})
+            if item:
+                suggestion_index.upsert_item(item)
+        else:
+            suggestion_index.remove_item(item_id)
+
         return AdminResponse.success(message="Item status updated successfully")
 
     except Exception as e:
@@ -788,13 +828,17 @@ async def update_item_status(
 async def delete_item(item_id: str, admin_check: bool = Depends(checkRole)):
     try:
         # Soft delete by updating status
+        now = datetime.utcnow()
         result = items_collection.update_one(
-            {"_id": ObjectId(item_id)}, {"$set": {"status": "removed"}}
+            {"_id": ObjectId(item_id)},
+            {"$set": {"status": "removed", "removed_at": now, "updated_at": now}},
         )
 
         if result.matched_count == 0:
             return AdminResponse.error(message="Item not found", code="ITEM_NOT_FOUND")
 
+        suggestion_index.remove_item(item_id)
+
         return AdminResponse.success(message="Item deleted successfully")
 
     except Exception as e:
@@ -805,6 +849,22 @@ async def delete_item(item_id: str, admin_check: bool = Depends(checkRole)):
         )
 
 
+# Most message hits scanned when filtering the conversation list by text
+ADMIN_SEARCH_MAX_HITS = 1000
+
+
+# Helper function to serialize a conversation for the admin views
+def serialize_admin_conversation(conversation: dict) -> dict:
+    return {
+        **serialize_conversation(conversation),
+        "participants": [
+            str(conversation["seller_id"]),
+            str(conversation["buyer_id"]),
+        ],
+        "last_message": serialize_last_message(conversation.get("last_message")),
+    }
+
+
 @router.get("/messages")
 async def list_conversations(
     admin_check: bool = Depends(checkRole),
@@ -817,10 +877,11 @@ async def list_conversations(
         # Build query
         query = {}
         if search:
-            query["$or"] = [
-                {"participants.name": {"$regex": search, "$options": "i"}},
-                {"messages.content": {"$regex": search, "$options": "i"}},
-            ]
+            # Conversations with a message matching the search text
+            hits = await asyncio.to_thread(
+                message_store.search, search, None, 0, ADMIN_SEARCH_MAX_HITS
+            )
+            query["_id"] = {"$in": list({hit["conversation_id"] for hit in hits})}
         if status:
             query["status"] = status
 
@@ -838,12 +899,7 @@ async def list_conversations(
             .limit(limit)
         )
 
-        # Convert ObjectId to string
-        conversations_list = []
-        for conv in conversations:
-            conv["_id"] = str(conv["_id"])
-            conv["participants"] = [str(p) for p in conv["participants"]]
-            conversations_list.append(conv)
+        conversations_list = [serialize_admin_conversation(c) for c in conversations]
 
         return AdminResponse.success(
             data=conversations_list, meta={"total": total, "page": page, "limit": limit}
@@ -857,6 +913,41 @@ async def list_conversations(
         )
 
 
+# Full-text search across every conversation's messages
+@router.get("/messages/search")
+async def search_messages(
+    q: str,
+    admin_check: bool = Depends(checkRole),
+    page: int = 1,
+    limit: int = 20,
+):
+    try:
+        skip = (page - 1) * limit
+        hits = await asyncio.to_thread(message_store.search, q, None, skip, limit + 1)
+        terms = search_terms(q)
+        data = [
+            {
+                "id": str(hit["_id"]),
+                "conversation_id": str(hit["conversation_id"]),
+                "sender_id": str(hit["sender_id"]),
+                "snippet": build_snippet(hit.get("message", ""), terms),
+                "created_at": hit["created_at"].isoformat(),
+            }
+            for hit in hits[:limit]
+        ]
+        return AdminResponse.success(
+            data=data,
+            meta={"page": page, "limit": limit, "has_more": len(hits) > limit},
+        )
+
+    except Exception as e:
+        return AdminResponse.error(
+            message="Failed to search messages",
+            code="MESSAGE_SEARCH_ERROR",
+            details={"error": str(e)},
+        )
+
+
 @router.get("/messages/{conversation_id}")
 async def get_conversation(
     conversation_id: str, admin_check: bool = Depends(checkRole)
@@ -871,10 +962,7 @@ async def get_conversation(
                 message="Conversation not found", code="CONVERSATION_NOT_FOUND"
             )
 
-        conversation["_id"] = str(conversation["_id"])
-        conversation["participants"] = [str(p) for p in conversation["participants"]]
-
-        return AdminResponse.success(data=conversation)
+        return AdminResponse.success(data=serialize_admin_conversation(conversation))
 
     except Exception as e:
         return AdminResponse.error(
@@ -893,15 +981,19 @@ async def update_conversation_status(
         if status not in ["active", "blocked", "resolved"]:
             return AdminResponse.error(message="Invalid status", code="INVALID_STATUS")
 
-        # Update conversation
+        # Update conversation; none of these statuses is a deletion, so a
+        # restored conversation leaves the collector's queue
         result = conversations_collection.update_one(
-            {"_id": ObjectId(conversation_id)}, {"$set": {"status": status}}
+            {"_id": ObjectId(conversation_id)},
+            {"$set": {"status": status}, "$unset": {"deleted_at": ""}},
         )
 
         if result.matched_count == 0:
             return AdminResponse.error(
                 message="Conversation not found", code="CONVERSATION_NOT_FOUND"
             )
+        set_inbox_status(ObjectId(conversation_id), status)
+        await invalidate_membership(conversation_id)
 
         return AdminResponse.success(message="Conversation status updated successfully")
 
@@ -920,13 +1012,16 @@ async def delete_conversation(
     try:
         # Soft delete by updating status
         result = conversations_collection.update_one(
-            {"_id": ObjectId(conversation_id)}, {"$set": {"status": "deleted"}}
+            {"_id": ObjectId(conversation_id)},
+            {"$set": {"status": "deleted", "deleted_at": datetime.utcnow()}},
         )
 
         if result.matched_count == 0:
             return AdminResponse.error(
                 message="Conversation not found", code="CONVERSATION_NOT_FOUND"
             )
+        set_inbox_status(ObjectId(conversation_id), "deleted")
+        await invalidate_membership(conversation_id)
 
         return AdminResponse.success(message="Conversation deleted successfully")
 
@@ -969,6 +1064,113 @@ async def delete_message(
         )
 
 
+@router.get("/cache-stats")
+async def get_cache_stats(admin_check: bool = Depends(checkRole)):
+    return AdminResponse.success(data=cache_stats())
+
+
+@router.post("/maintenance/rebuild-inquiries")
+async def rebuild_inquiries(admin_check: bool = Depends(checkRole)):
+    try:
+        result = await asyncio.to_thread(rebuild_inquiry_counters)
+        return AdminResponse.success(
+            data=result, message="Inquiry counters rebuilt successfully"
+        )
+
+    except Exception as e:
+        return AdminResponse.error(
+            message="Failed to rebuild inquiry counters",
+            code="INQUIRY_REBUILD_ERROR",
+            details={"error": str(e)},
+        )
+
+
+@router.post("/maintenance/backfill-conversations")
+async def backfill_conversations(admin_check: bool = Depends(checkRole)):
+    try:
+        updated = await asyncio.to_thread(backfill_conversation_summaries)
+        return AdminResponse.success(
+            data={"conversations_updated": updated},
+            message="Conversation summaries backfilled successfully",
+        )
+
+    except Exception as e:
+        return AdminResponse.error(
+            message="Failed to backfill conversation summaries",
+            code="CONVERSATION_BACKFILL_ERROR",
+            details={"error": str(e)},
+        )
+
+
+@router.post("/maintenance/rebuild-unread")
+async def rebuild_unread(admin_check: bool = Depends(checkRole)):
+    try:
+        result = await asyncio.to_thread(rebuild_unread_totals)
+        return AdminResponse.success(
+            data=result, message="Unread totals rebuilt successfully"
+        )
+
+    except Exception as e:
+        return AdminResponse.error(
+            message="Failed to rebuild unread totals",
+            code="UNREAD_REBUILD_ERROR",
+            details={"error": str(e)},
+        )
+
+
+@router.post("/maintenance/migrate-message-buckets")
+async def migrate_message_buckets(admin_check: bool = Depends(checkRole)):
+    try:
+        result = await asyncio.to_thread(migrate_messages_to_buckets)
+        return AdminResponse.success(
+            data=result, message="Messages migrated to buckets successfully"
+        )
+
+    except Exception as e:
+        return AdminResponse.error(
+            message="Failed to migrate messages to buckets",
+            code="MESSAGE_BUCKET_MIGRATION_ERROR",
+            details={"error": str(e)},
+        )
+
+
+# Runs the garbage collector now instead of waiting for the next scheduled run
+@router.post("/maintenance/gc")
+async def run_garbage_collection(admin_check: bool = Depends(checkRole)):
+    try:
+        result = await run_gc()
+        if result is None:
+            return AdminResponse.error(
+                message="Garbage collection is already running", code="GC_RUNNING"
+            )
+        return AdminResponse.success(
+            data=result, message="Garbage collection finished successfully"
+        )
+
+    except Exception as e:
+        return AdminResponse.error(
+            message="Failed to run garbage collection",
+            code="GC_ERROR",
+            details={"error": str(e)},
+        )
+
+
+@router.get("/maintenance/gc")
+async def get_garbage_collection_state(admin_check: bool = Depends(checkRole)):
+    try:
+        state = await asyncio.to_thread(
+            gc_state_collection.find_one, {"_id": "gc"}, {"_id": 0}
+        )
+        return AdminResponse.success(data=state or {})
+
+    except Exception as e:
+        return AdminResponse.error(
+            message="Failed to fetch garbage collection state",
+            code="GC_STATE_ERROR",
+            details={"error": str(e)},
+        )
+
+
 @router.get("/settings")
 async def get_settings(admin_check: bool = Depends(checkRole)):
     try:
@@ -4,6 +4,7 @@
 from fastapi.responses import RedirectResponse
 from ..config import logger, user_collection, cookies_collection, settings
 from authlib.integrations.requests_client import OAuth2Session
+import asyncio
 import traceback
 from datetime import datetime
 from datetime import timezone
@@ -13,6 +14,8 @@
 from datetime import datetime, timezone
 from app.schemas.preferences_schema import PreferencesRead
 from ..config import preferences_collection
+from app.core.user_cards import invalidate_user_card
+from app.core.negative_cache import missing_users
 
 router = APIRouter()
 
@@ -47,25 +50,93 @@ def google_login():
     return RedirectResponse(uri)
 
 
+# Helper function to exchange the OAuth code for a token and the Google profile
+def fetch_google_user(code: str):
+    client = OAuth2Session(
+        settings.GOOGLE_CLIENT_ID,
+        settings.GOOGLE_CLIENT_SECRET,
+        redirect_uri=settings.GOOGLE_REDIRECT_URI,
+    )
+    token = client.fetch_token(
+        "https://oauth2.googleapis.com/token",
+        code=code,
+        grant_type="authorization_code",
+    )
+
+    resp = client.get("https://www.googleapis.com/oauth2/v2/userinfo")
+    return token, resp.json()
+
+
+# Helper function to create or update the signed-in user; returns (user_id, created)
+def upsert_google_user(email: str, user_info: dict, token: dict):
+    # Only update the picture if the current one is not a Cloudinary URL
+    user_record = user_collection.find_one({"email": email})
+    google_picture = user_info.get("picture")
+    update_picture = True
+    if user_record and user_record.get("picture"):
+        current_picture = user_record["picture"]
+        if current_picture.startswith("https://res.cloudinary.com/"):
+            update_picture = False
+
+    user_data = {
+        "email": email,
+        "name": user_info.get("name"),
+        "picture": google_picture if update_picture else user_record.get("picture"),
+        "google_refresh_token": token.get("refresh_token"),
+        "last_login": datetime.now(timezone.utc),
+        "updated_at": datetime.now(timezone.utc),
+        "is_admin": False,
+        "is_banned": False,
+    }
+    if not user_record:
+        new_user = user_data.copy()
+        new_user["_id"] = user_collection.insert_one(user_data).inserted_id
+        return str(new_user["_id"]), True
+
+    user_id = str(user_record["_id"])
+    # Only update specific fields on sign-in, preserving others
+    update_data = {
+        "last_login": datetime.now(timezone.utc),
+        "updated_at": datetime.now(timezone.utc),
+    }
+    # Only update picture if it's not a Cloudinary URL
+    if update_picture:
+        update_data["picture"] = google_picture
+    # Only update refresh token if it's not present
+    if not user_record.get("google_refresh_token"):
+        update_data["google_refresh_token"] = token.get("refresh_token")
+
+    user_collection.update_one({"email": email}, {"$set": update_data})
+    return user_id, False
+
+
+# Helper function to give a first-time user the default preferences
+def ensure_default_preferences(user_id: str):
+    # fetch user preferences
+    user_preferences = preferences_collection.find_one({"user_id": ObjectId(user_id)})
+
+    if not user_preferences:
+        preferences = PreferencesRead(
+            profile_visibility="public",
+            push_notifications=True,
+            email_notifications=True,
+            campus_trading_mode=True,
+            dark_mode=False,
+        )
+        preferences_collection.insert_one(
+            {"user_id": ObjectId(user_id), "preferences": preferences.model_dump()}
+        )
+
+
+# Async so the caches are touched on the event loop; the OAuth and database
+# round trips run in threads
 @router.get("/google/callback")
-def google_callback(code: str = None):
+async def google_callback(code: str = None):
     if not code:
         raise HTTPException(status_code=400, detail="No code provided by Google OAuth.")
     logger.info("Exchange code for token")
     try:
-        client = OAuth2Session(
-            settings.GOOGLE_CLIENT_ID,
-            settings.GOOGLE_CLIENT_SECRET,
-            redirect_uri=settings.GOOGLE_REDIRECT_URI,
-        )
-        token = client.fetch_token(
-            "https://oauth2.googleapis.com/token",
-            code=code,
-            grant_type="authorization_code",
-        )
-
-        resp = client.get("https://www.googleapis.com/oauth2/v2/userinfo")
-        user_info = resp.json()
+        token, user_info = await asyncio.to_thread(fetch_google_user, code)
 
         email = user_info.get("email")
         if not email:
@@ -73,61 +144,15 @@ def google_callback(code: str = None):
                 status_code=401, detail="Access denied, user not an edu email"
             )
 
-        # Only update the picture if the current one is not a Cloudinary URL
-        user_record = user_collection.find_one({"email": email})
-        google_picture = user_info.get("picture")
-        update_picture = True
-        if user_record and user_record.get("picture"):
-            current_picture = user_record["picture"]
-            if current_picture.startswith("https://res.cloudinary.com/"):
-                update_picture = False
-
-        user_data = {
-            "email": email,
-            "name": user_info.get("name"),
-            "picture": google_picture if update_picture else user_record.get("picture"),
-            "google_refresh_token": token.get("refresh_token"),
-            "last_login": datetime.now(timezone.utc),
-            "updated_at": datetime.now(timezone.utc),
-            "is_admin": False,
-            "is_banned": False,
-        }
-        if not user_record:
-            new_user = user_data.copy()
-            new_user["_id"] = user_collection.insert_one(user_data).inserted_id
-            user_id = str(new_user["_id"])
-        else:
-            user_id = str(user_record["_id"])
-            # Only update specific fields on sign-in, preserving others
-            update_data = {
-                "last_login": datetime.now(timezone.utc),
-                "updated_at": datetime.now(timezone.utc),
-            }
-            # Only update picture if it's not a Cloudinary URL
-            if update_picture:
-                update_data["picture"] = google_picture
-            # Only update refresh token if it's not present
-            if not user_record.get("google_refresh_token"):
-                update_data["google_refresh_token"] = token.get("refresh_token")
-
-            user_collection.update_one({"email": email}, {"$set": update_data})
-
-        # fetch user preferences
-        user_preferences = preferences_collection.find_one(
-            {"user_id": ObjectId(user_id)}
+        user_id, created = await asyncio.to_thread(
+            upsert_google_user, email, user_info, token
         )
+        if created:
+            await missing_users.forget(user_id)
+        else:
+            await invalidate_user_card(user_id)
 
-        if not user_preferences:
-            preferences = PreferencesRead(
-                profile_visibility="public",
-                push_notifications=True,
-                email_notifications=True,
-                campus_trading_mode=True,
-                dark_mode=False,
-            )
-            preferences_collection.insert_one(
-                {"user_id": ObjectId(user_id), "preferences": preferences.model_dump()}
-            )
+        await asyncio.to_thread(ensure_default_preferences, user_id)
 
         response = RedirectResponse(callBackURL)
         tokens = create_jwt_session(user_id)
@@ -157,7 +182,8 @@ def google_callback(code: str = None):
 
         logger.info("Setting cookies %s", tokens["access_token"])
 
-        cookies_collection.update_one(
+        await asyncio.to_thread(
+            cookies_collection.update_one,
             {"user_id": user_id},
             {
                 "$set": {
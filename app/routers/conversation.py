@@ -4,7 +4,6 @@
 from app.config import (
     conversations_collection,
     items_collection,
-    messages_collection,
     user_collection,
 )
 from typing import Optional
@@ -16,80 +15,291 @@
     list_serialize_conversations,
     serialize_conversation,
 )
-from app.schemas.message_schema import list_serialize_messages
+from app.schemas.message_schema import (
+    list_serialize_messages,
+    build_last_message,
+    build_snippet,
+    serialize_last_message,
+)
 from datetime import datetime
 from app.websockets.manager import ws_manager
+from app.core import feed
+from app.core.inquiries import record_inquiry
 import asyncio
-from fastapi.params import Depends
-from fastapi import Query, Depends, BackgroundTasks
 import time
+from fastapi.params import Depends
+from fastapi import Query, Depends
+from app.core.cache import cache_is_shared, create_cache
+from app.core.responses import JSONResponse
+from app.core.invalidation import invalidation_bus
+from app.core.singleflight import SingleFlight
+from app.core.negative_cache import missing_conversations, missing_items
+from app.core.loader import Loaders, get_loaders
+from app.core.message_store import insert_message, message_store, search_terms
+from app.core.membership import (
+    CLOSED_STATUSES,
+    cache_membership,
+    get_membership,
+    invalidate_membership,
+)
+from app.core.gc import record_tombstone, on_conversations_purged
+from app.core.inbox import (
+    add_to_inbox,
+    fetch_inbox_conversation_ids,
+    fetch_inbox_conversations,
+    mark_inbox_changed,
+    remove_from_inbox,
+    touch_inbox,
+)
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 
 router = APIRouter()
 
-# Cache for user conversations (key: user_id, value: conversation data)
-# This will expire after 30 seconds to ensure data freshness
-conversation_cache = {}
-CACHE_EXPIRY = 30  # seconds
+# Message and conversation writes update a per-process cached inbox in place,
+# but only that worker sees it, so entries expire quickly. A shared cache is
+# evicted on every change instead (concurrent read-modify-writes from several
+# workers would lose updates), so its entries can live long.
+CACHE_EXPIRY = 600 if cache_is_shared() else 30  # seconds
+# Expired inboxes are still served for this long while a single refresh runs
+CACHE_STALE_GRACE = 300  # seconds
+CACHE_MAX_ENTRIES = 5000
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+# Messages returned per page of conversation history
+MESSAGE_PAGE_SIZE = 50
+MAX_MESSAGE_PAGE_SIZE = 200
+# Message search hits returned per page
+SEARCH_PAGE_SIZE = 20
+MAX_SEARCH_PAGE_SIZE = 50
+
+# Cache for user conversations (key: user_id, value: {"data": [...], "complete": bool,
+# "cached_at": float}). "data" is the newest-first prefix of the user's inbox;
+# "complete" is True when it holds every conversation, so any skip/limit window
+# can be served from it. Entries older than CACHE_EXPIRY are stale.
+conversation_cache = create_cache(
+    "conversations",
+    max_entries=CACHE_MAX_ENTRIES,
+    ttl=CACHE_EXPIRY + CACHE_STALE_GRACE,
+    max_bytes=CACHE_MAX_BYTES,
+)
+# When each user's inbox last changed (key: user_id, value: time.time()). A load
+# that started before the latest change does not write its result back.
+inbox_changes = create_cache(
+    "inbox_changes",
+    max_entries=CACHE_MAX_ENTRIES,
+    ttl=CACHE_EXPIRY + CACHE_STALE_GRACE,
+)
+# Concurrent inbox loads and refreshes for the same user share one computation
+inbox_flight = SingleFlight("inbox")
+
+
+# Serve a skip/limit window from the cached inbox prefix as (window, cached_at),
+# or None if it is not covered
+async def get_cached_window(user_id: str, skip: int, limit: int):
+    cache_entry = await conversation_cache.get_async(user_id)
+    if cache_entry is None:
+        return None
+    if skip + limit > len(cache_entry["data"]) and not cache_entry["complete"]:
+        return None
+    return cache_entry["data"][skip : skip + limit], cache_entry.get("cached_at", 0)
+
+
+# Helper function to record a change to a user's inbox and return the cached
+# entry for the write-through, if any. A shared entry is evicted instead, so
+# there is nothing to write through.
+async def begin_inbox_update(user_id: str):
+    if cache_is_shared():
+        await evict_cached_inbox(user_id)
+        return None
+    await inbox_changes.set_async(user_id, time.time())
+    return await conversation_cache.get_async(user_id)
+
+
+async def evict_cached_inbox(user_id: str):
+    await inbox_changes.set_async(user_id, time.time())
+    await conversation_cache.delete_async(user_id)
+
+
+# Helper function to cache an inbox loaded from the database, unless it changed
+# after the load started (the result may predate that change). A revalidation
+# passes the cached_at of the entry it replaces and leaves a reloaded one alone.
+async def cache_loaded_inbox(
+    user_id: str, data: list, complete: bool, started_at: float, replaces=None
+):
+    if await inbox_changes.get_async(user_id, 0) >= started_at:
+        return
+    if replaces is not None:
+        cache_entry = await conversation_cache.get_async(user_id)
+        if cache_entry is None or cache_entry.get("cached_at") != replaces:
+            return
+    await cache_conversations(user_id, data, complete)
+
+
+# Write-through updates pass the entry's cached_at on, so they do not make an
+# old inbox look freshly loaded
+async def cache_conversations(user_id: str, data: list, complete: bool, cached_at=None):
+    await conversation_cache.set_async(
+        user_id,
+        {
+            "data": data,
+            "complete": complete,
+            "cached_at": time.time() if cached_at is None else cached_at,
+        },
+    )
+
 
+# Write-through: move a conversation to the top of a cached inbox and replace its
+# latest message. Inboxes whose cached prefix does not contain it are dropped.
+async def update_cached_inbox(
+    user_id: str,
+    conversation_id: str,
+    latest_message: dict,
+    updated_at: datetime,
+    unread_increment: int = 0,
+    is_latest: bool = True,
+):
+    cache_entry = await begin_inbox_update(user_id)
+    if cache_entry is None:
+        return
+    data = cache_entry["data"]
+    index = next(
+        (i for i, conv in enumerate(data) if conv["id"] == conversation_id), None
+    )
+    if index is None:
+        await conversation_cache.delete_async(user_id)
+        return
+    updated_conv = {
+        **data[index],
+        "unread_count": data[index].get("unread_count", 0) + unread_increment,
+    }
+    # A message that lost the race to a newer one only changes the unread count
+    if not is_latest:
+        data = data[:index] + [updated_conv] + data[index + 1 :]
+    else:
+        updated_conv["latest_message"] = latest_message
+        updated_conv["updated_at"] = updated_at.isoformat()
+        data = [updated_conv] + data[:index] + data[index + 1 :]
+    await cache_conversations(
+        user_id, data, cache_entry["complete"], cache_entry.get("cached_at")
+    )
 
-# Background task to refresh the cache
-async def refresh_conversation_cache(user_id: str):
-    try:
-        # Fetch conversations directly without going through the endpoint
-        conversations_list = list(
-            conversations_collection.find(
-                {
-                    "$or": [
-                        {"seller_id": ObjectId(user_id)},
-                        {"buyer_id": ObjectId(user_id)},
-                    ]
-                }
-            )
+
+# Write-through: put a newly created conversation at the top of a cached inbox
+async def prepend_cached_inbox(user_id: str, serialized_conv: dict):
+    cache_entry = await begin_inbox_update(user_id)
+    if cache_entry is None:
+        return
+    data = [conv for conv in cache_entry["data"] if conv["id"] != serialized_conv["id"]]
+    await cache_conversations(
+        user_id,
+        [serialized_conv] + data,
+        cache_entry["complete"],
+        cache_entry.get("cached_at"),
+    )
+
+
+# Status changes are not written through, so both participants' cached inboxes
+# are dropped, wherever the change was made
+async def evict_inboxes_on_status_change(event):
+    if event.operation != "update" or "status" not in event.fields:
+        return
+    conversation = await asyncio.to_thread(
+        conversations_collection.find_one,
+        {"_id": event.document_id},
+        {"seller_id": 1, "buyer_id": 1},
+    )
+    if conversation is not None:
+        await evict_cached_inbox(str(conversation["seller_id"]))
+        await evict_cached_inbox(str(conversation["buyer_id"]))
+
+
+invalidation_bus.subscribe("conversations", evict_inboxes_on_status_change)
+
+
+# Write-through: remove a deleted conversation from a cached inbox
+async def remove_from_cached_inbox(user_id: str, conversation_id: str):
+    cache_entry = await begin_inbox_update(user_id)
+    if cache_entry is None:
+        return
+    data = [conv for conv in cache_entry["data"] if conv["id"] != conversation_id]
+    await cache_conversations(
+        user_id, data, cache_entry["complete"], cache_entry.get("cached_at")
+    )
+
+
+# Drop conversations purged by the garbage collector from both inboxes
+async def evict_purged_conversation(conversation: dict):
+    for participant_id in (conversation["seller_id"], conversation["buyer_id"]):
+        await remove_from_cached_inbox(str(participant_id), str(conversation["_id"]))
+
+
+on_conversations_purged(evict_purged_conversation)
+
+
+# Write-through: set the unread count of one conversation in a cached inbox
+async def set_cached_unread(user_id: str, conversation_id: str, unread_count: int):
+    cache_entry = await begin_inbox_update(user_id)
+    if cache_entry is None:
+        return
+    data = [
+        (
+            {**conv, "unread_count": unread_count}
+            if conv["id"] == conversation_id
+            else conv
         )
+        for conv in cache_entry["data"]
+    ]
+    await cache_conversations(
+        user_id, data, cache_entry["complete"], cache_entry.get("cached_at")
+    )
 
-        if not conversations_list:
-            conversation_cache[user_id] = {
-                "message": "No conversations found",
-                "data": [],
-                "timestamp": time.time(),
-            }
-            return
 
-        serialized_conversations = [
-            serialize_conversation(conv) for conv in conversations_list
-        ]
+# Helper function to keep the per-user unread total (nav badge) in step with the
+# per-conversation counters
+def adjust_unread_total(user_id, delta: int):
+    if delta:
+        user_collection.update_one(
+            {"_id": ObjectId(user_id)}, {"$inc": {"unread_total": delta}}
+        )
 
-        # Process in batches to avoid overwhelming the database
-        batch_size = 10
-        for i in range(0, len(conversations_list), batch_size):
-            batch = conversations_list[i : i + batch_size]
-            tasks = []
 
-            for conversation in batch:
-                tasks.append(fetch_seller_details(conversation["seller_id"]))
-                tasks.append(fetch_latest_message(conversation["_id"]))
+def build_read_pointer(message: dict) -> dict:
+    return {"message_id": message["_id"], "read_at": message["created_at"]}
 
-            results = await asyncio.gather(*tasks)
 
-            for j, conv_index in enumerate(
-                range(i, min(i + batch_size, len(serialized_conversations)))
-            ):
-                seller_index = j * 2
-                message_index = j * 2 + 1
+def serialize_read_pointers(read_pointers: dict) -> dict:
+    return {
+        user_id: {
+            "message_id": str(pointer["message_id"]),
+            "read_at": pointer["read_at"].isoformat(),
+        }
+        for user_id, pointer in (read_pointers or {}).items()
+    }
+
+
+def get_unread_count(conversation: dict, user_id: str) -> int:
+    return conversation.get("unread", {}).get(str(user_id), 0)
 
-                serialized_conversations[conv_index]["seller_details"] = results[
-                    seller_index
-                ]
-                serialized_conversations[conv_index]["latest_message"] = results[
-                    message_index
-                ]
+
+# Background task to refresh the cache; replaces is the cached_at of the stale
+# entry being revalidated, if any
+async def refresh_conversation_cache(user_id: str, replaces=None):
+    try:
+        started_at = time.time()
+        # Fetch conversations directly without going through the endpoint
+        conversations_list = await asyncio.to_thread(fetch_inbox_conversations, user_id)
+        serialized_conversations = await serialize_inbox(
+            conversations_list, user_id, Loaders()
+        )
 
         # Update the cache
-        conversation_cache[user_id] = {
-            "message": "Conversations retrieved successfully",
-            "data": serialized_conversations,
-            "timestamp": time.time(),
-        }
+        await cache_loaded_inbox(
+            user_id,
+            serialized_conversations,
+            complete=True,
+            started_at=started_at,
+            replaces=replaces,
+        )
         logger.info(f"Cache refreshed for user {user_id}")
     except Exception as e:
         logger.error(f"Error refreshing cache for user {user_id}: {str(e)}")
@@ -100,10 +310,16 @@ async def create_conversation(
     item_id: str = Form(...),
     initial_message: str = Form(...),
     user_id=Depends(get_current_user_id),
+    loaders: Loaders = Depends(get_loaders),
 ):
     try:
         logger.info("Creating conversation")
-        item = items_collection.find_one({"_id": ObjectId(item_id)})
+        item_object_id = ObjectId(item_id)
+        item = None
+        if not await missing_items.is_missing(item_object_id):
+            item = items_collection.find_one({"_id": item_object_id})
+            if item is None:
+                await missing_items.mark_missing(item_object_id)
         if item is None:
             logger.error("Item not found")
             raise HTTPException(status_code=404, detail="Item not found")
@@ -115,32 +331,164 @@ async def create_conversation(
                 status_code=400, detail="Cannot create conversation with yourself"
             )
 
+        current_time = datetime.utcnow()
         conversation = Conversation(
             item_id=str(item_id),
             seller_id=str(item["seller_id"]),
             buyer_id=str(user_id),
+            created_at=current_time,
+            updated_at=current_time,
         )
 
         conversation_data = conversation.model_dump()
+        conversation_data["_id"] = ObjectId()
         conversation_data["item_id"] = ObjectId(conversation_data["item_id"])
         conversation_data["seller_id"] = ObjectId(conversation_data["seller_id"])
         conversation_data["buyer_id"] = ObjectId(conversation_data["buyer_id"])
-
-        inserted_conversation = conversations_collection.insert_one(conversation_data)
-        conversation_id = str(inserted_conversation.inserted_id)
+        conversation_id = str(conversation_data["_id"])
 
         # Sending initial message
         message = Message(
             conversation_id=conversation_id,
             sender_id=user_id,
             message=initial_message,
-            created_at=datetime.utcnow(),
-            updated_at=datetime.utcnow(),
+            created_at=current_time,
+            updated_at=current_time,
         )
         message_data = message.model_dump()
+        message_data["_id"] = ObjectId()
         message_data["conversation_id"] = ObjectId(message_data["conversation_id"])
         message_data["sender_id"] = ObjectId(message_data["sender_id"])
-        messages_collection.insert_one(message_data)
+
+        # Upsert on the (item, buyer, seller) key: a repeat "message seller" tap
+        # lands in the existing thread instead of starting a new one. The
+        # conversation is written first, so the message never exists without it.
+        # A closed thread does not match, so its upsert collides with the key.
+        seller_id = str(conversation_data["seller_id"])
+        conversation_key = {
+            "item_id": conversation_data["item_id"],
+            "buyer_id": conversation_data["buyer_id"],
+            "seller_id": conversation_data["seller_id"],
+            "status": {"$nin": list(CLOSED_STATUSES)},
+        }
+        conversation_update = {
+            "$setOnInsert": {
+                "_id": conversation_data["_id"],
+                "status": conversation_data["status"],
+                "created_at": conversation_data["created_at"],
+                "inbox_indexed": True,
+            },
+            "$set": {
+                "updated_at": current_time,
+                "last_message": build_last_message(message_data),
+                f"read_pointers.{user_id}": build_read_pointer(message_data),
+                f"unread.{user_id}": 0,
+            },
+            "$inc": {f"unread.{seller_id}": 1},
+        }
+        try:
+            existing = conversations_collection.find_one_and_update(
+                conversation_key,
+                conversation_update,
+                upsert=True,
+                return_document=ReturnDocument.BEFORE,
+            )
+        except DuplicateKeyError:
+            # A concurrent request inserted the thread first; update it instead
+            existing = conversations_collection.find_one_and_update(
+                conversation_key,
+                conversation_update,
+                return_document=ReturnDocument.BEFORE,
+            )
+            if existing is None:
+                raise HTTPException(status_code=403, detail="Conversation is closed")
+        created = existing is None
+        if not created:
+            conversation_id = str(existing["_id"])
+            message_data["conversation_id"] = existing["_id"]
+        message_store.insert(message_data)
+        add_to_inbox(existing or conversation_data, current_time)
+        await cache_membership(existing or conversation_data)
+        if created:
+            await missing_conversations.forget(conversation_id)
+
+        buyer_unread = 0 if created else get_unread_count(existing, user_id)
+        adjust_unread_total(seller_id, 1)
+        adjust_unread_total(user_id, -buyer_unread)
+        feed.mark_user_dirty(user_id)
+
+        participant_ids = [str(user_id), seller_id]
+        latest_message = serialize_last_message(build_last_message(message_data))
+        if created:
+            # Only a new thread is a new inquiry on the item
+            record_inquiry(item_id, conversation_id, user_id, current_time)
+            conversation_data["last_message"] = build_last_message(message_data)
+            conversation_data["unread"] = {seller_id: 1}
+
+            # Write the new conversation through to both participants' cached
+            # inboxes; shared inboxes are evicted instead
+            if cache_is_shared():
+                for participant_id in participant_ids:
+                    await evict_cached_inbox(participant_id)
+            else:
+                for participant_id in participant_ids:
+                    await inbox_changes.set_async(participant_id, time.time())
+            if not cache_is_shared() and any(
+                participant_id in conversation_cache
+                for participant_id in participant_ids
+            ):
+                seller = await fetch_seller_details(
+                    conversation_data["seller_id"], loaders
+                )
+                serialized_conv = {
+                    **serialize_conversation(conversation_data),
+                    "seller_details": seller,
+                    "unread_count": 0,
+                    "item_details": serialize_item_details(item),
+                    "latest_message": latest_message,
+                }
+                for participant_id in participant_ids:
+                    await prepend_cached_inbox(
+                        participant_id,
+                        {
+                            **serialized_conv,
+                            "unread_count": get_unread_count(
+                                conversation_data, participant_id
+                            ),
+                        },
+                    )
+        else:
+            await update_cached_inbox(
+                str(user_id),
+                conversation_id,
+                latest_message,
+                current_time,
+                unread_increment=-buyer_unread,
+            )
+            await update_cached_inbox(
+                seller_id,
+                conversation_id,
+                latest_message,
+                current_time,
+                unread_increment=1,
+            )
+            await ws_manager.send_message(
+                seller_id,
+                {
+                    "type": "message",
+                    "data": {
+                        "conversation_id": conversation_id,
+                        "sender_id": str(user_id),
+                        "message": initial_message,
+                        "created_at": current_time.isoformat(),
+                    },
+                },
+            )
+            return {
+                "message": "Conversation already exists",
+                "conversation_id": conversation_id,
+                "created": False,
+            }
 
         await ws_manager.send_message(
             str(user_id),
@@ -153,18 +501,81 @@ async def create_conversation(
                 "created_at": datetime.utcnow().isoformat(),
             },
         )
-        return {"message": "Conversation created", "conversation_id": conversation_id}
+        return {
+            "message": "Conversation created",
+            "conversation_id": conversation_id,
+            "created": True,
+        }
     except json.JSONDecodeError as e:
         logger.error("Invalid JSON format")
         raise HTTPException(status_code=400, detail="Invalid JSON format")
     except errors.InvalidId:
         logger.error("Invalid conversation ID format")
         raise HTTPException(status_code=400, detail="Invalid conversation ID format")
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error("Error creating conversation: " + str(e))
         raise HTTPException(status_code=500, detail="Cannot create conversation")
 
 
+# Everything derived from a sent message: the conversation summary and read
+# state, the inbox index and the unread totals. Runs in the request so the
+# summary is never behind an acknowledged message.
+async def record_message_sent(message_data: dict, sender_id: str, recipient_id: str):
+    conversation_id = str(message_data["conversation_id"])
+    current_time = message_data["created_at"]
+    last_message = build_last_message(message_data)
+    await asyncio.to_thread(touch_inbox, message_data["conversation_id"], current_time)
+    # Replying also marks the conversation read for the sender
+    previous = await asyncio.to_thread(
+        conversations_collection.find_one_and_update,
+        {"_id": message_data["conversation_id"]},
+        {
+            "$set": {
+                f"read_pointers.{sender_id}": build_read_pointer(message_data),
+                f"unread.{sender_id}": 0,
+            },
+            "$inc": {f"unread.{recipient_id}": 1},
+        },
+        projection={"unread": 1},
+        return_document=ReturnDocument.BEFORE,
+    )
+    # Concurrent sends can land out of order; only a newer message replaces
+    # the summary
+    result = await asyncio.to_thread(
+        conversations_collection.update_one,
+        {
+            "_id": message_data["conversation_id"],
+            "last_message.created_at": {"$not": {"$gt": current_time}},
+        },
+        {"$set": {"updated_at": current_time, "last_message": last_message}},
+    )
+    is_latest = result.matched_count == 1
+    sender_unread = get_unread_count(previous or {}, sender_id)
+    await asyncio.to_thread(adjust_unread_total, recipient_id, 1)
+    await asyncio.to_thread(adjust_unread_total, sender_id, -sender_unread)
+
+    # Write the new latest message through to both participants' cached inboxes
+    latest_message = serialize_last_message(last_message)
+    await update_cached_inbox(
+        sender_id,
+        conversation_id,
+        latest_message,
+        current_time,
+        unread_increment=-sender_unread,
+        is_latest=is_latest,
+    )
+    await update_cached_inbox(
+        recipient_id,
+        conversation_id,
+        latest_message,
+        current_time,
+        unread_increment=1,
+        is_latest=is_latest,
+    )
+
+
 # this function sends a message to a conversation
 @router.post("/{conversation_id}")
 async def send_message(
@@ -174,17 +585,22 @@ async def send_message(
 ):
     try:
         logger.info(f"Sending message to conversation with ID: {conversation_id}")
-        conversation = conversations_collection.find_one(
-            {"_id": ObjectId(conversation_id)}
-        )
-        if conversation is None:
+        # Participants come from the membership cache rather than a conversation read
+        membership = await get_membership(conversation_id)
+        if membership is None:
             logger.error("Conversation not found")
             raise HTTPException(status_code=404, detail="Conversation not found")
+        if str(sender_id) not in (membership["seller_id"], membership["buyer_id"]):
+            raise HTTPException(
+                status_code=403, detail="Not a participant in this conversation"
+            )
+        if membership["status"] in CLOSED_STATUSES:
+            raise HTTPException(status_code=403, detail="Conversation is closed")
 
         recipient_id = (
-            str(conversation["seller_id"])
-            if sender_id == str(conversation["buyer_id"])
-            else str(conversation["buyer_id"])
+            membership["seller_id"]
+            if str(sender_id) == membership["buyer_id"]
+            else membership["buyer_id"]
         )
 
         # Create timestamp for both fields
@@ -211,7 +627,9 @@ async def send_message(
         message_data["created_at"] = current_time
         message_data["updated_at"] = current_time
 
-        result = messages_collection.insert_one(message_data)
+        message_data["_id"] = ObjectId()
+        await insert_message(message_data)
+        await record_message_sent(message_data, str(sender_id), recipient_id)
 
         # this is where the notification should go, using websockets example json payload here with multiplexing in mine:
         notification_payload = {
@@ -226,11 +644,13 @@ async def send_message(
         await ws_manager.send_message(recipient_id, notification_payload)
         return {
             "message": "Message sent successfully",
-            "message_id": str(result.inserted_id),
+            "message_id": str(message_data["_id"]),
         }
     except errors.InvalidId:
         logger.error("Invalid conversation ID format")
         raise HTTPException(status_code=400, detail="Invalid conversation ID format")
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error sending message: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to send message")
@@ -239,396 +659,393 @@ async def send_message(
 # this function retrieves all conversations for a specific user from the database
 @router.get("/")
 async def get_conversations(
-    background_tasks: BackgroundTasks,
     user_id=Depends(get_current_user_id),
     limit: int = Query(50, ge=1, le=100),
     skip: int = Query(0, ge=0),
     force_refresh: bool = Query(False),
+    loaders: Loaders = Depends(get_loaders),
 ):
     try:
         logger.info(
             f"Retrieving conversations for user {user_id} (limit: {limit}, skip: {skip})"
         )
 
-        # Check if we have a valid cache entry
-        cache_entry = conversation_cache.get(user_id)
-        cache_valid = (
-            cache_entry is not None
-            and time.time() - cache_entry["timestamp"] < CACHE_EXPIRY
-            and not force_refresh
+        # If the cached inbox covers the requested window, use it; an expired one
+        # is still served while a single background refresh reloads it
+        cached = (
+            None if force_refresh else await get_cached_window(user_id, skip, limit)
         )
-
-        # If we have a valid cache entry, use it
-        if cache_valid:
+        if cached is not None:
+            data, cached_at = cached
+            if time.time() - cached_at >= CACHE_EXPIRY:
+                inbox_flight.refresh(
+                    ("full", user_id),
+                    lambda: refresh_conversation_cache(user_id, replaces=cached_at),
+                )
             logger.info(f"Using cached conversations for user {user_id}")
-            data = cache_entry["data"][skip : skip + limit]
-            return {"message": "Conversations retrieved successfully", "data": data}
-
-        # If no valid cache, fetch from database with aggregation pipeline
-        # This does everything in a single MongoDB query
-        pipeline = [
-            # Match conversations where the user is either seller or buyer
-            {
-                "$match": {
-                    "$or": [
-                        {"seller_id": ObjectId(user_id)},
-                        {"buyer_id": ObjectId(user_id)},
-                    ]
-                }
-            },
-            # Sort by updated_at or created_at to get most recent conversations first
-            {"$sort": {"updated_at": -1}},
-            # Apply pagination
-            {"$skip": skip},
-            {"$limit": limit},
-            # Lookup to get the seller details
-            {
-                "$lookup": {
-                    "from": "users",
-                    "localField": "seller_id",
-                    "foreignField": "_id",
-                    "as": "seller_details",
-                }
-            },
-            # Lookup to get buyer details
-            {
-                "$lookup": {
-                    "from": "users",
-                    "localField": "buyer_id",
-                    "foreignField": "_id",
-                    "as": "buyer_details",
-                }
-            },
-            # Unwind the seller_details array (will be empty if no seller found)
-            {
-                "$unwind": {
-                    "path": "$seller_details",
-                    "preserveNullAndEmptyArrays": True,
-                }
-            },
-            # Lookup to get the item details
-            {
-                "$lookup": {
-                    "from": "items",
-                    "localField": "item_id",
-                    "foreignField": "_id",
-                    "as": "item_details",
-                }
-            },
-            # Unwind the item_details array (will be empty if no item found)
-            {"$unwind": {"path": "$item_details", "preserveNullAndEmptyArrays": True}},
-            # Lookup to get the latest message
-            {
-                "$lookup": {
-                    "from": "messages",
-                    "let": {"conv_id": "$_id"},
-                    "pipeline": [
-                        {
-                            "$match": {
-                                "$expr": {"$eq": ["$conversation_id", "$$conv_id"]}
-                            }
-                        },
-                        {"$sort": {"timestamp": -1, "created_at": -1}},
-                        {"$limit": 1},
-                    ],
-                    "as": "latest_messages",
-                }
-            },
-            # Unwind the latest_messages array (will be empty if no messages)
-            {
-                "$unwind": {
-                    "path": "$latest_messages",
-                    "preserveNullAndEmptyArrays": True,
-                }
-            },
-            # Project only the fields we need
-            {
-                "$project": {
-                    "_id": 1,
-                    "seller_id": 1,
-                    "buyer_id": 1,
-                    "item_id": 1,
-                    "created_at": 1,
-                    "updated_at": 1,
-                    "status": 1,
-                    "seller_details": {
-                        "_id": "$seller_details._id",
-                        "email": "$seller_details.email",
-                        "name": "$seller_details.name",
-                        "picture": "$seller_details.picture",
-                    },
-                    "item_details": {
-                        "_id": "$item_details._id",
-                        "title": "$item_details.title",
-                        "price": "$item_details.price",
-                        "image": {"$arrayElemAt": ["$item_details.images", 0]},
-                        "images": "$item_details.images",
-                        "condition": "$item_details.condition",
-                    },
-                    "latest_message": {
-                        "_id": "$latest_messages._id",
-                        "sender_id": "$latest_messages.sender_id",
-                        "message": "$latest_messages.message",
-                        "content": "$latest_messages.content",
-                        "created_at": "$latest_messages.created_at",
-                        "timestamp": "$latest_messages.timestamp",
-                    },
-                }
-            },
-        ]
-
-        # Execute the aggregation pipeline
-        try:
-            conversations_with_details = await asyncio.to_thread(
-                list, conversations_collection.aggregate(pipeline)
+            return JSONResponse(
+                {"message": "Conversations retrieved successfully", "data": data}
             )
-            logger.debug(
-                f"Aggregation pipeline returned {len(conversations_with_details)} conversations"
-            )
-        except Exception as e:
-            logger.error(f"Error in aggregation pipeline: {str(e)}")
-            # Fall back to the previous method if aggregation fails
-            return await get_conversations_fallback(user_id, limit, skip)
-
-        if not conversations_with_details:
-            # Schedule a background refresh for next time
-            background_tasks.add_task(refresh_conversation_cache, user_id)
-            return {"message": "No conversations found", "data": []}
 
-        # Serialize the results
-        serialized_conversations = []
-        for conv in conversations_with_details:
-            serialized_conv = serialize_conversation(conv)
-
-            # Handle seller details
-            if (
-                "seller_details" in conv
-                and conv["seller_details"]
-                and "_id" in conv["seller_details"]
-            ):
-                seller_details = conv["seller_details"]
-                serialized_conv["seller_details"] = {
-                    "id": str(seller_details["_id"]),
-                    "email": seller_details.get("email", ""),
-                    "name": seller_details.get("name", ""),
-                    "picture": seller_details.get("picture", ""),
-                }
-            else:
-                serialized_conv["seller_details"] = None
-
-            # Handle item details
-            if (
-                "item_details" in conv
-                and conv["item_details"]
-                and "_id" in conv["item_details"]
-            ):
-                item_details = conv["item_details"]
-                serialized_conv["item_details"] = {
-                    "id": str(item_details["_id"]),
-                    "title": item_details.get("title", ""),
-                    "price": item_details.get("price", 0),
-                    "image": item_details.get("image", ""),
-                    "images": item_details.get("images", []),
-                    "condition": item_details.get("condition", ""),
-                }
-            else:
-                serialized_conv["item_details"] = None
+        # Otherwise load the window once, however many requests are waiting on it
+        serialized_conversations = await inbox_flight.do(
+            ("window", user_id, skip, limit),
+            lambda: load_inbox_window(user_id, skip, limit, loaders),
+        )
+        if not serialized_conversations:
+            return {"message": "No conversations found", "data": []}
+        return JSONResponse(
+            {
+                "message": "Conversations retrieved successfully",
+                "data": serialized_conversations,
+            }
+        )
+    except Exception as e:
+        logger.error(f"Unable to retrieve conversations: {str(e)}")
+        raise HTTPException(
+            status_code=500, detail=f"Cannot retrieve conversations: {str(e)}"
+        )
 
-            # Handle latest message
-            if (
-                "latest_message" in conv
-                and conv["latest_message"]
-                and "_id" in conv["latest_message"]
-            ):
-                latest_msg = conv["latest_message"]
-                content = latest_msg.get("message", latest_msg.get("content", ""))
-                timestamp = latest_msg.get(
-                    "timestamp", latest_msg.get("created_at", "")
-                )
 
-                serialized_conv["latest_message"] = {
-                    "id": str(latest_msg["_id"]),
-                    "sender_id": str(latest_msg["sender_id"]),
-                    "content": content,
-                    "timestamp": (
-                        timestamp.isoformat()
-                        if isinstance(timestamp, datetime)
-                        else str(timestamp)
-                    ),
-                }
-            else:
-                serialized_conv["latest_message"] = None
+# Helper function to load and serialize one window of a user's inbox, fetching
+# its sellers, items and any legacy latest messages with one query per collection
+async def load_inbox_window(user_id: str, skip: int, limit: int, loaders: Loaders):
+    started_at = time.time()
+    conversations_list = await asyncio.to_thread(
+        fetch_inbox_conversations, user_id, skip, limit
+    )
+    serialized_conversations = await serialize_inbox(
+        conversations_list, user_id, loaders
+    )
+    # Only a window starting at the top of the inbox is a valid cached prefix
+    if skip == 0:
+        await cache_loaded_inbox(
+            user_id,
+            serialized_conversations,
+            complete=len(serialized_conversations) < limit,
+            started_at=started_at,
+        )
+    return serialized_conversations
+
+
+def serialize_user_card(user: dict) -> dict:
+    return {
+        "id": str(user["_id"]),
+        "email": user.get("email", ""),
+        "name": user.get("name", ""),
+        "picture": user.get("picture", ""),
+    }
+
+
+def serialize_item_card(item: dict) -> dict:
+    images = item.get("images") or []
+    return {
+        "id": str(item["_id"]),
+        "title": item.get("title", ""),
+        "price": item.get("price", 0),
+        "image": images[0] if images else "",
+        "images": images,
+        "condition": item.get("condition", ""),
+    }
+
+
+# Item shown in the header of an open conversation
+def serialize_conversation_item(item: dict) -> dict:
+    return {
+        "id": str(item["_id"]),
+        "title": item.get("title", ""),
+        "price": item.get("price", 0),
+        "description": item.get("description", ""),
+        "images": item.get("images", []),
+        "status": item.get("status", "active"),
+        "condition": item.get("condition", ""),
+        "category": item.get("category", ""),
+    }
+
+
+def serialize_conversation_header(conversation: dict) -> dict:
+    return {
+        "id": str(conversation["_id"]),
+        "seller_id": str(conversation["seller_id"]),
+        "buyer_id": str(conversation["buyer_id"]),
+        "item_id": str(conversation["item_id"]),
+        "created_at": conversation.get("created_at", datetime.utcnow()).isoformat(),
+        "updated_at": conversation.get("updated_at", datetime.utcnow()).isoformat(),
+        "status": conversation.get("status", "active"),
+    }
+
+
+def serialize_user_details(user):
+    return serialize_user_card(user) if user else None
+
+
+def serialize_item_details(item):
+    return serialize_item_card(item) if item else None
+
+
+# Helper function to serialize a page of inbox entries. Lookups for every entry
+# go through the request's loaders, so each collection is queried once per page.
+async def serialize_inbox(conversations: list, user_id: str, loaders: Loaders):
+    sellers, items, latest_messages = await asyncio.gather(
+        loaders.users.load_many([conv["seller_id"] for conv in conversations]),
+        loaders.items.load_many([conv["item_id"] for conv in conversations]),
+        asyncio.gather(
+            *(fetch_latest_message(conv, loaders) for conv in conversations)
+        ),
+    )
+    return [
+        {
+            **serialize_conversation(conv),
+            "seller_details": serialize_user_details(seller),
+            "item_details": serialize_item_details(item),
+            "latest_message": latest_message,
+            "unread_count": get_unread_count(conv, user_id),
+        }
+        for conv, seller, item, latest_message in zip(
+            conversations, sellers, items, latest_messages
+        )
+    ]
 
-            serialized_conversations.append(serialized_conv)
 
-        # Update the cache with the results
-        # We're only caching what we've fetched, not the full dataset
-        conversation_cache[user_id] = {
-            "message": "Conversations retrieved successfully",
-            "data": serialized_conversations,
-            "timestamp": time.time(),
-        }
+# Helper function to fetch seller details
+async def fetch_seller_details(seller_id, loaders: Loaders):
+    return serialize_user_details(await loaders.users.load(seller_id))
 
-        # Schedule a background refresh of the full cache if needed
-        if len(serialized_conversations) == limit:  # There might be more data
-            background_tasks.add_task(refresh_conversation_cache, user_id)
 
-        return {
-            "message": "Conversations retrieved successfully",
-            "data": serialized_conversations,
-        }
-    except Exception as e:
-        logger.error(f"Unable to retrieve conversations: {str(e)}")
-        # Fall back to the previous method if anything goes wrong
-        return await get_conversations_fallback(user_id, limit, skip)
+# Helper function to fetch latest message, only queried for conversations
+# written before last_message was denormalized onto the document
+async def fetch_latest_message(conversation, loaders: Loaders):
+    if "last_message" in conversation:
+        return serialize_last_message(conversation["last_message"])
+    latest_message = await loaders.latest_messages.load(conversation["_id"])
+    if latest_message:
+        return serialize_last_message(build_last_message(latest_message))
+    return None
 
 
-# Fallback method in case the aggregation pipeline fails
-async def get_conversations_fallback(user_id, limit, skip):
+# Full-text search over the messages of the user's own conversations. Hits come
+# back best match first, each with a snippet and the conversation it belongs to.
+@router.get("/search")
+async def search_messages(
+    q: str = Query(..., min_length=2, max_length=100),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(SEARCH_PAGE_SIZE, ge=1, le=MAX_SEARCH_PAGE_SIZE),
+    user_id=Depends(get_current_user_id),
+    loaders: Loaders = Depends(get_loaders),
+):
     try:
-        logger.info(
-            f"Using fallback method to retrieve conversations for user {user_id}"
+        page = {"skip": skip, "limit": limit, "has_more": False}
+        conversation_ids = await asyncio.to_thread(
+            fetch_inbox_conversation_ids, user_id
         )
-
-        # Get conversations with pagination
-        conversations_list = list(
-            conversations_collection.find(
-                {
-                    "$or": [
-                        {"seller_id": ObjectId(user_id)},
-                        {"buyer_id": ObjectId(user_id)},
-                    ]
-                }
+        if not conversation_ids:
+            return {"message": "Messages found", "data": [], "page": page}
+        messages = await asyncio.to_thread(
+            message_store.search, q, conversation_ids, skip, limit + 1
+        )
+        page["has_more"] = len(messages) > limit
+        messages = messages[:limit]
+
+        hit_ids = list({message["conversation_id"] for message in messages})
+        conversations = {
+            conv["_id"]: conv
+            for conv in await asyncio.to_thread(
+                lambda: list(
+                    conversations_collection.find(
+                        {"_id": {"$in": hit_ids}},
+                        {"item_id": 1, "seller_id": 1, "buyer_id": 1, "status": 1},
+                    )
+                )
+            )
+        }
+        contexts = await asyncio.gather(
+            *(
+                fetch_search_context(conv, user_id, loaders)
+                for conv in conversations.values()
             )
-            .sort("updated_at", -1)
-            .skip(skip)
-            .limit(limit)
         )
+        contexts = dict(zip(conversations.keys(), contexts))
 
-        if not conversations_list:
-            return {"message": "No conversations found", "data": []}
-
-        serialized_conversations = [
-            serialize_conversation(conv) for conv in conversations_list
+        terms = search_terms(q)
+        data = [
+            {
+                "id": str(message["_id"]),
+                "conversation_id": str(message["conversation_id"]),
+                "sender_id": str(message["sender_id"]),
+                "snippet": build_snippet(message.get("message", ""), terms),
+                "created_at": message["created_at"].isoformat(),
+                "conversation": contexts[message["conversation_id"]],
+            }
+            for message in messages
+            if message["conversation_id"] in contexts
         ]
+        return JSONResponse({"message": "Messages found", "data": data, "page": page})
+    except Exception as e:
+        logger.error(f"Error searching messages: {str(e)}")
+        raise HTTPException(status_code=500, detail="Cannot search messages")
 
-        # Fetch details concurrently
-        tasks = []
-        for conversation in conversations_list:
-            tasks.append(fetch_seller_details(conversation["seller_id"]))
-            tasks.append(fetch_latest_message(conversation["_id"]))
-
-        results = await asyncio.gather(*tasks)
 
-        for i, serialized_conv in enumerate(serialized_conversations):
-            seller_index = i * 2
-            message_index = i * 2 + 1
+# Helper function to describe the conversation a search hit belongs to
+async def fetch_search_context(conversation, user_id: str, loaders: Loaders):
+    other_id = (
+        conversation["buyer_id"]
+        if str(conversation["seller_id"]) == str(user_id)
+        else conversation["seller_id"]
+    )
+    item, other = await asyncio.gather(
+        loaders.items.load(conversation["item_id"]), loaders.users.load(other_id)
+    )
+    return {
+        "id": str(conversation["_id"]),
+        "status": conversation.get("status"),
+        "item_details": serialize_item_details(item),
+        "other_participant": serialize_user_details(other),
+    }
 
-            serialized_conv["seller_details"] = results[seller_index]
-            serialized_conv["latest_message"] = results[message_index]
 
+# Total unread messages across the user's conversations, for the nav badge
+@router.get("/unread-count")
+async def get_unread_total(user_id=Depends(get_current_user_id)):
+    try:
+        user = await asyncio.to_thread(
+            user_collection.find_one, {"_id": ObjectId(user_id)}, {"unread_total": 1}
+        )
         return {
-            "message": "Conversations retrieved successfully",
-            "data": serialized_conversations,
+            "message": "Unread count retrieved successfully",
+            "data": {"unread_total": max((user or {}).get("unread_total", 0), 0)},
         }
     except Exception as e:
-        logger.error(f"Fallback method failed: {str(e)}")
-        raise HTTPException(
-            status_code=500, detail=f"Cannot retrieve conversations: {str(e)}"
-        )
+        logger.error(f"Error retrieving unread count: {str(e)}")
+        raise HTTPException(status_code=500, detail="Cannot retrieve unread count")
 
 
-# Helper function to fetch seller details
-async def fetch_seller_details(seller_id):
-    # Run the synchronous MongoDB operation in a thread pool
-    seller = await asyncio.to_thread(user_collection.find_one, {"_id": seller_id})
-    if seller:
-        return {
-            "id": str(seller["_id"]),
-            "email": seller.get("email", ""),
-            "name": seller.get("name", ""),
-            "picture": seller.get("picture", ""),
-        }
-    return None
+# this function moves the user's read pointer forward to a message (the latest one
+# by default) and resets the unread counters accordingly
+@router.post("/{conversation_id}/read")
+async def mark_conversation_read(
+    conversation_id: str,
+    message_id: Optional[str] = Form(None),
+    user_id=Depends(get_current_user_id),
+):
+    try:
+        object_id = ObjectId(conversation_id)
+        conversation = conversations_collection.find_one(
+            {"_id": object_id}, {"seller_id": 1, "buyer_id": 1, "last_message": 1}
+        )
+        if conversation is None:
+            logger.error("Conversation not found")
+            raise HTTPException(status_code=404, detail="Conversation not found")
+        participant_ids = [
+            str(conversation["seller_id"]),
+            str(conversation["buyer_id"]),
+        ]
+        if str(user_id) not in participant_ids:
+            raise HTTPException(
+                status_code=403, detail="Not a participant in this conversation"
+            )
 
+        last_message = conversation.get("last_message")
+        if message_id is None:
+            message = last_message
+        else:
+            message = message_store.find(object_id, ObjectId(message_id))
+            if message is None:
+                raise HTTPException(status_code=404, detail="Message not found")
+        if not message:
+            return {"message": "Conversation marked as read", "unread_count": 0}
+
+        # Messages from the other participant newer than the pointer stay unread
+        if last_message and message["_id"] == last_message["_id"]:
+            unread_count = 0
+        else:
+            unread_count = message_store.count_after(
+                object_id, message["created_at"], ObjectId(user_id)
+            )
 
-# Helper function to fetch latest message
-async def fetch_latest_message(conversation_id):
-    # Run the synchronous MongoDB operation in a thread pool
-    latest_message = await asyncio.to_thread(
-        lambda: messages_collection.find_one(
-            {"conversation_id": conversation_id},
-            sort=[
-                ("timestamp", -1)
-            ],  # Sort by timestamp in descending order to get the latest message
+        # Pointers only move forward, so a stale client cannot un-read messages
+        pointer = build_read_pointer(message)
+        previous = conversations_collection.find_one_and_update(
+            {
+                "_id": object_id,
+                "$or": [
+                    {f"read_pointers.{user_id}": {"$exists": False}},
+                    {f"read_pointers.{user_id}.read_at": {"$lt": pointer["read_at"]}},
+                ],
+            },
+            {
+                "$set": {
+                    f"read_pointers.{user_id}": pointer,
+                    f"unread.{user_id}": unread_count,
+                }
+            },
+            projection={"unread": 1},
+            return_document=ReturnDocument.BEFORE,
         )
-    )
+        if previous is None:
+            return {
+                "message": "Conversation already read",
+                "unread_count": get_unread_count(
+                    conversations_collection.find_one({"_id": object_id}, {"unread": 1})
+                    or {},
+                    user_id,
+                ),
+            }
 
-    if latest_message:
-        return {
-            "id": str(latest_message["_id"]),
-            "sender_id": str(latest_message["sender_id"]),
-            "content": latest_message.get(
-                "message", ""
-            ),  # Handle different field names
-            "timestamp": (
-                latest_message.get(
-                    "timestamp", latest_message.get("created_at", "")
-                ).isoformat()
-                if isinstance(
-                    latest_message.get(
-                        "timestamp", latest_message.get("created_at", "")
-                    ),
-                    datetime,
-                )
-                else str(
-                    latest_message.get(
-                        "timestamp", latest_message.get("created_at", "")
-                    )
-                )
-            ),
-        }
-    return None
+        adjust_unread_total(user_id, unread_count - get_unread_count(previous, user_id))
+        await set_cached_unread(str(user_id), conversation_id, unread_count)
+        mark_inbox_changed(object_id)
 
+        other_id = next(pid for pid in participant_ids if pid != str(user_id))
+        await ws_manager.send_message(
+            other_id,
+            {
+                "type": "read",
+                "data": {
+                    "conversation_id": conversation_id,
+                    "user_id": str(user_id),
+                    "message_id": str(pointer["message_id"]),
+                    "read_at": pointer["read_at"].isoformat(),
+                },
+            },
+        )
+        return {"message": "Conversation marked as read", "unread_count": unread_count}
+    except errors.InvalidId:
+        logger.error(f"Invalid ObjectId format: {conversation_id}")
+        raise HTTPException(status_code=400, detail="Invalid ID format")
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error marking conversation as read: {str(e)}")
+        raise HTTPException(status_code=500, detail="Cannot mark conversation as read")
 
-# this function retrieves a conversation from the database, along side with the messages
+
+# this function retrieves a conversation from the database, along side with a page of messages
 @router.get("/{conversation_id}")
-async def get_conversation(conversation_id: str):
+async def get_conversation(
+    conversation_id: str,
+    limit: int = Query(MESSAGE_PAGE_SIZE, ge=1, le=MAX_MESSAGE_PAGE_SIZE),
+    before: Optional[str] = Query(
+        None, description="Return messages older than this message ID"
+    ),
+    after: Optional[str] = Query(
+        None, description="Return messages newer than this message ID"
+    ),
+    loaders: Loaders = Depends(get_loaders),
+):
     try:
         logger.info(f"Finding conversation in MongoDB with ID: {conversation_id}")
         object_id = ObjectId(conversation_id)
+        if before is not None and after is not None:
+            raise HTTPException(
+                status_code=400, detail="Use either before or after, not both"
+            )
+        if await missing_conversations.is_missing(object_id):
+            raise HTTPException(status_code=404, detail="Conversation not found")
 
         # Use aggregation pipeline to get conversation with all related data in one query
         pipeline = [
             # Match the specific conversation
             {"$match": {"_id": object_id}},
-            # Lookup seller details
-            {
-                "$lookup": {
-                    "from": "users",
-                    "localField": "seller_id",
-                    "foreignField": "_id",
-                    "as": "seller_details",
-                }
-            },
-            # Unwind seller details (convert array to object)
-            {
-                "$unwind": {
-                    "path": "$seller_details",
-                    "preserveNullAndEmptyArrays": True,
-                }
-            },
-            # Lookup buyer details
-            {
-                "$lookup": {
-                    "from": "users",
-                    "localField": "buyer_id",
-                    "foreignField": "_id",
-                    "as": "buyer_details",
-                }
-            },
-            # Unwind buyer details
-            {"$unwind": {"path": "$buyer_details", "preserveNullAndEmptyArrays": True}},
             # Lookup item details
             {
                 "$lookup": {
@@ -650,18 +1067,7 @@ async def get_conversation(conversation_id: str):
                     "created_at": 1,
                     "updated_at": 1,
                     "status": 1,
-                    "seller_details": {
-                        "_id": "$seller_details._id",
-                        "email": "$seller_details.email",
-                        "name": "$seller_details.name",
-                        "picture": "$seller_details.picture",
-                    },
-                    "buyer_details": {
-                        "_id": "$buyer_details._id",
-                        "email": "$buyer_details.email",
-                        "name": "$buyer_details.name",
-                        "picture": "$buyer_details.picture",
-                    },
+                    "read_pointers": 1,
                     "item_details": {
                         "_id": "$item_details._id",
                         "title": "$item_details.title",
@@ -676,113 +1082,78 @@ async def get_conversation(conversation_id: str):
             },
         ]
 
-        # Execute the aggregation pipeline
-        conversation_result = await asyncio.to_thread(
-            lambda: list(conversations_collection.aggregate(pipeline))
-        )
-
-        if not conversation_result:
-            logger.error("Unable to find conversation")
-            raise HTTPException(status_code=404, detail="Conversation not found")
+        # The header is only needed with the first page; later pages just page messages
+        if before is None and after is None:
+            conversation_result, page = await asyncio.gather(
+                asyncio.to_thread(
+                    lambda: list(conversations_collection.aggregate(pipeline))
+                ),
+                asyncio.to_thread(message_store.page, object_id, limit),
+            )
+            if not conversation_result:
+                logger.error("Unable to find conversation")
+                await missing_conversations.mark_missing(object_id)
+                raise HTTPException(status_code=404, detail="Conversation not found")
+        else:
+            page = await asyncio.to_thread(
+                message_store.page, object_id, limit, before, after
+            )
+            if page is None:
+                raise HTTPException(status_code=400, detail="Invalid message cursor")
+            return JSONResponse(
+                {
+                    "message": "Messages retrieved successfully",
+                    "data": {
+                        "conversation": None,
+                        "messages": list_serialize_messages(page["messages"]),
+                        "page": page["cursors"],
+                    },
+                }
+            )
 
         conversation = conversation_result[0]
-
-        # Get messages for this conversation
-        messages = await asyncio.to_thread(
-            lambda: list(
-                messages_collection.find({"conversation_id": object_id}).sort(
-                    "created_at", 1
-                )
-            )
+        # Participant cards come from the shared user card cache
+        seller, buyer = await loaders.users.load_many(
+            [conversation["seller_id"], conversation["buyer_id"]]
         )
 
         # Process messages
-        serialized_messages = list_serialize_messages(messages)
+        serialized_messages = list_serialize_messages(page["messages"])
 
-        # Get latest message
+        # Get latest message, the first page always ends with it
         latest_message = None
         if serialized_messages:
             latest_message = serialized_messages[-1]  # Already sorted by created_at
 
         # Serialize conversation
+        item_details = conversation.get("item_details")
         serialized_conversation = {
-            "id": str(conversation["_id"]),
-            "seller_id": str(conversation["seller_id"]),
-            "buyer_id": str(conversation["buyer_id"]),
-            "item_id": str(conversation["item_id"]),
-            "created_at": conversation.get("created_at", datetime.utcnow()).isoformat(),
-            "updated_at": conversation.get("updated_at", datetime.utcnow()).isoformat(),
-            "status": conversation.get("status", "active"),
-            "seller_details": (
-                {
-                    "id": (
-                        str(conversation["seller_details"]["_id"])
-                        if conversation.get("seller_details")
-                        else None
-                    ),
-                    "email": conversation.get("seller_details", {}).get("email", ""),
-                    "name": conversation.get("seller_details", {}).get("name", ""),
-                    "picture": conversation.get("seller_details", {}).get(
-                        "picture", ""
-                    ),
-                }
-                if conversation.get("seller_details")
-                else None
-            ),
-            "buyer_details": (
-                {
-                    "id": (
-                        str(conversation["buyer_details"]["_id"])
-                        if conversation.get("buyer_details")
-                        else None
-                    ),
-                    "email": conversation.get("buyer_details", {}).get("email", ""),
-                    "name": conversation.get("buyer_details", {}).get("name", ""),
-                    "picture": conversation.get("buyer_details", {}).get("picture", ""),
-                }
-                if conversation.get("buyer_details")
-                else None
-            ),
+            **serialize_conversation_header(conversation),
+            "seller_details": serialize_user_details(seller),
+            "buyer_details": serialize_user_details(buyer),
             "item_details": (
-                {
-                    "id": (
-                        str(conversation["item_details"]["_id"])
-                        if conversation.get("item_details")
-                        else None
-                    ),
-                    "title": conversation.get("item_details", {}).get("title", ""),
-                    "price": conversation.get("item_details", {}).get("price", 0),
-                    "description": conversation.get("item_details", {}).get(
-                        "description", ""
-                    ),
-                    "images": conversation.get("item_details", {}).get("images", []),
-                    "status": conversation.get("item_details", {}).get(
-                        "status", "active"
-                    ),
-                    "condition": conversation.get("item_details", {}).get(
-                        "condition", ""
-                    ),
-                    "category": conversation.get("item_details", {}).get(
-                        "category", ""
-                    ),
-                }
-                if conversation.get("item_details")
-                else None
+                serialize_conversation_item(item_details) if item_details else None
             ),
             "latest_message": latest_message,
+            "read_pointers": serialize_read_pointers(conversation.get("read_pointers")),
         }
 
         logger.info("Fetching conversation with messages")
-        return {
-            "message": "Conversation and messages retrieved successfully",
-            "data": {
-                "conversation": serialized_conversation,
-                "messages": serialized_messages,
-            },
-        }
+        return JSONResponse(
+            {
+                "message": "Conversation and messages retrieved successfully",
+                "data": {
+                    "conversation": serialized_conversation,
+                    "messages": serialized_messages,
+                    "page": page["cursors"],
+                },
+            }
+        )
     except errors.InvalidId:
         logger.error(f"Invalid ObjectId format: {conversation_id}")
         raise HTTPException(status_code=400, detail="Invalid conversation ID format")
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Unexpected error retrieving conversation: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -793,10 +1164,26 @@ async def get_conversation(conversation_id: str):
 async def delete_conversation(conversation_id: str):
     try:
         logger.info(f"Deleting conversation with ID: {conversation_id}")
-        result = conversations_collection.delete_one({"_id": ObjectId(conversation_id)})
-        if result.deleted_count == 0:
+        conversation = conversations_collection.find_one_and_delete(
+            {"_id": ObjectId(conversation_id)},
+            {"seller_id": 1, "buyer_id": 1, "unread": 1},
+        )
+        if conversation is None:
             logger.error("Conversation not found")
             raise HTTPException(status_code=404, detail="Conversation not found")
+        remove_from_inbox([conversation["_id"]])
+        await invalidate_membership(conversation_id)
+        # Messages are deleted by the collector
+        record_tombstone(
+            "conversation",
+            conversation["_id"],
+            [conversation["seller_id"], conversation["buyer_id"]],
+        )
+        for participant_id in (conversation["seller_id"], conversation["buyer_id"]):
+            adjust_unread_total(
+                participant_id, -get_unread_count(conversation, participant_id)
+            )
+            await remove_from_cached_inbox(str(participant_id), conversation_id)
         return {"message": "Conversation deleted successfully"}
     except errors.InvalidId:
         logger.error(f"Invalid ObjectId format: {conversation_id}")
@@ -9,8 +9,15 @@
     Body,
 )
 from typing import List, Optional
-from app.config import items_collection, user_collection, conversations_collection
+from app.config import (
+    items_collection,
+    user_collection,
+    conversations_collection,
+    feeds_collection,
+)
 from app.schemas.item_schema import list_serialize_items
+from app.core.responses import JSONResponse
+from app.core.negative_cache import missing_items
 from bson import ObjectId, errors
 from app.models.item_model import ItemRead, ItemFromDB, ItemCreate, ProductUpdate
 from app.config import upload_image
@@ -21,6 +28,14 @@
 from app.core.security import verify_access_token
 from app.routers.api import get_current_user_id
 from datetime import datetime, timedelta
+from fastapi import Query, BackgroundTasks
+from app.core import feed
+from app.routers.saved_searches import notify_saved_search_matches
+from app.core.suggestions import suggestion_index
+from app.core import views
+from app.core.loader import Loaders, get_loaders
+from app.core.gc import record_tombstone
+import asyncio
 
 router = APIRouter()
 
@@ -50,6 +65,8 @@ async def get_items(
             categories = category.split(",")
             query["category"] = {"$in": categories}
             logger.debug(f"Added category filter: {categories}")
+            if not personal_only:
+                feed.record_browse(user_id, categories)
         if min_price is not None or max_price is not None:
             price_filter = {}
             if min_price is not None:
@@ -89,28 +106,113 @@ async def get_items(
         items_cursor = items_collection.find(query).sort("createdAt", -1)
         items = list_serialize_items(items_cursor)
         logger.debug(f"Items found: {len(items)}")
-        return {"message": "Items retrieved successfully", "data": items}
+        return JSONResponse({"message": "Items retrieved successfully", "data": items})
     except Exception as e:
         logger.error(f"Unable to retrieve items: {str(e)}")
         raise HTTPException(status_code=404, detail="Cannot retrieve items")
 
 
+# Typeahead suggestions served from the in-memory prefix index, never touches Mongo
+@router.get("/suggestions")
+async def get_suggestions(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(8, ge=1, le=20),
+    user_id: str = Depends(get_current_user_id),
+):
+    return {
+        "message": "Suggestions retrieved successfully",
+        "data": suggestion_index.suggest(q, limit),
+    }
+
+
+# Trending items ranked by time-decayed view counts, served from a cached ranking
+@router.get("/trending")
+async def get_trending_items(
+    category: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=views.TRENDING_SIZE),
+    user_id: str = Depends(get_current_user_id),
+):
+    try:
+        trending = await views.get_trending()
+        if category:
+            items = trending["by_category"].get(category, [])
+        else:
+            items = trending["items"]
+        return {
+            "message": "Trending items retrieved successfully",
+            "data": items[:limit],
+            "categories": trending["categories"],
+        }
+    except Exception as e:
+        logger.error(f"Unable to retrieve trending items: {str(e)}")
+        raise HTTPException(status_code=500, detail="Cannot retrieve trending items")
+
+
+# Personalized "for you" feed, served from the precomputed ranking in the feeds collection
+@router.get("/feed")
+async def get_feed(
+    user_id: str = Depends(get_current_user_id),
+    limit: int = Query(20, ge=1, le=feed.FEED_SIZE),
+    skip: int = Query(0, ge=0),
+):
+    try:
+        logger.info(f"[GET /items/feed] Retrieving feed for user {user_id}")
+        user_feed = await asyncio.to_thread(
+            feeds_collection.find_one,
+            {"user_id": ObjectId(user_id)},
+            {"items": {"$slice": [skip, limit]}, "computed_at": 1},
+        )
+        if user_feed is None or "items" not in user_feed:
+            # Cold start: compute the feed inline once, the worker keeps it fresh afterwards
+            logger.info(f"No precomputed feed for user {user_id}, computing now")
+            items = await asyncio.to_thread(feed.recompute_feed, user_id)
+            return {
+                "message": "Feed retrieved successfully",
+                "data": items[skip : skip + limit],
+                "computed_at": datetime.utcnow(),
+            }
+        items = await asyncio.to_thread(
+            feed.drop_inactive_items, user_id, user_feed["items"]
+        )
+        return {
+            "message": "Feed retrieved successfully",
+            "data": items,
+            "computed_at": user_feed.get("computed_at"),
+        }
+    except errors.InvalidId:
+        logger.error(f"Invalid ObjectId format: {user_id}")
+        raise HTTPException(status_code=400, detail="Invalid user ID format")
+    except Exception as e:
+        logger.error(f"Unable to retrieve feed: {str(e)}")
+        raise HTTPException(status_code=500, detail="Cannot retrieve feed")
+
+
 @router.get("/{item_id}")
 async def get_item(item_id: str):
     try:
         logger.info(f"Finding item in MongoDB with ID: {item_id}")
         object_id = ObjectId(item_id)
-        item = items_collection.find_one({"_id": object_id})
+        item = None
+        if not await missing_items.is_missing(object_id):
+            # Who inquired is only shown to the seller, through /inquiries
+            item = items_collection.find_one(
+                {"_id": object_id}, {"recent_inquirers": 0}
+            )
+            if item is None:
+                await missing_items.mark_missing(object_id)
         if item is None:
             logger.error("Unable to find item")
             raise HTTPException(status_code=404, detail="Item not found")
         logger.info("Fetching item")
+        views.record_view(item_id, item.get("category"))
         item["_id"] = str(item["_id"])
         item["seller_id"] = str(item["seller_id"])
         return {"message": "Item retrieved successfully", "data": item}
     except errors.InvalidId:
         logger.error(f"Invalid ObjectId format: {item_id}")
         raise HTTPException(status_code=400, detail="Invalid item ID format")
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Unexpected error retrieving item: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -118,6 +220,7 @@ async def get_item(item_id: str):
 
 @router.post("/")
 async def create_item(
+    background_tasks: BackgroundTasks,
     item: str = Form(...),
     files: List[UploadFile] = File(...),
     user_id=Depends(get_current_user_id),
@@ -136,8 +239,13 @@ async def create_item(
         validated_item_dict = validated_item.model_dump()
         validated_item_dict["images"] = images
         validated_item_dict["seller_id"] = user_id
+        validated_item_dict["updated_at"] = validated_item_dict["createdAt"]
         logger.info("Inserting item to mongodb")
         items_collection.insert_one(validated_item_dict)
+        await missing_items.forget(validated_item_dict["_id"])
+        feed.mark_feeds_stale_for_category(validated_item_dict.get("category"))
+        suggestion_index.upsert_item(validated_item_dict)
+        background_tasks.add_task(notify_saved_search_matches, validated_item_dict)
         return {"message": "Item created successfully"}
     except json.JSONDecodeError as e:
         logger.error("Invalid JSON format")
@@ -151,11 +259,20 @@ async def create_item(
 async def delete_item(item_id: str):
     try:
         logger.info(f"Deleting item with ID: {item_id}")
-        result = items_collection.delete_one({"_id": ObjectId(item_id)})
-        if result.deleted_count == 0:
+        item = items_collection.find_one_and_delete(
+            {"_id": ObjectId(item_id)}, {"images": 1, "seller_id": 1}
+        )
+        if item is None:
             logger.error("Item not found")
             raise HTTPException(status_code=404, detail="Item not found")
+        suggestion_index.remove_item(item_id)
+        # Conversations, reports and images are cleaned up by the collector
+        record_tombstone(
+            "item", item["_id"], [item["seller_id"]], images=item.get("images", [])
+        )
         return {"message": "Item deleted successfully"}
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error deleting item: {str(e)}")
         raise HTTPException(status_code=500, detail="Cannot delete item")
@@ -214,6 +331,7 @@ async def update_item(
                 images.append(image_url)
             logger.debug(f"Images after addition: {images}")
         update_data["images"] = images
+        update_data["updated_at"] = datetime.utcnow()
         logger.info(f"Final update_data to be set: {update_data}")
         result = items_collection.update_one(
             {"_id": ObjectId(item_id)}, {"$set": update_data}
@@ -221,6 +339,7 @@ async def update_item(
         logger.info(
             f"MongoDB update result: matched={result.matched_count}, modified={result.modified_count}"
         )
+        suggestion_index.upsert_item({**existing_item, **update_data})
         return {"message": "Item updated successfully"}
     except json.JSONDecodeError:
         logger.error("Invalid JSON format in update payload")
@@ -235,11 +354,12 @@ async def update_item(
 async def get_item_inquiries(
     item_id: str,
     user_id: str = Depends(get_current_user_id),
+    loaders: Loaders = Depends(get_loaders),
 ):
     """Get users who have inquired about a specific item.
 
-    This endpoint uses MongoDB's aggregation pipeline to fetch users who have
-    started conversations about the item, including their profile information.
+    Fetches the conversations started about the item, then loads every buyer's
+    profile information through the request's batched users loader.
     """
     try:
         logger.info(
@@ -261,51 +381,35 @@ async def get_item_inquiries(
                 detail="Only the seller can view inquiries for this item",
             )
 
-        # Use aggregation pipeline to get users who inquired about the item
-        pipeline = [
-            # Match conversations for this item
-            {"$match": {"item_id": ObjectId(item_id)}},
-            # Lookup user information for each buyer
-            {
-                "$lookup": {
-                    "from": "users",
-                    "localField": "buyer_id",
-                    "foreignField": "_id",
-                    "as": "buyer_info",
-                }
-            },
-            # Unwind the buyer_info array
-            {"$unwind": "$buyer_info"},
-            # Project only the fields we need
+        conversations = list(
+            conversations_collection.find(
+                {"item_id": ObjectId(item_id)},
+                {"buyer_id": 1, "status": 1, "created_at": 1, "updated_at": 1},
+            ).sort("updated_at", -1)
+        )
+
+        # Buyer profiles for every inquiry come from one batched users query
+        buyers = await loaders.users.load_many(
+            [conversation["buyer_id"] for conversation in conversations]
+        )
+        inquiries = [
             {
-                "$project": {
-                    "_id": 0,
-                    "conversation_id": "$_id",
-                    "status": 1,
-                    "created_at": 1,
-                    "updated_at": 1,
-                    "buyer": {
-                        "_id": "$buyer_info._id",
-                        "full_name": {
-                            "$ifNull": ["$buyer_info.full_name", "$buyer_info.name"]
-                        },
-                        "email": "$buyer_info.email",
-                        "picture": {"$ifNull": ["$buyer_info.picture", None]},
-                        "rating": {"$ifNull": ["$buyer_info.rating", None]},
-                    },
-                }
-            },
-            # Sort by most recent first
-            {"$sort": {"updated_at": -1}},
+                "status": conversation.get("status"),
+                "created_at": conversation.get("created_at"),
+                "updated_at": conversation.get("updated_at"),
+                "conversation_id": str(conversation["_id"]),
+                "buyer": {
+                    "_id": str(buyer["_id"]),
+                    "full_name": buyer.get("full_name") or buyer.get("name"),
+                    "email": buyer.get("email"),
+                    "picture": buyer.get("picture"),
+                    "rating": buyer.get("rating"),
+                },
+            }
+            for conversation, buyer in zip(conversations, buyers)
+            if buyer is not None
         ]
 
-        inquiries = list(conversations_collection.aggregate(pipeline))
-
-        # Convert ObjectId to string for JSON serialization
-        for inquiry in inquiries:
-            inquiry["conversation_id"] = str(inquiry["conversation_id"])
-            inquiry["buyer"]["_id"] = str(inquiry["buyer"]["_id"])
-
         logger.info(f"Found {len(inquiries)} inquiries for item {item_id}")
         return {"message": "Inquiries retrieved successfully", "data": inquiries}
 
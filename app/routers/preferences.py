@@ -3,6 +3,7 @@
 from app.routers.api import get_current_user_id
 from app.schemas.preferences_schema import PreferencesUpdate, PreferencesRead
 from app.config import logger
+from app.core.user_cards import invalidate_user_card
 from bson import ObjectId
 
 router = APIRouter()
@@ -62,4 +63,5 @@ async def update_image(
     user_collection.update_one(
         {"_id": ObjectId(user_id)}, {"$set": {"picture": image_url}}
     )
+    await invalidate_user_card(user_id)
     return {"picture": image_url}
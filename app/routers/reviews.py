@@ -3,7 +3,9 @@
 from bson import ObjectId
 from app.config import reviews_collection
 from app.routers.api import get_current_user_id
+from app.core.loader import Loaders, get_loaders
 from fastapi import Depends
+import asyncio
 
 router = APIRouter()
 
@@ -26,62 +28,47 @@ async def review_post(review: Review, user_id=Depends(get_current_user_id)):
 
 
 @router.get("/{user_id}")
-def get_user_reviews(user_id: str):
+async def get_user_reviews(user_id: str, loaders: Loaders = Depends(get_loaders)):
     user_object_id = ObjectId(user_id)
 
-    # Aggregation pipeline to get the last 10 reviews with reviewer info
-    pipeline = [
-        # Match reviews for the specified seller
-        {"$match": {"review_target": user_object_id}},
-        # Sort by most recent first (assuming _id contains timestamp)
-        {"$sort": {"_id": -1}},
-        # Limit to last 10 reviews
-        {"$limit": 10},
-        # Lookup reviewer information from users collection
-        {
-            "$lookup": {
-                "from": "users",
-                "localField": "reviewer_id",
-                "foreignField": "_id",
-                "as": "reviewer_info",
-            }
-        },
-        # Unwind the reviewer_info array
-        {"$unwind": {"path": "$reviewer_info", "preserveNullAndEmptyArrays": True}},
-        # Project only the fields we need
-        {
-            "$project": {
-                "_id": 1,
-                "item_id": 1,
-                "reviewer_id": 1,
-                "seller_id": 1,
-                "rating": 1,
-                "review_text": 1,
-                "tags": 1,
-                "reviewer_name": "$reviewer_info.name",
-                "reviewer_profile_pic": "$reviewer_info.picture",
-            }
-        },
-    ]
-
-    # Execute the aggregation pipeline
-    reviews = list(reviews_collection.aggregate(pipeline))
+    # Get the last 10 reviews, most recent first (_id contains the timestamp)
+    reviews = await asyncio.to_thread(
+        lambda: list(
+            reviews_collection.find({"review_target": user_object_id})
+            .sort("_id", -1)
+            .limit(10)
+        )
+    )
 
     if not reviews:
         return {"reviews": [], "average_rating": 0}
 
+    # Reviewer info for the whole page comes from one batched users query
+    reviewers = await loaders.users.load_many(
+        [review["reviewer_id"] for review in reviews]
+    )
+
     # Convert ObjectId to string for JSON serialization
     reviews_list = [
         {
             **{
                 k: str(v) if isinstance(v, ObjectId) else v
                 for k, v in review.items()
-                if k not in ["reviewer_name", "reviewer_profile_pic"]
+                if k
+                in [
+                    "_id",
+                    "item_id",
+                    "reviewer_id",
+                    "seller_id",
+                    "rating",
+                    "review_text",
+                    "tags",
+                ]
             },
-            "reviewer_name": review.get("reviewer_name", "Unknown User"),
-            "reviewer_profile_pic": review.get("reviewer_profile_pic", None),
+            "reviewer_name": (reviewer or {}).get("name", "Unknown User"),
+            "reviewer_profile_pic": (reviewer or {}).get("picture"),
         }
-        for review in reviews
+        for review, reviewer in zip(reviews, reviewers)
     ]
 
     # Calculate average rating from all reviews (not just the last 10)
@@ -0,0 +1,152 @@
+from fastapi import APIRouter, Depends, HTTPException
+from bson import ObjectId, errors
+from app.config import logger, saved_searches_collection, search_alerts_collection
+from app.routers.api import get_current_user_id
+from app.models.saved_search_model import SavedSearchCreate
+from app.core.saved_search_index import saved_search_index
+from app.websockets.manager import ws_manager
+from datetime import datetime
+
+router = APIRouter()
+
+
+def serialize_saved_search(saved_search) -> dict:
+    return {
+        "id": str(saved_search["_id"]),
+        "name": saved_search.get("name"),
+        "search": saved_search.get("search"),
+        "category": saved_search.get("category"),
+        "min_price": saved_search.get("min_price"),
+        "max_price": saved_search.get("max_price"),
+        "created_at": saved_search.get("created_at"),
+    }
+
+
+# Push a new listing to every user whose saved search it matches; users that are
+# not connected get the match queued in search_alerts instead
+async def notify_saved_search_matches(item: dict):
+    try:
+        matches = saved_search_index.match(item)
+        if not matches:
+            return
+        logger.info(f"Item {item['_id']} matched {len(matches)} saved searches")
+        item_summary = {
+            "_id": str(item["_id"]),
+            "title": item.get("title", ""),
+            "price": item.get("price"),
+            "category": item.get("category", ""),
+            "images": item.get("images", []),
+            "seller_id": str(item.get("seller_id")),
+        }
+        queued = []
+        for match in matches:
+            delivered = await ws_manager.send_message(
+                match["user_id"],
+                {
+                    "type": "saved_search_match",
+                    "data": {"saved_search_id": match["id"], "item": item_summary},
+                },
+            )
+            if not delivered:
+                queued.append(
+                    {
+                        "user_id": ObjectId(match["user_id"]),
+                        "saved_search_id": ObjectId(match["id"]),
+                        "item": item_summary,
+                        "created_at": datetime.utcnow(),
+                    }
+                )
+        if queued:
+            search_alerts_collection.insert_many(queued, ordered=False)
+    except Exception as e:
+        logger.error(f"Error notifying saved search matches: {str(e)}")
+
+
+@router.post("/")
+async def create_saved_search(
+    saved_search: SavedSearchCreate, user_id: str = Depends(get_current_user_id)
+):
+    try:
+        if not (saved_search.search or "").strip() and not saved_search.category:
+            if saved_search.min_price is None and saved_search.max_price is None:
+                raise HTTPException(
+                    status_code=400, detail="Saved search needs at least one filter"
+                )
+        saved_search_data = saved_search.model_dump()
+        saved_search_data["user_id"] = ObjectId(user_id)
+        result = saved_searches_collection.insert_one(saved_search_data)
+        saved_search_index.add(saved_search_data)
+        return {
+            "message": "Saved search created successfully",
+            "saved_search_id": str(result.inserted_id),
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error creating saved search: {str(e)}")
+        raise HTTPException(status_code=500, detail="Cannot create saved search")
+
+
+@router.get("/")
+async def get_saved_searches(user_id: str = Depends(get_current_user_id)):
+    try:
+        saved_searches = saved_searches_collection.find({"user_id": ObjectId(user_id)})
+        return {
+            "message": "Saved searches retrieved successfully",
+            "data": [serialize_saved_search(search) for search in saved_searches],
+        }
+    except Exception as e:
+        logger.error(f"Error retrieving saved searches: {str(e)}")
+        raise HTTPException(status_code=500, detail="Cannot retrieve saved searches")
+
+
+# Drains the queued matches for the current user
+@router.get("/alerts")
+async def get_search_alerts(user_id: str = Depends(get_current_user_id)):
+    try:
+        alerts = list(
+            search_alerts_collection.find({"user_id": ObjectId(user_id)}).sort(
+                "created_at", -1
+            )
+        )
+        if alerts:
+            search_alerts_collection.delete_many(
+                {"_id": {"$in": [alert["_id"] for alert in alerts]}}
+            )
+        return {
+            "message": "Search alerts retrieved successfully",
+            "data": [
+                {
+                    "id": str(alert["_id"]),
+                    "saved_search_id": str(alert["saved_search_id"]),
+                    "item": alert["item"],
+                    "created_at": alert["created_at"],
+                }
+                for alert in alerts
+            ],
+        }
+    except Exception as e:
+        logger.error(f"Error retrieving search alerts: {str(e)}")
+        raise HTTPException(status_code=500, detail="Cannot retrieve search alerts")
+
+
+@router.delete("/{saved_search_id}")
+async def delete_saved_search(
+    saved_search_id: str, user_id: str = Depends(get_current_user_id)
+):
+    try:
+        result = saved_searches_collection.delete_one(
+            {"_id": ObjectId(saved_search_id), "user_id": ObjectId(user_id)}
+        )
+        if result.deleted_count == 0:
+            raise HTTPException(status_code=404, detail="Saved search not found")
+        saved_search_index.remove(saved_search_id)
+        return {"message": "Saved search deleted successfully"}
+    except errors.InvalidId:
+        logger.error(f"Invalid ObjectId format: {saved_search_id}")
+        raise HTTPException(status_code=400, detail="Invalid saved search ID format")
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error deleting saved search: {str(e)}")
+        raise HTTPException(status_code=500, detail="Cannot delete saved search")
@@ -0,0 +1,62 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from app.config import logger
+from app.routers.dependencies import get_current_user_id
+from app.core.loader import Loaders, get_loaders
+from app.core.responses import JSONResponse
+from app.core.sync import current_version, fetch_changes
+from app.routers.conversation import serialize_inbox
+from app.schemas.item_schema import list_serialize_items
+from app.schemas.message_schema import list_serialize_messages
+from typing import Optional
+import asyncio
+
+router = APIRouter()
+
+
+# Changes to the user's inbox and to listings since a version returned by an
+# earlier call. Without a version, or when "reset" comes back true, the client
+# reloads in full and syncs from the returned version onwards.
+@router.get("/")
+async def sync(
+    version: Optional[int] = Query(None, ge=0),
+    user_id=Depends(get_current_user_id),
+    loaders: Loaders = Depends(get_loaders),
+):
+    try:
+        # Read the clock first so nothing written during this call is skipped
+        next_version = current_version()
+        changes = None
+        if version is not None:
+            changes = await asyncio.to_thread(fetch_changes, user_id, version)
+        if changes is None:
+            return JSONResponse(
+                {
+                    "message": "Full sync required",
+                    "data": {"version": next_version, "reset": True},
+                }
+            )
+
+        conversations = await serialize_inbox(
+            changes["conversations"], user_id, loaders
+        )
+        return JSONResponse(
+            {
+                "message": "Changes retrieved successfully",
+                "data": {
+                    "version": next_version,
+                    "reset": False,
+                    "conversations": conversations,
+                    "messages": list_serialize_messages(changes["messages"]),
+                    "items": list_serialize_items(changes["items"]),
+                    "deleted": {
+                        "conversations": [
+                            str(cid) for cid in changes["deleted_conversations"]
+                        ],
+                        "items": [str(iid) for iid in changes["deleted_items"]],
+                    },
+                },
+            }
+        )
+    except Exception as e:
+        logger.error(f"Error syncing changes: {str(e)}")
+        raise HTTPException(status_code=500, detail="Cannot sync changes")
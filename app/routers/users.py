@@ -5,8 +5,9 @@
 from fastapi import Request
 from app.core.security import verify_access_token
 from ..config import user_collection, items_collection
-from bson import ObjectId
+from bson import ObjectId, errors
 from fastapi import Depends
+from app.core.negative_cache import missing_users
 router = APIRouter()
 
 @router.get("/@me")
@@ -46,7 +47,11 @@ async def get_user(user_id: str):
     try:
         logger.info(f"Finding user in MongoDB with ID: {user_id}")
         object_id = ObjectId(user_id) 
-        user = user_collection.find_one({"_id": object_id})
+        user = None
+        if not await missing_users.is_missing(object_id):
+            user = user_collection.find_one({"_id": object_id})
+            if user is None:
+                await missing_users.mark_missing(object_id)
         if user is None:
             logger.error("Unable to find user")
             raise HTTPException(status_code=404, detail="User not found")
@@ -56,6 +61,8 @@ async def get_user(user_id: str):
     except errors.InvalidId: 
         logger.error(f"Invalid ObjectId format: {user_id}")
         raise HTTPException(status_code=400, detail="Invalid user ID format")
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Unexpected error retrieving user: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -7,7 +7,7 @@ def serialize_conversation(conversation: Conversation):
         "seller_id": str(conversation["seller_id"]),
         "buyer_id": str(conversation["buyer_id"]),
         "status": conversation["status"],
-        "created_at": conversation["created_at"].isoformat(), 
+        "created_at": conversation["created_at"].isoformat(),
         "updated_at": conversation["updated_at"].isoformat(),
     }
 
@@ -16,8 +16,9 @@ def serialize_item(item: ItemFromDB) -> dict:
         "seller_id": str(item["seller_id"]),
         "status": item.get("status", "active"),
         "location": item.get("location", ""),
+        "inquiry_count": item.get("inquiry_count", 0),
         "created_at": item.get("created_at"),
-        "updated_at": item.get("updated_at")
+        "updated_at": item.get("updated_at"),
     }
 
 
@@ -1,4 +1,13 @@
 from app.models.message_model import Message
+from datetime import datetime
+from typing import Optional
+
+# Length of the last-message preview stored on conversation documents
+MESSAGE_PREVIEW_LENGTH = 120
+# Length of the excerpt shown for a search hit
+SNIPPET_LENGTH = 120
+
+
 def serialize_message(message: Message):
     return {
         "id": str(message["_id"]),
@@ -6,8 +15,49 @@ def serialize_message(message: Message):
         "sender_id": str(message["sender_id"]),
         "message": message["message"],
         "created_at": message["created_at"].isoformat(),
-        "updated_at": message["updated_at"].isoformat()
+        "updated_at": message["updated_at"].isoformat(),
     }
 
+
 def list_serialize_messages(messages):
     return [serialize_message(msg) for msg in messages]
+
+
+# Summary of the newest message, denormalized onto the conversation document
+def build_last_message(message: dict) -> dict:
+    return {
+        "_id": message["_id"],
+        "sender_id": message["sender_id"],
+        "preview": message.get("message", "")[:MESSAGE_PREVIEW_LENGTH],
+        "created_at": message.get("created_at"),
+    }
+
+
+def serialize_last_message(last_message: Optional[dict]) -> Optional[dict]:
+    if not last_message or "_id" not in last_message:
+        return None
+    created_at = last_message.get("created_at")
+    return {
+        "id": str(last_message["_id"]),
+        "sender_id": str(last_message["sender_id"]),
+        "content": last_message.get("preview", ""),
+        "timestamp": (
+            created_at.isoformat()
+            if isinstance(created_at, datetime)
+            else str(created_at)
+        ),
+    }
+
+
+# Excerpt of a message centred on the first occurrence of a search term
+def build_snippet(text: str, terms: list, length: int = SNIPPET_LENGTH) -> str:
+    text = text or ""
+    lowered = text.lower()
+    positions = [lowered.find(term) for term in terms if lowered.find(term) >= 0]
+    start = max(min(positions) - length // 3, 0) if positions else 0
+    snippet = text[start : start + length]
+    if start > 0:
+        snippet = "..." + snippet
+    if start + length < len(text):
+        snippet = snippet + "..."
+    return snippet
@@ -0,0 +1,132 @@
+"""Change stream integration tests for the cache invalidation bus.
+
+Change streams need a replica set, so these tests run only when
+TEST_REPLICA_SET_URI points at one (a single-node replica set is enough), e.g.
+
+    TEST_REPLICA_SET_URI=mongodb://localhost:27017/?replicaSet=rs0 pytest tests
+
+They use their own database, which is dropped afterwards.
+"""
+
+import os
+import threading
+import time
+
+import pytest
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+os.environ.setdefault("FRONTEND_CALLBACK_URL", "http://localhost:3000")
+
+from app.core import invalidation  # noqa: E402
+from app.core.invalidation import InvalidationBus  # noqa: E402
+
+REPLICA_SET_URI = os.getenv("TEST_REPLICA_SET_URI")
+TEST_DATABASE = "spartan_up_invalidation_test"
+# How long a test waits for the bus to deliver an event (seconds)
+DELIVERY_TIMEOUT = 10
+
+
+@pytest.fixture
+def test_db(monkeypatch):
+    if not REPLICA_SET_URI:
+        pytest.skip("TEST_REPLICA_SET_URI is not set")
+    client = MongoClient(REPLICA_SET_URI, serverSelectionTimeoutMS=2000)
+    try:
+        hello = client.admin.command("hello")
+    except PyMongoError as e:
+        pytest.skip(f"MongoDB is not reachable: {e}")
+    if "setName" not in hello:
+        pytest.skip("MongoDB is not a replica set")
+    client.drop_database(TEST_DATABASE)
+    database = client[TEST_DATABASE]
+    monkeypatch.setattr(invalidation, "db", database)
+    monkeypatch.setattr(
+        invalidation, "stream_state_collection", database.change_stream_state
+    )
+    yield database
+    client.drop_database(TEST_DATABASE)
+    client.close()
+
+
+# Stands in for the event loop: publishes straight from the reader thread
+class ImmediateLoop:
+    def call_soon_threadsafe(self, callback, *args):
+        callback(*args)
+
+
+class BusRunner:
+    """Runs InvalidationBus.consume in a thread, reopening the stream the way
+    invalidation_worker does, and records every event published."""
+
+    def __init__(self, collections=("items", "users")):
+        self.events = []
+        self.bus = InvalidationBus()
+        for collection in collections:
+            self.bus.subscribe(collection, self.events.append)
+        self.stop = threading.Event()
+        self.consumed = 0
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self.stop.is_set():
+            self.bus.consume(ImmediateLoop(), self.stop)
+            self.consumed += 1
+
+    def __enter__(self):
+        self.thread.start()
+        # Give the stream time to open before the test writes
+        time.sleep(1)
+        return self
+
+    def __exit__(self, *exc):
+        self.stop.set()
+        self.thread.join(DELIVERY_TIMEOUT)
+
+    def wait_for(self, predicate):
+        deadline = time.monotonic() + DELIVERY_TIMEOUT
+        while time.monotonic() < deadline:
+            if any(predicate(event) for event in self.events):
+                return True
+            time.sleep(0.1)
+        return False
+
+
+def test_update_is_published_with_changed_fields(test_db):
+    item_id = test_db.items.insert_one({"title": "Desk", "status": "active"})
+    with BusRunner() as runner:
+        test_db.items.update_one(
+            {"_id": item_id.inserted_id}, {"$set": {"status": "sold"}}
+        )
+        assert runner.wait_for(
+            lambda event: event.operation == "update"
+            and event.document_id == item_id.inserted_id
+        )
+    update = next(event for event in runner.events if event.operation == "update")
+    assert update.collection == "items"
+    assert update.fields == frozenset({"status"})
+
+
+def test_collection_drop_does_not_stall_the_stream(test_db):
+    test_db.items.insert_one({"title": "Lamp"})
+    with BusRunner() as runner:
+        test_db.items.drop()
+        user_id = test_db.users.insert_one({"name": "after drop"}).inserted_id
+        assert runner.wait_for(lambda event: event.document_id == user_id)
+    # The saved token is past the drop, so a new stream does not replay it
+    state = test_db.change_stream_state.find_one({"_id": invalidation.STREAM_STATE_ID})
+    assert state is not None and state["resume_token"] is not None
+
+
+def test_stream_is_reopened_after_invalidate(test_db):
+    test_db.items.insert_one({"title": "Chair"})
+    with BusRunner() as runner:
+        # Dropping the watched database invalidates the stream
+        test_db.client.drop_database(TEST_DATABASE)
+        deadline = time.monotonic() + DELIVERY_TIMEOUT
+        while runner.consumed == 0 and time.monotonic() < deadline:
+            time.sleep(0.1)
+        assert runner.consumed >= 1
+        time.sleep(1)
+        item_id = test_db.items.insert_one({"title": "after invalidate"}).inserted_id
+        assert runner.wait_for(lambda event: event.document_id == item_id)